@@ -1,11 +1,19 @@
 # __init__.py
-print(f'Invoking __init__.py for {__name__}')
+import importlib
 
 __all__ = [
 		'helpers'
 		]
 
-from clinvar_workflow.helpers import clinsig_sort_dict
+
+def __getattr__(name):
+	## lazy loading: subpackages & the clinsig settings are imported on 1st access
+	if name == 'clinsig_sort_dict':
+		from clinvar_workflow.helpers import clinsig_sort_dict
+		return clinsig_sort_dict
+	if name in __all__ + ['benchmarks', 'query_clinvar', 'vizualization', 'workflows']:
+		return importlib.import_module('.' + name, __name__)
+	raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
 
 
 
@@ -0,0 +1,5 @@
+# __init__.py
+__all__ = [
+		'synthetic_clinvar',
+		'run_benchmarks'
+		]
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import print_function
+import io
+import os
+import sys
+import copy
+import json
+import time
+import platform
+import tempfile
+import contextlib
+from datetime import datetime
+
+## import ClinVar workflow submodules
+from clinvar_workflow.benchmarks import synthetic_clinvar as synth
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.helpers.process_user_inputs import add_hgvs_id_column
+from clinvar_workflow.helpers.write_outputs import write_output_annotation
+from clinvar_workflow.helpers import summary_stats as ss
+from clinvar_workflow.workflows import exploratory_analysis_workflow as explore
+
+## Pandas - setup
+import numpy as np
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+
+################################################################################
+#### Benchmark variables
+################################################################################
+
+BENCH_COLS_VAR = ['CHR', 'POS', 'REF', 'ALT']
+BENCH_COLS_INPUT = ['INFO']
+BENCH_COL_COND = 'condition'
+BENCH_COL_GENE = 'gene'
+
+## benchmark results JSON format version
+BENCH_RESULT_VERSION = 1
+
+
+
+################################################################################
+#### Benchmark stage functions (state dict --> stage output)
+################################################################################
+
+def bench_input_hgvs_id(input_df, build):
+	## input variant HGVS IDs
+	return add_hgvs_id_column(input_df, BENCH_COLS_VAR, 'hgvs_id.' + build)
+
+
+def bench_query_extraction(raw_query_df):
+	## MyVariant query DF --> reported variant ClinVar fields
+	return cv_query.extract_clinvar_raw_df(raw_query_df)
+
+
+def bench_wrangling(cv_raw_df, col_id):
+	## nested RCV & condition records --> 1 row per variant-RCV-condition
+	return cv_query.myvariant_clinvar_rcv_data_wrangling(cv_raw_df, col_id, cv_query.COL_CLINSIG,
+	                                                     cv_query.cv_int_fields)
+
+
+def bench_classification(cv_df, col_id):
+	## variant clinical significance classification rules
+	return cv_query.variant_summary_classify_rcv_clinsig(cv_df, col_id, cv_query.COL_CLINSIG + '.rcv')
+
+
+def bench_summary(cv_df, input_var_df, col_id):
+	## variant summary DF (classification + collapsed fields + input columns)
+	summ_df = cv_query.generate_clinvar_variant_summary_df(cv_df, col_id=col_id,
+	                                                       col_clinsig=cv_query.COL_CLINSIG + '.rcv',
+	                                                       cols_non_rcv=cv_query.cv_non_rcv_fields)
+	return cv_query.clinvar_summary_add_input_cols(summ_df, input_var_df, col_id=col_id,
+	                                               col_clinsig=cv_query.COL_CLINSIG,
+	                                               cols_var=BENCH_COLS_VAR, cols_input=BENCH_COLS_INPUT)
+
+
+def bench_flags(cv_df, cv_var_summary_df, col_id):
+	## aggregation stats, Boolean indicator & FLAG columns
+	return cv_query.add_agg_stats_summary_df(cv_df, cv_var_summary_df, col_id=col_id,
+	                                         col_clinsig=cv_query.COL_CLINSIG + '.rcv',
+	                                         col_cond=cv_query.COL_COND, col_rcv=cv_query.COL_RCV)
+
+
+def bench_full_annotation(cv_var_summary_df, cv_df, cols_cv, col_id):
+	## variant summary columns --> full ClinVar DF
+	return cv_query.add_clinvar_variant_summary_columns(cv_var_summary_df, cv_df, col_id=col_id,
+	                                                    col_clinsig=cv_query.COL_CLINSIG,
+	                                                    cols_cv=cols_cv, cols_var=BENCH_COLS_VAR,
+	                                                    cols_input=BENCH_COLS_INPUT)
+
+
+def bench_exploratory_preprocess(cv_full_df, col_id):
+	## full ClinVar DF --> data viz DF
+	return explore.preprocess_visualization_df(cv_full_df, col_id=col_id,
+	                                           col_clinsig=cv_query.COL_CLINSIG)
+
+
+def bench_exploratory_counts(viz_df, col_id):
+	## clinsig count tables (variant, RCV, per gene, per condition) - no plots
+	col_clinsig = cv_query.COL_CLINSIG
+	count_list = [ss.generate_count_df(viz_df, cnt_col=col_id, grp_cols=[col_clinsig]),
+	              ss.generate_count_df(viz_df, cnt_col=col_id, grp_cols=[col_clinsig + '.rcv'])]
+	for col_group in [BENCH_COL_GENE, BENCH_COL_COND]:
+		counts, idx_group, idx_clinsig = ss.grouped_count_codes(viz_df, col_group=col_group,
+		                                                        col_clinsig=col_clinsig,
+		                                                        col_count=col_id)
+		count_list.append(ss.grouped_count_df_from_codes(counts, idx_group, idx_clinsig))
+	return count_list
+
+
+def bench_exploratory_analysis(viz_df, col_id):
+	## clinsig analyses: count tables + Plotly figures
+	return explore.perform_explore_clinsig(viz_df, col_id=col_id, col_clinsig=cv_query.COL_CLINSIG,
+	                                       col_cond=BENCH_COL_COND, col_gene=BENCH_COL_GENE)
+
+
+def bench_write_annotation(cv_var_summary_df, cv_full_df, out_dir, write_excel, compression):
+	## annotation output files
+	write_output_annotation(out_dir, 'benchmark',
+	                        dict(cv_var_summary_df=cv_var_summary_df, cv_full_df=cv_full_df),
+	                        excel=write_excel, compression=compression)
+	return None
+
+
+## benchmark stages, in pipeline order: (stage, fxn, state input keys, state output key)
+##  stage inputs are copied before each run --> in place updates are kept from the last run
+BENCH_STAGES = [
+	('input_hgvs_id', bench_input_hgvs_id, ['input_df', 'build'], 'input_var_df'),
+	('query_extraction', bench_query_extraction, ['raw_query_df'], 'cv_raw_df'),
+	('wrangling', bench_wrangling, ['cv_raw_df', 'col_id'], 'cv_df'),
+	('classification', bench_classification, ['cv_df', 'col_id'], 'var_clinsig_df'),
+	('summary', bench_summary, ['cv_df', 'input_var_df', 'col_id'], 'cv_var_summary_df'),
+	('flags', bench_flags, ['cv_df', 'cv_var_summary_df', 'col_id'], 'cv_var_summary_df'),
+	('full_annotation', bench_full_annotation, ['cv_var_summary_df', 'cv_df', 'cols_cv', 'col_id'], 'cv_full_df'),
+	('exploratory_preprocess', bench_exploratory_preprocess, ['cv_full_df', 'col_id'], 'viz_df'),
+	('exploratory_counts', bench_exploratory_counts, ['viz_df', 'col_id'], 'count_list'),
+	('exploratory_analysis', bench_exploratory_analysis, ['viz_df', 'col_id'], 'clinsig_result_dict'),
+	('write_annotation', bench_write_annotation, ['cv_var_summary_df', 'cv_full_df', 'out_dir',
+	                                              'write_excel', 'compression'], None)
+]
+
+
+
+################################################################################
+#### Benchmark helper functions
+################################################################################
+
+def bench_copy_helper(obj):
+	## copy stage inputs (DFs: deep copy)
+	if isinstance(obj, (pd.DataFrame, pd.Series)):
+		return obj.copy(deep=True)
+	return copy.deepcopy(obj)
+
+
+def bench_rows_helper(obj):
+	## number of rows of a stage input | output (None if not a DF)
+	if isinstance(obj, (pd.DataFrame, pd.Series)):
+		return int(len(obj.index))
+	if isinstance(obj, list) and (len(obj) > 0) and isinstance(obj[0], pd.DataFrame):
+		return int(sum(len(o.index) for o in obj))
+	return None
+
+
+def bench_stage_helper(fxn, kwargs, repeat, quiet=True):
+	"""Run a stage 'repeat' times on fresh copies of its inputs.
+
+	Args:
+		fxn: stage function
+		kwargs (dict): stage inputs
+		repeat (int): number of timed runs
+		quiet (bool): silence the workflow progress messages
+
+	Returns:
+		output of the last run
+		dict: inputs of the last run (incl. in place updates)
+		list: run times (seconds)
+
+	"""
+	times = []
+	for i in range(repeat):
+		run_kwargs = {k:bench_copy_helper(v) for k, v in kwargs.items()}
+		with contextlib.redirect_stdout(io.StringIO() if quiet else sys.stdout):
+			t0 = time.perf_counter()
+			result = fxn(**run_kwargs)
+			times.append(time.perf_counter() - t0)
+	return result, run_kwargs, times
+
+
+def bench_stats_helper(times):
+	## run times --> summary stats (seconds)
+	return dict(min=float(np.min(times)), median=float(np.median(times)),
+	            mean=float(np.mean(times)), max=float(np.max(times)),
+	            repeat=len(times), times=[float(t) for t in times])
+
+
+def bench_environment_helper():
+	## software & hardware versions --> only compare runs from the same environment
+	from plotly import __version__ as plotly_version
+	return dict(python=platform.python_version(), platform=platform.platform(),
+	            processor=platform.processor(), cpu_count=os.cpu_count(),
+	            pandas=pd.__version__, numpy=np.__version__, plotly=plotly_version)
+
+
+
+################################################################################
+#### Driver functions
+################################################################################
+
+def run_benchmarks(n_variants=1000, n_unreported=100, rcv_per_variant=(1, 4), cond_per_rcv=(1, 2),
+                   clinsig_weights=None, expert_panel_frac=0.05, n_genes=500, n_conditions=1000,
+                   seed=0, repeat=3, stages=None, build='hg19', write_excel=False,
+                   compression=None, out_dir=None, quiet=True):
+	"""Run the pipeline stages on a synthetic ClinVar workload & time each stage.
+
+	Every stage runs in pipeline order (its inputs are the previous stages'
+	outputs); only the selected stages are reported.
+
+	Args:
+		n_variants: see synthetic_clinvar.generate_synthetic_clinvar
+		n_unreported:
+		rcv_per_variant:
+		cond_per_rcv:
+		clinsig_weights:
+		expert_panel_frac:
+		n_genes:
+		n_conditions:
+		seed:
+		repeat (int): number of timed runs per stage
+		stages (list): stages to report (default: all BENCH_STAGES)
+		build:
+		write_excel: also write the Excel files in the write_annotation stage
+		compression: write_annotation text file compression - None | 'gzip' | 'zstd'
+		out_dir: write_annotation output directory (default: temporary directory)
+		quiet: silence the workflow progress messages
+
+	Returns:
+		dict: benchmark results (JSON serializable)
+
+	"""
+	params = dict(n_variants=n_variants, n_unreported=n_unreported,
+	              rcv_per_variant=rcv_per_variant, cond_per_rcv=cond_per_rcv,
+	              clinsig_weights=clinsig_weights, expert_panel_frac=expert_panel_frac,
+	              n_genes=n_genes, n_conditions=n_conditions, seed=seed, repeat=repeat,
+	              build=build, write_excel=write_excel, compression=compression)
+	params = json.loads(json.dumps(params))
+	stages = [s[0] for s in BENCH_STAGES] if stages is None else stages
+	stages_not_found = [s for s in stages if s not in [b[0] for b in BENCH_STAGES]]
+	if len(stages_not_found) > 0:
+		raise ValueError('Benchmark stages NOT found: ' + ', '.join(stages_not_found))
+
+	## generate synthetic workload
+	print("\t.. generating synthetic ClinVar workload: " + str(n_variants) + " reported, "
+	      + str(n_unreported) + " unreported variants")
+	input_df, hits = synth.generate_synthetic_clinvar(n_variants=n_variants, n_unreported=n_unreported,
+	                                                  rcv_per_variant=rcv_per_variant,
+	                                                  cond_per_rcv=cond_per_rcv,
+	                                                  clinsig_weights=clinsig_weights,
+	                                                  expert_panel_frac=expert_panel_frac,
+	                                                  n_genes=n_genes, n_conditions=n_conditions,
+	                                                  seed=seed)
+	state = dict(input_df=input_df, raw_query_df=synth.synthetic_raw_query_df(hits), build=build,
+	             col_id='hgvs_id.' + build, write_excel=write_excel, compression=compression)
+
+	with tempfile.TemporaryDirectory() as tmp_dir:
+		state['out_dir'] = tmp_dir if out_dir is None else out_dir
+
+		stage_results = []
+		for stage, fxn, input_keys, output_key in BENCH_STAGES:
+			report = stage in stages
+			print("\t.. " + ("benchmarking " if report else "running ") + stage)
+			kwargs = {k:state[k] for k in input_keys}
+			result, run_kwargs, times = bench_stage_helper(fxn, kwargs, repeat if report else 1,
+			                                               quiet=quiet)
+			if report:
+				stage_results.append(dict(stage=stage, rows_in=bench_rows_helper(state[input_keys[0]]),
+				                          rows_out=bench_rows_helper(result), **bench_stats_helper(times)))
+				print("\t\t" + stage + ": median " + '{:.4f}'.format(stage_results[-1]['median']) + " s")
+
+			## next stages' inputs: stage output & in place updated inputs
+			state.update({k:v for k, v in run_kwargs.items() if isinstance(v, pd.DataFrame)})
+			if output_key is not None:
+				state[output_key] = result
+			if stage == 'wrangling':
+				state['cols_cv'] = state['cv_df'].columns.tolist()
+
+	return dict(version=BENCH_RESULT_VERSION,
+	            timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+	            environment=bench_environment_helper(), parameters=params,
+	            workload=dict(input_variants=bench_rows_helper(state['input_var_df']),
+	                          cv_rows=bench_rows_helper(state['cv_df']),
+	                          cv_full_rows=bench_rows_helper(state['cv_full_df'])),
+	            stages=stage_results)
+
+
+def write_benchmark_results(results, fpath):
+	"""Write benchmark results to a JSON file.
+
+	Args:
+		results (dict): run_benchmarks results
+		fpath (str): JSON file path
+	"""
+	with open(fpath, 'w') as f:
+		json.dump(results, f, indent=2)
+	print("\t.. benchmark results written to: " + fpath)
+
+
+def read_benchmark_results(fpath):
+	## JSON file --> benchmark results dict
+	with open(fpath) as f:
+		return json.load(f)
+
+
+def compare_benchmark_results(base_results, new_results, tolerance=0.2):
+	"""Compare the median stage times of 2 benchmark runs.
+
+	Args:
+		base_results (dict): baseline run_benchmarks results
+		new_results (dict): new run_benchmarks results
+		tolerance (float): relative slow down flagged as a regression (0.2 = 20%)
+
+	Returns:
+		Pandas DataFrame: stage, base & new median seconds, ratio (new/base), regression
+
+	"""
+	if base_results['parameters'] != new_results['parameters']:
+		print("\tWARNING: benchmark parameters differ --> stage times are NOT comparable.")
+	if base_results['environment'] != new_results['environment']:
+		print("\tWARNING: benchmark environments differ.")
+
+	base_df = pd.DataFrame(base_results['stages'])[['stage', 'median']]
+	new_df = pd.DataFrame(new_results['stages'])[['stage', 'median']]
+	compare_df = base_df.merge(new_df, on='stage', how='outer', suffixes=('.base', '.new'))
+	compare_df['ratio'] = compare_df['median.new'] / compare_df['median.base']
+	compare_df['regression'] = compare_df['ratio'] > (1 + tolerance)
+	return compare_df
+
+
+
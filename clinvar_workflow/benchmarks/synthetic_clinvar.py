@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import print_function
+import random
+
+## import ClinVar workflow submodules
+from clinvar_workflow.query_clinvar.clinvar_query import REFSEQ_CHROM_ACCESSIONS
+
+## Pandas - setup
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+
+################################################################################
+#### Synthetic ClinVar workload variables
+################################################################################
+
+## default RCV clinical significance mix (label --> relative weight)
+SYNTH_CLINSIG_WEIGHTS = {'Pathogenic':10, 'Likely pathogenic':8, 'Pathogenic/Likely pathogenic':2,
+                         'Uncertain significance':30, 'Likely benign':15, 'Benign':15,
+                         'Benign/Likely benign':5, 'not provided':8, 'risk factor':2,
+                         'drug response':1, 'Conflicting interpretations of pathogenicity':4}
+
+## review statuses (other than expert panel) of the RCVs
+SYNTH_REVIEW_STATUS = ['criteria provided, single submitter',
+                       'criteria provided, multiple submitters, no conflicts',
+                       'criteria provided, conflicting interpretations',
+                       'no assertion criteria provided']
+SYNTH_REVIEW_EXPERT = 'reviewed by expert panel'
+
+## conditions without a name
+SYNTH_COND_NOT_PROVIDED = ['not provided', 'not specified']
+
+SYNTH_CHROM = [str(c) for c in range(1, 23)] + ['X', 'Y', 'MT']
+
+
+
+################################################################################
+#### Synthetic MyVariant ClinVar hits
+################################################################################
+
+def synthetic_range_helper(rng, n_range):
+	## int | (min, max) --> random int in range
+	if isinstance(n_range, int):
+		return n_range
+	return rng.randint(n_range[0], n_range[1])
+
+
+def synthetic_rcv_helper(rng, rcv_num, conditions, cond_per_rcv, clinsig_labels,
+                         clinsig_weights, expert_panel_frac):
+	"""One synthetic RCV record (MyVariant 'clinvar.rcv' format).
+
+	Args:
+		rng: random.Random
+		rcv_num (int): RCV accession number
+		conditions (list): condition names
+		cond_per_rcv: int | (min, max) conditions per RCV
+		clinsig_labels (list):
+		clinsig_weights (list):
+		expert_panel_frac (float): fraction of expert panel reviewed RCVs
+
+	Returns:
+		dict
+
+	"""
+	n_cond = min(synthetic_range_helper(rng, cond_per_rcv), len(conditions))
+	cond_list = [dict(name=c, synonyms=[c + ' syndrome'], identifiers=dict(medgen='C' + str(k)))
+	             for k, c in enumerate(rng.sample(conditions, n_cond))]
+	if rng.random() < expert_panel_frac:
+		review_status = SYNTH_REVIEW_EXPERT
+	else:
+		review_status = rng.choice(SYNTH_REVIEW_STATUS)
+	return dict(accession='RCV' + str(rcv_num).zfill(9),
+	            clinical_significance=rng.choices(clinsig_labels, weights=clinsig_weights)[0],
+	            conditions=cond_list[0] if len(cond_list) == 1 else cond_list,
+	            review_status=review_status,
+	            last_evaluated='2019-' + str(rng.randint(1, 12)).zfill(2) + '-01',
+	            number_submitters=rng.randint(1, 5),
+	            origin='germline')
+
+
+def generate_synthetic_clinvar(n_variants=1000, n_unreported=100, rcv_per_variant=(1, 4),
+                               cond_per_rcv=(1, 2), clinsig_weights=None, expert_panel_frac=0.05,
+                               n_genes=500, n_conditions=1000, seed=0):
+	"""Synthetic input variants & MyVariant ClinVar query hits.
+
+	Single RCVs | conditions are dicts, multiple are lists (as returned by MyVariant).
+
+	Args:
+		n_variants (int): number of variants reported in ClinVar
+		n_unreported (int): number of input variants NOT found in ClinVar
+		rcv_per_variant: int | (min, max) RCVs per variant
+		cond_per_rcv: int | (min, max) conditions per RCV
+		clinsig_weights (dict): RCV clinsig label --> relative weight
+			(default SYNTH_CLINSIG_WEIGHTS)
+		expert_panel_frac (float): fraction of expert panel reviewed RCVs
+		n_genes (int): number of distinct genes
+		n_conditions (int): number of distinct named conditions
+		seed (int): random seed
+
+	Returns:
+		Pandas DataFrame: input variants (CHR, POS, REF, ALT, INFO)
+		list: MyVariant hits
+
+	"""
+	rng = random.Random(seed)
+	clinsig_weights = SYNTH_CLINSIG_WEIGHTS if clinsig_weights is None else clinsig_weights
+	clinsig_labels = list(clinsig_weights.keys())
+	clinsig_weights = list(clinsig_weights.values())
+	conditions = ['condition ' + str(i) for i in range(n_conditions)] + SYNTH_COND_NOT_PROVIDED
+
+	## unique variant positions
+	var_pos = rng.sample(range(1000, 1000 + 1000 * (n_variants + n_unreported)),
+	                     n_variants + n_unreported)
+
+	input_list, hits = [], []
+	for i, pos in enumerate(var_pos):
+		chrom = rng.choice(SYNTH_CHROM)
+		ref, alt = rng.sample('ACGT', 2)
+		hgvs_id = 'chr' + chrom + ':g.' + str(pos) + ref + '>' + alt
+		input_list.append(dict(CHR=chrom, POS=pos, REF=ref, ALT=alt, INFO='var' + str(i)))
+
+		## input variants NOT found in ClinVar
+		if i >= n_variants:
+			hits.append({'query':hgvs_id, 'notfound':True})
+			continue
+
+		rcv_list = [synthetic_rcv_helper(rng, i * 100 + j, conditions, cond_per_rcv,
+		                                 clinsig_labels, clinsig_weights, expert_panel_frac)
+		            for j in range(synthetic_range_helper(rng, rcv_per_variant))]
+		clinvar = dict(_license='synthetic', allele_id=i, variant_id=100000 + i,
+		               rsid='rs' + str(i), type='single nucleotide variant',
+		               preferred_name='NM_' + str(i) + ':c.' + str(pos) + ref + '>' + alt,
+		               chrom=chrom, ref=ref, alt=alt, cytogenic='1p',
+		               gene=dict(id=i, symbol='GENE' + str(rng.randint(1, n_genes))),
+		               hg19=dict(start=pos, end=pos), hg38=dict(start=pos + 1000, end=pos + 1000),
+		               hgvs=dict(coding=['NM_' + str(i) + ':c.' + str(pos) + ref + '>' + alt],
+		                         genomic=[REFSEQ_CHROM_ACCESSIONS['hg19'][chrom] + ':g.' + str(pos) + ref + '>' + alt,
+		                                  REFSEQ_CHROM_ACCESSIONS['hg38'][chrom] + ':g.' + str(pos + 1000)
+		                                  + ref + '>' + alt]),
+		               rcv=rcv_list[0] if len(rcv_list) == 1 else rcv_list)
+		hits.append({'query':hgvs_id, '_id':hgvs_id, '_score':1.0, 'clinvar':clinvar})
+
+	return pd.DataFrame(input_list), hits
+
+
+def synthetic_raw_query_df(hits):
+	"""MyVariant getvariants(..., as_dataframe=1) DataFrame of the hits.
+
+	Args:
+		hits (list): MyVariant hits
+
+	Returns:
+		Pandas DataFrame
+
+	"""
+	return pd.json_normalize(hits).set_index('query')
+
+
+
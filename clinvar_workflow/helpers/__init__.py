@@ -2,11 +2,8 @@
 # coding: utf-8
 # __init__.py
 
-print(f'Invoking __init__.py for {__name__}')
-
-
+import importlib
 from pathlib import PurePath
-from .clinical_significance_config import create_clinsig_dicts
 
 
 ################################################################################
@@ -18,18 +15,35 @@ _file_clinsig_settings = 'clinsig_settings.txt'
 _path_clinsig_settings = PurePath(__file__).parent.joinpath(PurePath(_file_clinsig_settings))
 
 
-## generate Clinical Significance setting dictionaries from settings file
-clinsig_sort_dict, clinsig_rgb_dict = create_clinsig_dicts(_path_clinsig_settings)
+def _load_clinsig_dicts():
+	## generate Clinical Significance setting dictionaries from settings file (1st use)
+	from .clinical_significance_config import create_clinsig_dicts
+	_d = globals()
+	_d['clinsig_sort_dict'], _d['clinsig_rgb_dict'] = create_clinsig_dicts(_path_clinsig_settings)
 
 
 ##----------------------------------------------------------------------------##
 
 __all__ = [
+		'checkpoints',
 		'process_user_inputs',
+		'profiling',
+		'read_outputs',
 		'sorting',
+		'spill',
 		'summary_stats',
 		'write_outputs',
 		'clinsig_sort_dict',
 		'clinsig_rgb_dict'
 		]
 
+
+def __getattr__(name):
+	## lazy loading: clinsig dicts & submodules are created | imported on 1st access
+	if name in ['clinsig_sort_dict', 'clinsig_rgb_dict']:
+		_load_clinsig_dicts()
+		return globals()[name]
+	if name in __all__:
+		return importlib.import_module('.' + name, __name__)
+	raise AttributeError('module ' + repr(__name__) + ' has no attribute ' + repr(name))
+
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# coding: utf-8
+# checkpoints.py
+from __future__ import print_function
+import os
+import json
+import pickle
+import hashlib
+from datetime import datetime
+
+
+## checkpoint run directory name key & manifest file name;
+##  bump the version when a checkpointed step's output changes
+CHECKPOINT_DIR_KEY = '_ClinVar_checkpoint_'
+CHECKPOINT_MANIFEST = 'manifest.json'
+CHECKPOINT_VERSION = 1
+
+
+
+################################################################################
+#### Checkpoint key & run directory functions
+################################################################################
+
+def file_hash_helper(fpath, h, chunk_size=1024**2):
+	## add file content to the hash (chunked --> large input files)
+	with open(fpath, 'rb') as f:
+		for chunk in iter(lambda: f.read(chunk_size), b''):
+			h.update(chunk)
+
+
+def params_hash(params):
+	"""Hash of the step parameters (JSON serializable).
+
+	Args:
+		params (dict):
+
+	Returns:
+		str: hex digest
+
+	"""
+	return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def checkpoint_key(var_file, **params):
+	"""Checkpoint key: hash of the input variant file content & the workflow parameters.
+
+	Args:
+		var_file (str): input variant file path
+		**params: parameters changing the checkpointed results (build, cols_var, ...)
+
+	Returns:
+		str: hex digest
+
+	"""
+	h = hashlib.sha256()
+	file_hash_helper(var_file, h)
+	h.update(params_hash(dict(params, checkpoint_version=CHECKPOINT_VERSION)).encode('utf-8'))
+	return h.hexdigest()
+
+
+def checkpoint_run_dir(out_dir, out_prefix, key):
+	"""Checkpoint run directory of a key (created if necessary).
+
+	Args:
+		out_dir (str): workflow output directory
+		out_prefix (str):
+		key (str): checkpoint_key
+
+	Returns:
+		str: checkpoint run directory path
+
+	"""
+	run_dir = os.path.join(os.path.abspath(out_dir), out_prefix + CHECKPOINT_DIR_KEY + key[:16])
+	os.makedirs(run_dir, exist_ok=True)
+	return run_dir
+
+
+
+################################################################################
+#### Checkpoint read & write functions
+################################################################################
+
+def read_manifest(run_dir):
+	## completed steps: step --> dict(file, params, timestamp)
+	fpath = os.path.join(run_dir, CHECKPOINT_MANIFEST)
+	if not os.path.exists(fpath):
+		return {}
+	with open(fpath) as f:
+		return json.load(f)
+
+
+def write_manifest(run_dir, manifest):
+	## atomic rename --> a crash never leaves a partial manifest
+	fpath = os.path.join(run_dir, CHECKPOINT_MANIFEST)
+	with open(fpath + '.tmp', 'w') as f:
+		json.dump(manifest, f, indent=2)
+	os.replace(fpath + '.tmp', fpath)
+
+
+def checkpoint_save(run_dir, step, obj, params=None):
+	"""Save a step result (pickle: DataFrames incl. set | list columns) & mark the step completed.
+
+	Args:
+		run_dir (str): checkpoint run directory
+		step (str): step name
+		obj: step result
+		params (dict): step parameters (NOT in the checkpoint key)
+	"""
+	fname = step + '.pkl'
+	fpath = os.path.join(run_dir, fname)
+	with open(fpath + '.tmp', 'wb') as f:
+		pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+	os.replace(fpath + '.tmp', fpath)
+
+	manifest = read_manifest(run_dir)
+	manifest[step] = dict(file=fname, params=params_hash(params or {}),
+	                      timestamp=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+	write_manifest(run_dir, manifest)
+
+
+def checkpoint_completed(run_dir, step, params=None):
+	"""Test if a step was completed (with the same step parameters).
+
+	Args:
+		run_dir (str): checkpoint run directory
+		step (str): step name
+		params (dict): step parameters
+
+	Returns:
+		bool
+
+	"""
+	entry = read_manifest(run_dir).get(step)
+	if entry is None:
+		return False
+	return (entry['params'] == params_hash(params or {})) and \
+		   os.path.exists(os.path.join(run_dir, entry['file']))
+
+
+def checkpoint_load(run_dir, step):
+	"""Load a completed step result.
+
+	Args:
+		run_dir (str): checkpoint run directory
+		step (str): step name
+
+	Returns:
+
+	"""
+	fpath = os.path.join(run_dir, read_manifest(run_dir)[step]['file'])
+	with open(fpath, 'rb') as f:
+		return pickle.load(f)
+
+
+
+################################################################################
+#### Checkpointed step driver function
+################################################################################
+
+def run_step(run_dir, step, resume, fxn, params=None, **kwargs):
+	"""Run a workflow step: load its checkpoint (resume) or run it & save its checkpoint.
+
+	Args:
+		run_dir (str): checkpoint run directory (None: checkpoints disabled)
+		step (str): step name
+		resume (bool): load the step result if the step was completed
+		fxn: step function
+		params (dict): step parameters NOT in the checkpoint key (e.g. output
+			file options) --> re-run the step if they changed
+		**kwargs: fxn arguments
+
+	Returns:
+		step result
+
+	"""
+	if run_dir is None:
+		return fxn(**kwargs)
+
+	if resume and checkpoint_completed(run_dir, step, params=params):
+		print("\t.. resuming: loading '" + step + "' checkpoint")
+		return checkpoint_load(run_dir, step)
+
+	result = fxn(**kwargs)
+	checkpoint_save(run_dir, step, result, params=params)
+	return result
+
+
+
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import pandas as pd
+import csv
 
 # _file_settings = 'clinsig_settings.txt'
 
@@ -17,28 +17,41 @@ COL_ALIAS = 'alias'
 #### Helper functions
 ################################################################################
 
+def read_settings_helper(settings_file, cols_str):
+    ## tab-separated settings --> list of row dicts (csv module: NO pandas import at package load)
+    with open(settings_file, newline='') as f:
+        rows = list(csv.DictReader(f, delimiter='\t'))
+    for row in rows:
+        for c in cols_str:
+            row[c] = (row.get(c) or '').strip()
+    return rows
+
+
 def dict_helper(col_key, col_keylow, col_value):
     _d_orig = dict(zip(col_key, col_value))
     _d_lower = dict(zip(col_keylow, col_value))
     return {**_d_orig, **_d_lower}
 
 
-def clinsig_dict_helper(df, col_key, col_sort=COL_SORT, col_color=COL_COLOR):
-    key_lower = df[col_key].copy().str.lower()
+def clinsig_dict_helper(rows, col_key, col_sort=COL_SORT, col_color=COL_COLOR):
+    key = [row[col_key] for row in rows]
+    key_lower = [k.lower() for k in key]
     ## create dicts
-    sort_dict = dict_helper(df[col_key], key_lower, df[col_sort])
-    color_dict = dict_helper(df[col_key], key_lower, df[col_color])
+    sort_dict = dict_helper(key, key_lower, [row[col_sort] for row in rows])
+    color_dict = dict_helper(key, key_lower, [row[col_color] for row in rows])
     return sort_dict, color_dict
 
 
-def alias_helper(df, col_alias=COL_ALIAS):
+def alias_explode_helper(rows, col_alias=COL_ALIAS):
     ## split & explode alias lists
-    df.loc[:, 'alias2'] = df[col_alias].str.split(', ', expand=False)
-    df = df.explode('alias2')
-    df['alias2'] = df['alias2'].str.strip()
-    
+    return [dict(row, alias2=a.strip()) for row in rows for a in row[col_alias].split(', ')]
+
+
+def alias_helper(rows, col_alias=COL_ALIAS):
+    rows = alias_explode_helper(rows, col_alias)
+
     ## create & return alias clinsig dicts
-    return clinsig_dict_helper(df, col_key='alias2')
+    return clinsig_dict_helper(rows, col_key='alias2')
 
 
 
@@ -47,23 +60,21 @@ def alias_helper(df, col_alias=COL_ALIAS):
 ################################################################################
 
 def create_clinsig_dicts(settings_file, col_label=COL_LABEL, col_sort=COL_SORT, col_color=COL_COLOR, col_alias=COL_ALIAS):
-    _df = pd.read_csv(settings_file, sep='\t')
-
     ## modify columns
-    for c in [col_label, col_color, col_alias]:
-        _df[c] = _df[c].fillna('').astype(str).str.strip()
-    _df[col_sort] = _df[col_sort].astype(int)
-    
+    _rows = read_settings_helper(settings_file, [col_label, col_color, col_alias])
+    for row in _rows:
+        row[col_sort] = int(row[col_sort])
+
     ## generate clinsig dicts with label column
-    dict_sort, dict_color = clinsig_dict_helper(_df, col_key=col_label)
-    
+    dict_sort, dict_color = clinsig_dict_helper(_rows, col_key=col_label)
+
     ## check for aliases & add to dicts
-    alias_df = _df[_df[col_alias] != ''].copy()
-    if alias_df.shape[0] > 0:
-        dict_sort_alias, dict_color_alias = alias_helper(alias_df, col_alias)
+    alias_rows = [row for row in _rows if row[col_alias] != '']
+    if len(alias_rows) > 0:
+        dict_sort_alias, dict_color_alias = alias_helper(alias_rows, col_alias)
         dict_sort.update(dict_sort_alias)
         dict_color.update(dict_color_alias)
-    
+
     return dict_sort, dict_color
 
 
@@ -2,6 +2,8 @@
 
 import os
 
+from clinvar_workflow.helpers import profiling as prof
+
 ## Pandas - setup
 import pandas as pd
 pd.options.mode.chained_assignment = None
@@ -172,6 +174,7 @@ def add_hgvs_id_column(df, cols_var, col_hgvs):
 #### Driver function: run process user inputs
 ################################################################################
 
+@prof.profiled('process_user_inputs')
 def process_user_inputs(var_file, output_dir, build, cols_var, cols_input=None):
 	"""
 
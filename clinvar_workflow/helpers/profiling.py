@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# coding: utf-8
+# profiling.py
+from __future__ import print_function
+import os
+import sys
+import csv
+import json
+import time
+import threading
+import functools
+import contextlib
+
+## Pandas - setup
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+## peak RSS (resource module: NOT available on Windows)
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+## profiling session settings: profile files path prefix (None = profiling disabled)
+##  & call profiler dump: None | 'cprofile' | 'pyinstrument'
+##  --> profile any run without code changes: CLINVAR_WORKFLOW_PROFILE=<path prefix>
+PROFILE = dict(path=os.environ.get('CLINVAR_WORKFLOW_PROFILE'),
+               dump=os.environ.get('CLINVAR_WORKFLOW_PROFILE_DUMP'))
+
+## profile record fields (CSV column order)
+PROFILE_FIELDS = ['stage', 'parent', 'depth', 'thread', 'start_s', 'wall_s', 'cpu_s',
+                  'peak_rss_mb', 'peak_rss_delta_mb', 'rows_in', 'rows_out']
+
+## active session: records & call profiler | per thread stage stack
+_session = dict(active=False, t0=None, records=[], profiler=None)
+_session_lock = threading.Lock()
+_local = threading.local()
+
+
+
+################################################################################
+#### Profiling helper functions
+################################################################################
+
+def peak_rss_mb_helper():
+	## process peak resident set size (MB): Linux kB, macOS bytes
+	if resource is None:
+		return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def rows_helper(obj):
+	"""Row count of a stage input | output: DataFrame, or the first DataFrame of a
+	tuple | list | dict.
+
+	Args:
+		obj:
+
+	Returns:
+		int: row count (None if no DataFrame)
+
+	"""
+	if isinstance(obj, (pd.DataFrame, pd.Series)):
+		return int(len(obj.index))
+	if isinstance(obj, dict):
+		obj = list(obj.values())
+	if isinstance(obj, (list, tuple)):
+		for o in obj:
+			if isinstance(o, (pd.DataFrame, pd.Series)):
+				return int(len(o.index))
+	return None
+
+
+def stage_stack_helper():
+	## stage names of the current thread (outermost first)
+	if not hasattr(_local, 'stack'):
+		_local.stack = []
+	return _local.stack
+
+
+
+################################################################################
+#### Profiling session functions
+################################################################################
+
+def set_profiling(path=None, dump=None):
+	"""Enable (path) or disable (None) stage profiling.
+
+	Args:
+		path (str): profile files path prefix --> <path>.json, <path>.csv
+			(& <path>.prof | <path>.html call profiler dump)
+		dump (str): call profiler dump - None | 'cprofile' | 'pyinstrument'
+	"""
+	if dump not in [None, 'cprofile', 'pyinstrument']:
+		raise ValueError('Unsupported profile dump: ' + str(dump))
+	PROFILE.update(path=path, dump=dump)
+
+
+def start_profiling_session():
+	## reset records, start call profiler (optional)
+	_session.update(active=True, t0=time.perf_counter(), records=[], profiler=None)
+	dump = PROFILE['dump']
+
+	## pyinstrument is optional --> fall back to cProfile
+	if dump == 'pyinstrument':
+		try:
+			import pyinstrument
+			_session['profiler'] = pyinstrument.Profiler()
+			_session['profiler'].start()
+			return
+		except ImportError:
+			print("\tWARNING: pyinstrument NOT installed --> writing cProfile dump")
+			dump = 'cprofile'
+	if dump == 'cprofile':
+		import cProfile
+		_session['profiler'] = cProfile.Profile()
+		_session['profiler'].enable()
+
+
+def stop_profiling_session():
+	"""Stop the session & write the profile files.
+
+	Returns:
+		list: profile records
+
+	"""
+	profiler = _session['profiler']
+	records = sorted(_session['records'], key=lambda r: r['start_s'])
+	_session.update(active=False, profiler=None)
+	path = PROFILE['path']
+	if os.path.dirname(path) != '':
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+
+	## call profiler dump
+	if profiler is not None:
+		if hasattr(profiler, 'enable'):
+			profiler.disable()
+			profiler.dump_stats(path + '.prof')
+		else:
+			profiler.stop()
+			with open(path + '.html', 'w') as f:
+				f.write(profiler.output_html())
+
+	write_profile(records, path)
+	return records
+
+
+def write_profile(records, path):
+	"""Write profile records: JSON (records + summary) & CSV (1 row per stage call).
+
+	Args:
+		records (list): profile record dicts
+		path (str): profile files path prefix
+	"""
+	with open(path + '.json', 'w') as f:
+		json.dump(dict(profile=records, peak_rss_mb=peak_rss_mb_helper()), f, indent=2)
+	with open(path + '.csv', 'w', newline='') as f:
+		writer = csv.DictWriter(f, fieldnames=PROFILE_FIELDS)
+		writer.writeheader()
+		writer.writerows(records)
+	print("\t.. stage profile written to: " + path + '.json, ' + path + '.csv')
+
+
+
+################################################################################
+#### Stage profiling
+################################################################################
+
+@contextlib.contextmanager
+def profile_stage_ctx(stage, rows_in=None):
+	"""Record one stage call: wall & CPU time, peak RSS delta, rows in & out.
+
+	Args:
+		stage (str): stage name
+		rows_in (int): input row count
+
+	Yields:
+		dict: stage record (set 'rows_out')
+
+	"""
+	stack = stage_stack_helper()
+	record = dict(stage=stage, parent=stack[-1] if len(stack) > 0 else None, depth=len(stack),
+	              thread=threading.current_thread().name, rows_in=rows_in, rows_out=None)
+	stack.append(stage)
+	rss0 = peak_rss_mb_helper()
+	cpu0 = time.process_time()
+	t0 = time.perf_counter()
+	try:
+		yield record
+	finally:
+		t1 = time.perf_counter()
+		rss1 = peak_rss_mb_helper()
+		stack.pop()
+		record.update(start_s=round(t0 - _session['t0'], 6), wall_s=round(t1 - t0, 6),
+		              cpu_s=round(time.process_time() - cpu0, 6),
+		              peak_rss_mb=None if rss1 is None else round(rss1, 3),
+		              peak_rss_delta_mb=None if rss1 is None else round(rss1 - rss0, 3))
+		with _session_lock:
+			_session['records'].append(record)
+
+
+def profiled(stage):
+	"""Decorator: profile calls of a workflow step | stage (no-op if profiling is
+	disabled).
+
+	The outermost profiled call starts & ends the profiling session. CPU time is
+	process-wide (includes other threads).
+
+	Args:
+		stage (str): stage name
+
+	Returns:
+
+	"""
+	def profiled_decorator(fxn):
+		@functools.wraps(fxn)
+		def profiled_fxn(*args, **kwargs):
+			if PROFILE['path'] is None:
+				return fxn(*args, **kwargs)
+
+			## outermost profiled call --> profiling session
+			with _session_lock:
+				start_session = not _session['active']
+				if start_session:
+					start_profiling_session()
+			try:
+				rows_in = rows_helper(list(args) + list(kwargs.values()))
+				with profile_stage_ctx(stage, rows_in=rows_in) as record:
+					result = fxn(*args, **kwargs)
+					record['rows_out'] = rows_helper(result)
+			finally:
+				if start_session:
+					stop_profiling_session()
+			return result
+		return profiled_fxn
+	return profiled_decorator
+
+
+
@@ -0,0 +1,100 @@
+# read_outputs.py
+import os
+
+from clinvar_workflow.helpers.write_outputs import parquet_engine_helper
+from clinvar_workflow.helpers import profiling as prof
+
+## Pandas - setup
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+
+## annotation output file extensions, in order of preference (typed Parquet --> text)
+ANNOT_FILE_EXT = ('.parquet', '.txt', '.txt.gz', '.txt.zst')
+
+## annotation output file name keys --> result_dict keys
+ANNOT_FILE_KEYS = {'_ClinVar_variant_summary_':'cv_var_summary_df',
+                   '_ClinVar_variant_full_':'cv_full_df'}
+
+
+
+################################################################################
+#### Read Annotation workflow output files functions
+################################################################################
+
+def find_annotation_file_helper(annot_dir, fname_key, file_ext=ANNOT_FILE_EXT):
+	"""Find an annotation output file: preferred file extension, then latest timestamp.
+
+	Args:
+		annot_dir (str): Annotation output directory (or its 'annotation'
+			sub-directory).
+		fname_key (str): File name key, e.g. '_ClinVar_variant_summary_'.
+		file_ext (tuple): File extensions, in order of preference.
+
+	Returns:
+		str: file path, or None if no file found.
+
+	"""
+	if os.path.isdir(os.path.join(annot_dir, 'annotation')):
+		annot_dir = os.path.join(annot_dir, 'annotation')
+	fnames = sorted(os.listdir(annot_dir), reverse=True)
+
+	## typed Parquet files require pyarrow | fastparquet
+	if not parquet_engine_helper():
+		file_ext = [e for e in file_ext if e != '.parquet']
+
+	for ext in file_ext:
+		fnames_ext = [f for f in fnames if (fname_key in f) and f.endswith(ext)]
+		if len(fnames_ext) > 0:
+			return os.path.join(annot_dir, fnames_ext[0])
+	return None
+
+
+def read_annotation_file_helper(fpath, cols_str=None):
+	"""Read an annotation output file (Parquet | tab-separated text, optionally compressed).
+
+	Args:
+		fpath (str): File path.
+		cols_str (list): Text files: columns kept as strings, e.g. the integer
+			columns cast to strings by the ClinVar query.
+
+	Returns:
+		Pandas DataFrame
+
+	"""
+	if fpath.endswith('.parquet'):
+		return pd.read_parquet(fpath)
+	
+	cols_str = [] if cols_str is None else cols_str
+	return pd.read_csv(fpath, sep='\t', low_memory=False, compression='infer',
+	                   dtype={c:str for c in cols_str})
+
+
+@prof.profiled('read_annotation_output')
+def read_annotation_output(annot_dir, cols_str=None):
+	"""Load the annotation workflow output DataFrames from a previous run.
+
+	Args:
+		annot_dir (str): Annotation output directory.
+		cols_str (list): Text files: columns kept as strings.
+
+	Returns:
+		dict: cv_var_summary_df, cv_full_df
+
+	"""
+	if not os.path.isdir(annot_dir):
+		raise FileNotFoundError('Annotation output directory NOT found: ' + annot_dir)
+
+	result_dict = {}
+	for fname_key, k in ANNOT_FILE_KEYS.items():
+		fpath = find_annotation_file_helper(annot_dir, fname_key)
+		if fpath is None:
+			raise FileNotFoundError('Annotation output file (*' + fname_key + '*) NOT found in: ' + annot_dir)
+		print("\t.. reading " + os.path.basename(fpath))
+		result_dict[k] = read_annotation_file_helper(fpath, cols_str=cols_str)
+	return result_dict
+
+
+
+
+
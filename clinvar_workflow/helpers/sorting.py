@@ -3,10 +3,141 @@
 from clinvar_workflow.helpers import clinsig_sort_dict
 
 ## Pandas - setup
+import re
+import numpy as np
 import pandas as pd
 pd.options.mode.chained_assignment = None
 
 
+## sort rank of clinsig labels NOT in the clinsig settings (before 'UNREPORTED')
+CLINSIG_DEFAULT_RANK = 24
+
+## chromosome natural sort order (other numeric chromosomes follow 22; alt contigs follow MT)
+CHROM_LABELS = [str(c) for c in range(1, 23)] + ['X', 'Y', 'MT']
+CHROM_DTYPE = pd.CategoricalDtype(CHROM_LABELS, ordered=True)
+
+## chromosome label (case-insensitive, 'chr' prefix removed) --> CHROM_LABELS label
+CHROM_ALIASES = dict({c.lower():c for c in CHROM_LABELS}, m='MT')
+
+
+################################################################################
+#### clinsig ordered categorical dtype functions
+################################################################################
+
+def create_clinsig_dtype(clinsig_dict=clinsig_sort_dict, extra_labels=()):
+	"""Ordered CategoricalDtype of the clinsig labels & aliases (by sort rank;
+	settings file order within a rank).
+
+	Args:
+		clinsig_dict: clinsig label|alias --> sort rank
+		extra_labels: labels NOT in clinsig_dict --> CLINSIG_DEFAULT_RANK
+
+	Returns:
+		pd.CategoricalDtype
+
+	"""
+	ranked = list(clinsig_dict.items()) + [(c, CLINSIG_DEFAULT_RANK) for c in extra_labels]
+	ranked = sorted(ranked, key=lambda kv: kv[1])
+	return pd.CategoricalDtype([c for c, rank in ranked], ordered=True)
+
+
+## shared clinsig dtype: sorting & storage of clinsig columns
+CLINSIG_DTYPE = create_clinsig_dtype(clinsig_sort_dict)
+
+
+def clinsig_categorical(values, clinsig_dict=clinsig_sort_dict):
+	"""Clinsig values --> ordered Categorical Series (CLINSIG_DTYPE; unknown
+	labels are added at CLINSIG_DEFAULT_RANK).
+
+	Args:
+		values: list | Series | Index of clinsig labels
+		clinsig_dict:
+
+	Returns:
+		pd.Series (category)
+
+	"""
+	values = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values
+	dtype = CLINSIG_DTYPE if clinsig_dict is clinsig_sort_dict else create_clinsig_dtype(clinsig_dict)
+	
+	## labels NOT in the clinsig settings (& NOT missing values)
+	unknown = pd.unique(values[~values.isin(dtype.categories) & values.notnull()])
+	if len(unknown) > 0:
+		dtype = create_clinsig_dtype(clinsig_dict, extra_labels=unknown)
+	return values.astype(dtype)
+
+
+################################################################################
+#### chromosome ordered categorical & coordinate sorting functions
+################################################################################
+
+def chrom_label_helper(c):
+	## chromosome value (int | str) --> CHROM_LABELS label (alt contigs: unchanged)
+	c = str(c).strip()
+	label = CHROM_ALIASES.get(re.sub('^chr', '', c, flags=re.IGNORECASE).lower())
+	if label is not None:
+		return label
+	return str(int(c)) if c.isnumeric() else c
+
+
+def chrom_extra_key_helper(c):
+	## extra chromosome labels: numeric (numerically) before alt contigs (by name)
+	return (0, int(c), '') if c.isnumeric() else (1, 0, c)
+
+
+def chrom_categorical(values):
+	"""Chromosome values (1 | '1' | 'chr1' | 'X' | 'chrM' | alt contigs) --> ordered
+	Categorical (CHROM_DTYPE, extended with any other numeric chromosomes & alt contigs).
+
+	Labels are computed once per distinct value (factorize), NOT per row.
+
+	Args:
+		values: chromosome Series | array
+
+	Returns:
+		pd.Categorical (missing values: NaN)
+
+	"""
+	codes, uniq = pd.factorize(np.asarray(values, dtype=object))
+	labels = [chrom_label_helper(u) for u in uniq]
+	
+	## extra categories: numeric after '22' & alt contigs after 'MT'
+	dtype = CHROM_DTYPE
+	extra = sorted(set(labels) - set(CHROM_LABELS), key=chrom_extra_key_helper)
+	if len(extra) > 0:
+		extra_num = [c for c in extra if c.isnumeric()]
+		extra_alt = [c for c in extra if not c.isnumeric()]
+		dtype = pd.CategoricalDtype(CHROM_LABELS[:22] + extra_num + CHROM_LABELS[22:] + extra_alt,
+		                            ordered=True)
+	uniq_codes = pd.Categorical(labels, dtype=dtype).codes
+	return pd.Categorical.from_codes(np.where(codes >= 0, uniq_codes[codes], -1), dtype=dtype)
+
+
+def coordinate_sort_indexer(chrom, pos):
+	"""Stable sort indexer by chromosome (natural order) & position - one
+	vectorized multi-key sort, NO sort columns.
+
+	Args:
+		chrom: chromosome Series | array
+		pos: position Series | array
+
+	Returns:
+		np.ndarray: row positions (None if already coordinate-sorted)
+
+	"""
+	if len(chrom) < 2:
+		return None
+	chrom_codes = chrom_categorical(chrom).codes.astype(np.int64)
+	chrom_codes[chrom_codes < 0] = chrom_codes.max() + 1  ## missing chromosomes last
+	pos = np.asarray(pos)
+	
+	## already sorted --> skip sort
+	d_chrom = np.diff(chrom_codes)
+	if np.all((d_chrom > 0) | ((d_chrom == 0) & (pos[1:] >= pos[:-1]))):
+		return None
+	return np.lexsort((pos, chrom_codes))
+
+
 ################################################################################
 #### clinsig column / list sorting functions
 ################################################################################
@@ -22,8 +153,16 @@ def sort_clinsig(clinsig_unsorted_list, clinsig_dict=clinsig_sort_dict, reverse=
 	Returns:
 
 	"""
-	return sorted(clinsig_unsorted_list, reverse=reverse,
-				  key=lambda x: clinsig_dict[x] if x in clinsig_dict else 24)
+	clinsig_list = list(clinsig_unsorted_list)
+	clinsig_cat = clinsig_categorical(clinsig_list, clinsig_dict)
+	
+	## stable sort by the rank of the categories: labels of the same rank keep their
+	##  input order (as sorted()), NOT the category order; missing values (code -1) --> default rank
+	cat_rank = np.array([clinsig_dict.get(c, CLINSIG_DEFAULT_RANK) for c in clinsig_cat.cat.categories]
+	                    + [CLINSIG_DEFAULT_RANK], dtype=float)
+	clinsig_rank = cat_rank[clinsig_cat.cat.codes.values]
+	order = np.argsort(-clinsig_rank if reverse else clinsig_rank, kind='stable')
+	return [clinsig_list[i] for i in order]
 
 
 def sort_and_extract_clinsig(clinsig_unsorted_list, clinsig_dict=clinsig_sort_dict, reverse=False):
@@ -37,9 +176,8 @@ def sort_and_extract_clinsig(clinsig_unsorted_list, clinsig_dict=clinsig_sort_di
 	Returns:
 
 	"""
-	clinsig_unsorted_list2 = [c for c in clinsig_unsorted_list if c in clinsig_dict]
-	return sorted(clinsig_unsorted_list2, reverse=reverse,
-	              key=lambda x: clinsig_dict[x])
+	clinsig_list = pd.Series(list(clinsig_unsorted_list), dtype=object)
+	return sort_clinsig(clinsig_list[clinsig_list.isin(list(clinsig_dict))], clinsig_dict, reverse=reverse)
 
 
 ################################################################################
@@ -58,8 +196,10 @@ def sort_clinsig_df_col(df, clinsig_col, clinsig_dict=clinsig_sort_dict, reverse
 	Returns:
 
 	"""
-	return df.loc[df[clinsig_col].map(clinsig_dict).sort_values(
-		ascending=reverse).index].reset_index(drop=True).copy()
+	## clinsig column stored as the ordered categorical --> native sort
+	df = df.copy()
+	df[clinsig_col] = clinsig_categorical(df[clinsig_col], clinsig_dict)
+	return df.sort_values(clinsig_col, ascending=reverse, kind='mergesort').reset_index(drop=True)
 
 
 def sort_grouped_count_df_total(count_df, ascending=True):
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# coding: utf-8
+# spill.py
+from __future__ import print_function
+import os
+import re
+import json
+import pickle
+
+## Pandas - setup
+import numpy as np
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+
+## spilled frame metadata file name
+SPILL_META = 'columns.json'
+
+## memory size units (bytes)
+MEMORY_UNITS = {'': 1, 'B': 1, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+
+
+################################################################################
+#### Memory budget functions
+################################################################################
+
+def parse_memory_size(size):
+	"""Memory size --> bytes.
+
+	Args:
+		size: bytes (int) | str: '512M', '4G', '1.5GB', '800000'
+
+	Returns:
+		int: bytes (None if size is None)
+
+	"""
+	if size is None or isinstance(size, (int, np.integer)):
+		return size
+	m = re.match(r'^\s*([0-9.]+)\s*([KMGT]?)(?:I?B)?\s*$', str(size).upper())
+	if m is None:
+		raise ValueError('Unsupported memory size: ' + str(size) + " (e.g. '512M', '4G')")
+	return int(float(m.group(1)) * MEMORY_UNITS[m.group(2)])
+
+
+def frame_memory_bytes(df):
+	## DataFrame memory (object columns: deep)
+	return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def result_memory_bytes(result_dict, keys=('cv_var_summary_df', 'cv_full_df')):
+	## memory of the result DFs (process_clinvar_query result dict)
+	return sum(frame_memory_bytes(result_dict[k]) for k in keys)
+
+
+
+################################################################################
+#### Spill (column files) read & write functions
+################################################################################
+
+def spill_frame(df, spill_dir, name):
+	"""Write a DataFrame to a spill directory: 1 file per column (pickled Series:
+	dtype & set | list values round-trip exactly).
+
+	Args:
+		df: DataFrame (index is NOT kept)
+		spill_dir (str): spill directory
+		name (str): spilled frame name
+
+	Returns:
+		str: spilled frame directory path
+
+	"""
+	fdir = os.path.join(spill_dir, name)
+	os.makedirs(fdir, exist_ok=True)
+	for i, c in enumerate(df.columns):
+		with open(os.path.join(fdir, 'col_%05d.pkl' % i), 'wb') as f:
+			pickle.dump(df[c].reset_index(drop=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+	with open(os.path.join(fdir, SPILL_META), 'w') as f:
+		json.dump(dict(columns=df.columns.tolist(), rows=len(df.index)), f)
+	return fdir
+
+
+def spilled_frame_meta(fdir):
+	## spilled frame columns & row count
+	with open(os.path.join(fdir, SPILL_META)) as f:
+		return json.load(f)
+
+
+def load_spilled_column(fdir, col, meta=None):
+	"""Load one column of a spilled frame.
+
+	Args:
+		fdir (str): spilled frame directory
+		col: column name
+		meta (dict): spilled_frame_meta (read if None)
+
+	Returns:
+		Series (None if the frame has NO such column)
+
+	"""
+	meta = spilled_frame_meta(fdir) if meta is None else meta
+	if col not in meta['columns']:
+		return None
+	with open(os.path.join(fdir, 'col_%05d.pkl' % meta['columns'].index(col)), 'rb') as f:
+		return pickle.load(f)
+
+
+def load_spilled_frame(fdir):
+	"""Load a spilled frame (all columns).
+
+	Args:
+		fdir (str): spilled frame directory
+
+	Returns:
+		DataFrame
+
+	"""
+	meta = spilled_frame_meta(fdir)
+	return pd.DataFrame({c: load_spilled_column(fdir, c, meta=meta) for c in meta['columns']},
+	                    columns=meta['columns'])
+
+
+
+################################################################################
+#### Spilled row blocks (out-of-core merge) functions
+################################################################################
+
+class SpilledFrame(object):
+	"""DataFrame spilled to disk in row blocks (1 spilled frame per block): rows are
+	read back by position, loading ONLY the blocks they span.
+
+	Sequential reads (k-way merge of sorted frames) keep 1 block in memory.
+
+	Args:
+		block_dirs (List[str]): spilled frame directory of each row block
+		block_rows (List[int]): number of rows of each row block
+		columns (list): column names
+	"""
+
+	def __init__(self, block_dirs, block_rows, columns):
+		self.block_dirs = block_dirs
+		self.block_starts = np.concatenate([[0], np.cumsum(block_rows)]).astype(np.int64)
+		self.columns = list(columns)
+		self._block_i, self._block_df = None, None
+
+	def __len__(self):
+		return int(self.block_starts[-1])
+
+	def _load_block(self, i):
+		if self._block_i != i:
+			self._block_i, self._block_df = i, load_spilled_frame(self.block_dirs[i])
+		return self._block_df
+
+	def read_rows(self, start, stop):
+		"""Rows start:stop (row positions, stop > start) --> DataFrame (RangeIndex)."""
+		first = int(np.searchsorted(self.block_starts, start, side='right')) - 1
+		last = int(np.searchsorted(self.block_starts, stop, side='left')) - 1
+		parts = []
+		for i in range(first, last + 1):
+			b0 = self.block_starts[i]
+			parts.append(self._load_block(i).iloc[max(start - b0, 0):stop - b0])
+		return parts[0].reset_index(drop=True) if len(parts) == 1 else \
+			   pd.concat(parts, axis=0, ignore_index=True, sort=False)
+
+
+def spill_frame_blocks(df, spill_dir, name, bounds):
+	"""Spill a DataFrame in row blocks.
+
+	Args:
+		df: DataFrame (index is NOT kept)
+		spill_dir (str): spill directory
+		name (str): spilled frame name
+		bounds: block (start, stop) row positions
+
+	Returns:
+		SpilledFrame
+
+	"""
+	block_dirs = [spill_frame(df.iloc[start:stop], spill_dir, name + '_%05d' % i)
+	              for i, (start, stop) in enumerate(bounds)]
+	return SpilledFrame(block_dirs, [stop - start for start, stop in bounds], df.columns)
+
+
+def representative_row(df):
+	"""1 row DataFrame: first non-missing value of each column (all-missing columns: missing).
+
+	pd.concat of the representative rows of DataFrames has the same column dtypes as
+	pd.concat of the DataFrames (all-missing columns do NOT change the common dtype)
+	--> dtypes of out-of-core merged frames.
+
+	Args:
+		df: DataFrame (at least 1 row)
+
+	Returns:
+		DataFrame
+
+	"""
+	data = {}
+	for c in df.columns:
+		notnull = np.flatnonzero(df[c].notnull().values)
+		data[c] = df[c].iloc[[notnull[0] if len(notnull) > 0 else 0]].reset_index(drop=True)
+	return pd.DataFrame(data, columns=df.columns)
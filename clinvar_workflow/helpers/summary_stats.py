@@ -3,42 +3,132 @@
 from clinvar_workflow.helpers import sorting as sort
 
 ## Pandas - setup
+import numpy as np
 import pandas as pd
 pd.options.mode.chained_assignment = None
 
 
 
 
+################################################################################
+#### categorical code counting helper functions
+################################################################################
+
+def count_codes_helper(df, cols, sort_cols):
+	"""Factorize DF columns --> integer codes (-1 = missing) & categories.
+
+	Args:
+		df:
+		cols:
+		sort_cols: columns with sorted categories (e.g. group columns)
+
+	Returns:
+		tuple: (list of code arrays, list of category Indexes)
+
+	"""
+	codes, cats = [], []
+	for c in cols:
+		c_codes, c_cats = pd.factorize(df[c], sort=(c in sort_cols))
+		codes.append(c_codes.astype(np.int64))
+		cats.append(pd.Index(c_cats, name=c))
+	return codes, cats
+
+
+def count_distinct_codes(grp_codes, grp_sizes, cnt_codes, cnt_size):
+	"""Count distinct count-column codes per group (2D bincount over group codes).
+	
+	Deduplicate (group(s), count) code combinations --> bincount the groups.
+
+	Args:
+		grp_codes: list of group column code arrays
+		grp_sizes: list of # of categories per group column
+		cnt_codes: count column code array
+		cnt_size: # of count column categories
+
+	Returns:
+		tuple: (counts array shaped grp_sizes, observed groups Boolean array)
+
+	"""
+	n_grp = int(np.prod(grp_sizes))
+	
+	## combined group key (rows with missing group values are dropped)
+	mask_grp = np.logical_and.reduce([c >= 0 for c in grp_codes])
+	grp_key = np.zeros(int(mask_grp.sum()), dtype=np.int64)
+	for c, n in zip(grp_codes, grp_sizes):
+		grp_key = grp_key * n + c[mask_grp]
+	observed = np.bincount(grp_key, minlength=n_grp) > 0
+	
+	## distinct (group, count) keys --> # of distinct count values per group
+	cnt = cnt_codes[mask_grp]
+	key = np.unique(grp_key[cnt >= 0] * cnt_size + cnt[cnt >= 0])
+	counts = np.bincount(key // max(cnt_size, 1), minlength=n_grp)
+	return counts.reshape(grp_sizes), observed.reshape(grp_sizes)
+
+
 ################################################################################
 #### count DF for exploratory analysis functions
 ################################################################################
 
 ## convert full variant DF --> count DF for plotting
-def generate_count_df(df, cnt_col='', grp_cols=None):
+def generate_count_df(df, cnt_col='', grp_cols=None, engine='codes', sparse=False):
 	"""
 
 	Args:
 		df:
 		cnt_col:
 		grp_cols:
+		engine: 'codes' (categorical codes + bincount) | 'groupby' (groupby + pivot_table)
+		sparse: return sparse count columns (2 grp_cols only)
 
 	Returns:
 
 	"""
-	## group DF --> get aggregate counts
-	df2 = df.groupby(grp_cols)[cnt_col]\
-			.agg([('nuniq', 'nunique')])\
-			.reset_index()
-
-	## reshape/pivot DF if plotting per gene | condition
-	if len(grp_cols) > 1:
-		df2 = df2.pivot_table(index=grp_cols[0], columns=grp_cols[1],
-		                      values='nuniq', fill_value=0)
+	if engine == 'groupby':
+		## group DF --> get aggregate counts
+		df2 = df.groupby(grp_cols)[cnt_col]\
+				.agg([('nuniq', 'nunique')])\
+				.reset_index()
+	
+		## reshape/pivot DF if plotting per gene | condition
+		if len(grp_cols) > 1:
+			df2 = df2.pivot_table(index=grp_cols[0], columns=grp_cols[1],
+			                      values='nuniq', fill_value=0)
+	else:
+		df2 = generate_count_df_codes(df, cnt_col=cnt_col, grp_cols=grp_cols)
+	
+	## empty pivot (NO columns) --> NO dtype to make sparse
+	if sparse and (len(grp_cols) > 1) and (df2.shape[1] > 0):
+		df2 = df2.astype(pd.SparseDtype(df2.dtypes.iloc[0], 0))
 	return df2
 
 
-def generate_grouped_count_df(df, col_group, col_clinsig, col_count):
+def generate_count_df_codes(df, cnt_col, grp_cols):
+	"""Same count DF as groupby(grp_cols).nunique() (+ pivot_table), from integer codes.
+
+	Args:
+		df:
+		cnt_col:
+		grp_cols: 1 or 2 group columns
+
+	Returns:
+
 	"""
+	codes, cats = count_codes_helper(df, grp_cols + [cnt_col], sort_cols=grp_cols)
+	counts, observed = count_distinct_codes(codes[:-1], [len(c) for c in cats[:-1]],
+	                                        codes[-1], len(cats[-1]))
+	
+	## 1 group column: long format DF
+	if len(grp_cols) == 1:
+		return pd.DataFrame({grp_cols[0]:cats[0][observed], 'nuniq':counts[observed]})
+	
+	## 2 group columns: wide (pivoted) DF --> drop unobserved rows & columns
+	rows, cols = observed.any(axis=1), observed.any(axis=0)
+	return pd.DataFrame(counts[rows][:, cols], index=cats[0][rows],
+	                    columns=cats[1][cols])
+
+
+def grouped_count_codes(df, col_group, col_clinsig, col_count):
+	"""Distinct col_count counts per (group, clinsig) as a 2D array (before any pivot/sort).
 
 	Args:
 		df:
@@ -46,19 +136,184 @@ def generate_grouped_count_df(df, col_group, col_clinsig, col_count):
 		col_clinsig:
 		col_count:
 
+	Returns:
+		tuple: (counts array, group Index, clinsig Index) - observed rows & columns only
+
+	"""
+	codes, cats = count_codes_helper(df, [col_group, col_clinsig, col_count],
+	                                 sort_cols=[col_group, col_clinsig])
+	counts, observed = count_distinct_codes(codes[:-1], [len(c) for c in cats[:-1]],
+	                                        codes[-1], len(cats[-1]))
+	rows, cols = observed.any(axis=1), observed.any(axis=0)
+	return counts[rows][:, cols], cats[0][rows], cats[1][cols]
+
+
+def other_label_helper(other_label, idx_group):
+	## remaining groups row label: NOT a real group ('Other' group --> 'Other (2)', ...)
+	label, i, groups = other_label, 1, set(idx_group)
+	while label in groups:
+		i += 1
+		label = other_label + ' (' + str(i) + ')'
+	if label != other_label:
+		print("\tWARNING: '" + other_label + "' is a group --> remaining groups row: '" + label + "'")
+	return label
+
+
+def grouped_count_df_from_codes(counts, idx_group, idx_clinsig, top_n=None,
+                                exclude=None, other_label=None, sparse=False):
+	"""Grouped count DF (Total + sorted clinsig columns) from grouped_count_codes output.
+	
+	If top_n: select the top N groups by Total (ties alphabetically)
+	before building the DF, optionally summing the remaining groups into an
+	other_label row.
+
+	Args:
+		counts:
+		idx_group:
+		idx_clinsig:
+		top_n:
+		exclude: group values to drop before selecting top N
+		other_label: label of the remaining groups row (top_n only; NOT a group
+			value, see other_label_helper)
+		sparse: return sparse clinsig count columns (e.g. many conditions)
+
 	Returns:
 
 	"""
-	## generate initial count DF
-	count_df = generate_count_df(df, cnt_col=col_count,
-	                             grp_cols=[col_group, col_clinsig])
+	if (top_n is not None) and (other_label is not None) and (other_label in set(idx_group)):
+		raise ValueError("other_label '" + str(other_label) + "' is a group value")
 	
-	## add Total column & sort rows
-	count_df = sort.sort_grouped_count_df_total(count_df)
+	## Total per group (all clinsig columns)
+	total = counts.sum(axis=1)
+	keep = ~idx_group.isin(exclude) if exclude else np.ones(len(idx_group), dtype=bool)
+	
+	## sort rows: 1) Total (descending) & 2) alphabetically
+	##  (groups are already sorted alphabetically --> stable sort, then top N)
+	order = np.flatnonzero(keep)
+	order = order[np.argsort(-total[order], kind='stable')]
+	if top_n is not None:
+		order = order[:top_n]
+	
+	count_df = pd.DataFrame(counts[order], index=idx_group[order], columns=idx_clinsig)
+	count_df['Total'] = total[order]
+	
+	## sum remaining groups --> other row
+	if (top_n is not None) and (other_label is not None):
+		rest = np.setdiff1d(np.flatnonzero(keep), order)
+		if len(rest) > 0:
+			other_df = pd.DataFrame([np.append(counts[rest].sum(axis=0), total[rest].sum())],
+			                        index=pd.Index([other_label], name=count_df.index.name),
+			                        columns=count_df.columns)
+			count_df = pd.concat([count_df, other_df], axis=0)
 	
 	## reorder Clinical Significance columns
 	cols_clinsig_sort = sort.sort_and_extract_clinsig(count_df.columns.tolist(), reverse=False)
-	return count_df[['Total'] + cols_clinsig_sort]
+	count_df = count_df[['Total'] + cols_clinsig_sort]
+	
+	if sparse:
+		count_df[cols_clinsig_sort] = count_df[cols_clinsig_sort]\
+										.astype(pd.SparseDtype(count_df['Total'].dtype, 0))
+	return count_df
+
+
+def generate_grouped_count_df(df, col_group, col_clinsig, col_count, sparse=False,
+                              top_n=None, exclude=None, other_label=None):
+	"""
+
+	Args:
+		df:
+		col_group:
+		col_clinsig:
+		col_count:
+		sparse: return sparse clinsig count columns (e.g. many conditions)
+		top_n: only pivot the top N groups by Total
+		exclude: group values to drop before selecting top N
+		other_label: label of the remaining groups row (top_n only; a group with
+			this label --> unique label, see other_label_helper)
+
+	Returns:
+
+	"""
+	## generate initial counts
+	counts, idx_group, idx_clinsig = grouped_count_codes(df, col_group=col_group,
+	                                                     col_clinsig=col_clinsig,
+	                                                     col_count=col_count)
+	if (top_n is not None) and (other_label is not None):
+		other_label = other_label_helper(other_label, idx_group)
+	
+	## add Total column, sort rows & reorder Clinical Significance columns
+	return grouped_count_df_from_codes(counts, idx_group, idx_clinsig, top_n=top_n,
+	                                   exclude=exclude, other_label=other_label,
+	                                   sparse=sparse)
+
+
+
+################################################################################
+#### mergeable partial aggregate functions
+################################################################################
+
+## exploratory counts are all distinct counts --> exact distinct (key(s), id) tables
+##  per partition (chunk | file) can be merged & counted with the same functions
+def partial_agg_cols(col_id, col_clinsig, col_cond='condition', col_gene='gene'):
+	"""Partial aggregate name --> distinct columns (key(s), id).
+
+	Args:
+		col_id:
+		col_clinsig:
+		col_cond:
+		col_gene:
+
+	Returns:
+		dict
+
+	"""
+	return {'input':[col_id],
+	        'clinvar_status':['clinvar_status', col_id],
+	        'gene':[col_gene],
+	        'condition':[col_cond],
+	        'clinsig_var':[col_clinsig, col_id],
+	        'clinsig_rcv':[col_clinsig+'.rcv', col_id],
+	        'clinsig_var_gene':[col_gene, col_clinsig, col_id],
+	        'clinsig_var_cond':[col_cond, col_clinsig, col_id]}
+
+
+def generate_partial_aggs(df, agg_cols, input_df=None):
+	"""Distinct (key(s), id) tables for one partition of the visualization DF.
+
+	Args:
+		df: visualization DF (partition)
+		agg_cols: partial_agg_cols dict
+		input_df: input variant DF (partition) for the 'input' aggregate
+
+	Returns:
+		dict: partial aggregate name --> distinct DF
+
+	"""
+	partial_dict = {}
+	for k, cols in agg_cols.items():
+		src_df = input_df if k == 'input' else df
+		if src_df is None:
+			continue
+		partial_dict[k] = src_df[cols].drop_duplicates(ignore_index=True)
+	return partial_dict
+
+
+def merge_partial_aggs(partial_list):
+	"""Merge partial aggregates (union of the distinct tables).
+
+	Args:
+		partial_list: list of generate_partial_aggs dicts
+
+	Returns:
+		dict: partial aggregate name --> distinct DF
+
+	"""
+	keys = []
+	for p in partial_list:
+		keys += [k for k in p.keys() if k not in keys]
+	return {k: pd.concat([p[k] for p in partial_list if k in p], axis=0, ignore_index=True)\
+				.drop_duplicates(ignore_index=True)
+			for k in keys}
 
 
 
@@ -1,7 +1,86 @@
 # write_outputs.py
 
 import os
+import gzip
+import html
+import json
+import queue
+import sqlite3
+import threading
+from string import Template
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from clinvar_workflow.helpers import profiling as prof
+
+## Pandas - setup
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+
+## Excel worksheet limits
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_SHEET_NAME = 31
+
+## compressed text file extensions
+COMPRESSION_EXT = {'gzip':'.gz', 'zstd':'.zst'}
+
+## results database: indexed columns (if present in table)
+DB_INDEX_COLS = ['gene.symbol', 'conditions.name', 'clinical_significance',
+                 'clinical_significance.rcv']
+
+## HTML report: ONE inlined plotly.js, figures & tables embedded as JSON (rendered client-side)
+REPORT_HTML_TEMPLATE = Template('''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>$title</title>
+<style>
+body {font-family: sans-serif; margin: 20px 40px; color: #333;}
+h2 {border-bottom: 1px solid #E1E5ED; padding-bottom: 4px; margin-top: 40px;}
+table {border-collapse: collapse; font-size: 12px; margin: 10px 0;}
+th {background: grey; color: white; padding: 4px 8px; text-align: left;}
+td {padding: 3px 8px; border-bottom: 1px solid #E1E5ED;}
+tr:nth-child(even) td {background: #F4F4F4;}
+</style>
+<script type="text/javascript">$plotlyjs</script>
+</head>
+<body>
+<h1>$title</h1>
+<div id="report"></div>
+<script type="application/json" id="report-data">$data</script>
+<script type="text/javascript">
+var data = JSON.parse(document.getElementById('report-data').textContent);
+var report = document.getElementById('report');
+function addSection(title) {
+	var h = document.createElement('h2');
+	h.textContent = title;
+	report.appendChild(h);
+	var div = document.createElement('div');
+	report.appendChild(div);
+	return div;
+}
+data.figures.forEach(function(f) {
+	Plotly.newPlot(addSection(f.title), f.figure.data, f.figure.layout, {displaylogo: false});
+});
+data.tables.forEach(function(t) {
+	var table = document.createElement('table');
+	var row = table.insertRow();
+	t.columns.forEach(function(c) {
+		var th = document.createElement('th');
+		th.textContent = c;
+		row.appendChild(th);
+	});
+	t.data.forEach(function(r) {
+		var row = table.insertRow();
+		r.forEach(function(v) { row.insertCell().textContent = (v === null) ? '' : v; });
+	});
+	addSection(t.title).appendChild(table);
+});
+</script>
+</body>
+</html>
+''')
 
 
 ################################################################################
@@ -20,7 +99,8 @@ def write_output_dir_helper(out_path, out_prefix, workflow_str):
 	return out_path2, timestamp
 
 
-def write_df_file_helper(df, fname, out_dir, header=True, index=False, excel=True):
+def write_df_file_helper(df, fname, out_dir, header=True, index=False, excel=True,
+                         executor=None, compression=None):
 	"""
 	
 	Args:
@@ -30,16 +110,536 @@ def write_df_file_helper(df, fname, out_dir, header=True, index=False, excel=Tru
 		excel:
 		header:
 		index:
+		executor: optional thread pool - submit the file writes instead of
+			writing them in the current thread
+		compression: compress the text file - None | 'gzip' | 'zstd'
 
 	Returns:
+		List[Future]: submitted file writes (empty if executor is None)
 
 	"""
 	## write tab-separated text file
-	df.to_csv(os.path.join(out_dir, fname + '.txt'), header=header, index=index, sep='\t')
+	futures = write_task_helper(executor, write_csv_helper, df, os.path.join(out_dir, fname + '.txt'),
+	                            compression=compression, header=header, index=index, sep='\t')
 	
 	## write excel file
 	if excel:
-		df.to_excel(os.path.join(out_dir, fname + '.xlsx'), header=header, index=index, merge_cells=False)
+		futures += write_task_helper(executor, write_excel_workbook_helper,
+		                             [[df, 'Sheet1', header, index]],
+		                             os.path.join(out_dir, fname + '.xlsx'))
+	return futures
+
+
+
+################################################################################
+#### Compressed text file helper functions
+################################################################################
+
+class BackgroundCompressWriter(object):
+	"""Text file object that compresses & writes to disk in a background thread.
+	
+	Text written by pandas is buffered & handed over to a writer thread in
+	~1 MB blocks, so DataFrame serialization (main thread) and compression +
+	disk writes (writer thread, zlib/zstd release the GIL) run concurrently.
+
+	Args:
+		fpath (str): Output file path.
+		compression (str): 'gzip' | 'zstd' (requires the zstandard package).
+		level (int): Compression level (None --> library default).
+		encoding (str): Text encoding.
+		block_size (int): Number of characters buffered per block.
+		max_blocks (int): Max number of blocks waiting to be compressed.
+	"""
+	mode = 'w'
+	
+	def __init__(self, fpath, compression='gzip', level=None, encoding='utf-8',
+				 block_size=1<<20, max_blocks=16):
+		self.encoding = encoding
+		self._block_size = block_size
+		self._buf, self._buf_len = [], 0
+		self._error = None
+		
+		## open compressed output stream
+		self._raw = open(fpath, 'wb')
+		if compression == 'zstd':
+			import zstandard
+			self._stream = zstandard.ZstdCompressor(level=level if level is not None else 3)\
+									.stream_writer(self._raw, closefd=False)
+		elif compression == 'gzip':
+			self._stream = gzip.GzipFile(fileobj=self._raw, mode='wb',
+										 compresslevel=level if level is not None else 6)
+		else:
+			self._raw.close()
+			raise ValueError('Unsupported compression: ' + str(compression))
+		
+		## start background compression thread
+		self._queue = queue.Queue(maxsize=max_blocks)
+		self._thread = threading.Thread(target=self._compress_blocks, daemon=True)
+		self._thread.start()
+	
+	def _compress_blocks(self):
+		while True:
+			block = self._queue.get()
+			if block is None:
+				return
+			if self._error is None:
+				try:
+					self._stream.write(block.encode(self.encoding))
+				except Exception as e:
+					self._error = e
+	
+	def _flush_block(self):
+		if self._buf_len > 0:
+			self._queue.put(''.join(self._buf))
+			self._buf, self._buf_len = [], 0
+	
+	def write(self, s):
+		if self._error is not None:
+			raise self._error
+		self._buf.append(s)
+		self._buf_len += len(s)
+		if self._buf_len >= self._block_size:
+			self._flush_block()
+		return len(s)
+	
+	def flush(self):
+		pass
+	
+	def close(self):
+		if self._thread.is_alive():
+			self._flush_block()
+			self._queue.put(None)
+			self._thread.join()
+			try:
+				self._stream.close()
+			finally:
+				self._raw.close()
+		if self._error is not None:
+			raise self._error
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_value, tb):
+		self.close()
+
+
+def write_csv_helper(df, fpath, compression=None, **kwargs):
+	"""Write DataFrame to text file, optionally compressed in a background thread.
+
+	Args:
+		df (Pandas DataFrame): DataFrame to write.
+		fpath (str): Output file path (compression extension is appended).
+		compression (str): None | 'gzip' | 'zstd'.
+		**kwargs: DataFrame.to_csv keyword arguments.
+	"""
+	if compression is None:
+		df.to_csv(fpath, **kwargs)
+		return
+	
+	with text_writer_helper(fpath, compression) as f:
+		df.to_csv(f, **kwargs)
+
+
+def text_writer_helper(fpath, compression=None):
+	"""Open a text output file, optionally compressed in a background thread.
+
+	Args:
+		fpath (str): Output file path (compression extension is appended).
+		compression (str): None | 'gzip' | 'zstd'.
+
+	Returns:
+		file object (text)
+	"""
+	if compression is None:
+		return open(fpath, 'w', encoding='utf-8', newline='')
+	
+	## zstd requires the zstandard package --> fall back to gzip
+	if compression == 'zstd':
+		try:
+			import zstandard
+		except ImportError:
+			print("\tWARNING: zstandard NOT installed --> writing gzip compressed file")
+			compression = 'gzip'
+	return BackgroundCompressWriter(fpath + COMPRESSION_EXT[compression], compression)
+
+
+
+################################################################################
+#### Parquet file helper functions
+################################################################################
+
+def parquet_engine_helper():
+	"""Test if a pandas Parquet engine (pyarrow | fastparquet) can be imported.
+
+	Returns:
+		bool: True if DataFrame.to_parquet / pd.read_parquet are available.
+
+	"""
+	try:
+		pd.io.parquet.get_engine('auto')
+	except ImportError:
+		return False
+	return True
+
+
+def write_parquet_helper(df, fpath):
+	"""Write DataFrame to a typed Parquet file (container columns as strings).
+
+	Args:
+		df (Pandas DataFrame): DataFrame to write (not modified).
+		fpath (str): Output file path.
+	"""
+	format_container_cols_df(df.copy()).to_parquet(fpath, index=False)
+
+
+
+################################################################################
+#### Parallel write helper functions
+################################################################################
+
+def write_task_helper(executor, fxn, *args, **kwargs):
+	"""Run a file write now, or submit it to the executor.
+
+	Args:
+		executor (ThreadPoolExecutor): Thread pool, or None to write in the
+			current thread.
+		fxn (callable): File writing function.
+		*args: fxn arguments.
+		**kwargs: fxn keyword arguments.
+
+	Returns:
+		List[Future]: [submitted write] or [] if executor is None.
+
+	"""
+	if executor is None:
+		fxn(*args, **kwargs)
+		return []
+	return [executor.submit(fxn, *args, **kwargs)]
+
+
+def fsync_output_dir_helper(out_dir):
+	"""Flush all files (and directories) in the output directory to disk.
+
+	Args:
+		out_dir (str): Output directory path.
+	"""
+	for root, dirs, files in os.walk(out_dir):
+		for f in files:
+			fd = os.open(os.path.join(root, f), os.O_RDONLY)
+			try:
+				os.fsync(fd)
+			finally:
+				os.close(fd)
+		## directory entries (not supported on every platform)
+		try:
+			fd = os.open(root, os.O_RDONLY)
+		except OSError:
+			continue
+		try:
+			os.fsync(fd)
+		except OSError:
+			pass
+		finally:
+			os.close(fd)
+
+
+def write_futures_wait_helper(futures, out_dir):
+	"""Wait for all submitted file writes --> fsync the output directory.
+
+	Args:
+		futures (List[Future]): Submitted file writes.
+		out_dir (str): Output directory path.
+	"""
+	## re-raise the first write error (if any)
+	for f in futures:
+		f.result()
+	fsync_output_dir_helper(out_dir)
+
+
+def write_executor_helper(max_workers):
+	"""Create the output file thread pool (None --> write sequentially).
+
+	Args:
+		max_workers (int): Number of writer threads.
+
+	Returns:
+		ThreadPoolExecutor | None
+
+	"""
+	if (max_workers is None) or (max_workers <= 1):
+		return None
+	return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cv_write')
+
+
+
+################################################################################
+#### Write Excel workbook (streaming) helper functions
+################################################################################
+
+def format_excel_df(df, index=False):
+	"""Convert DataFrame to Excel writable values.
+	
+	Index levels are moved to columns & object columns holding sets, lists or
+	dicts are converted to strings one column at a time.
+
+	Args:
+		df (Pandas DataFrame): DataFrame to write to Excel.
+		index (bool): Write the DataFrame index as the leading column(s).
+
+	Returns:
+		Pandas DataFrame: formatted DataFrame.
+
+	"""
+	if index:
+		df = df.reset_index(drop=False)
+	else:
+		df = df.reset_index(drop=True)
+	return format_container_cols_df(df)
+
+
+def format_container_cols_df(df):
+	"""Convert object columns holding sets, lists or dicts to strings (per column).
+
+	Args:
+		df (Pandas DataFrame): DataFrame to convert (modified in place).
+
+	Returns:
+		Pandas DataFrame: converted DataFrame.
+
+	"""
+	for c in df.columns[(df.dtypes == object).values]:
+		## set | list | dict | tuple values (NOT a scalar type) always infer as 'mixed'
+		if pd.api.types.infer_dtype(df[c], skipna=True) in ('mixed', 'mixed-integer'):
+			mask = df[c].notnull()
+			df[c] = df[c].where(~mask, df[c].astype(str))
+	return df
+
+
+def excel_sheet_chunks_helper(nrow, header=True, max_rows=EXCEL_MAX_ROWS):
+	"""Split row count into Excel worksheet sized (start, stop) row ranges.
+
+	Args:
+		nrow (int): Number of DataFrame rows.
+		header (bool): Each worksheet starts with a header row.
+		max_rows (int): Max number of rows per worksheet.
+
+	Returns:
+		List[tuple]: (start, stop) DataFrame row positions for each worksheet.
+
+	"""
+	step = max_rows - int(header)
+	return [(i, min(i + step, nrow)) for i in range(0, max(nrow, 1), step)]
+
+
+def write_excel_sheet_helper(workbook, sheet_name, df, header=True, chunksize=10000):
+	"""Write DataFrame to a new worksheet, row by row (constant memory mode).
+
+	Args:
+		workbook (xlsxwriter Workbook): Open workbook.
+		sheet_name (str): Worksheet name.
+		df (Pandas DataFrame): Formatted DataFrame (see format_excel_df).
+		header (bool): Write column names as the first row.
+		chunksize (int): Number of rows converted to Python values at once.
+	"""
+	ws = workbook.add_worksheet(sheet_name)
+	r = 0
+	if header:
+		ws.write_row(r, 0, [str(c) for c in df.columns])
+		r += 1
+	write_excel_rows_helper(ws, r, df, chunksize=chunksize)
+
+
+def write_excel_rows_helper(ws, r, df, chunksize=10000):
+	## write DataFrame rows from worksheet row r: convert chunk of rows to Python values (NaN --> None: blank cell)
+	for i in range(0, df.shape[0], chunksize):
+		chunk = df.iloc[i:i + chunksize].astype(object)
+		for row in chunk.where(chunk.notnull(), None).values.tolist():
+			ws.write_row(r, 0, row)
+			r += 1
+	return r
+
+
+class ExcelSheetAppender(object):
+	"""Append DataFrame rows to a worksheet of an open XlsxWriter (constant memory)
+	workbook; rows beyond the Excel row limit continue on new worksheets, named
+	as write_excel_workbook_helper splits them ('<sheet>', '<sheet> (2)', ...).
+
+	Args:
+		workbook (xlsxwriter Workbook): Open workbook.
+		sheet_name (str): Worksheet name.
+		header (bool): Each worksheet starts with the column names.
+		max_rows (int): Max number of rows per worksheet.
+	"""
+
+	def __init__(self, workbook, sheet_name, header=True, max_rows=EXCEL_MAX_ROWS):
+		self.workbook = workbook
+		self.sheet_name = sheet_name
+		self.header = header
+		self.max_rows = max_rows
+		self._ws, self._r, self._n_sheets = None, 0, 0
+
+	def _add_worksheet(self, columns):
+		suffix = ' (' + str(self._n_sheets + 1) + ')' if self._n_sheets > 0 else ''
+		self._ws = self.workbook.add_worksheet(self.sheet_name[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix)
+		self._n_sheets += 1
+		self._r = 0
+		if self.header:
+			self._ws.write_row(0, 0, [str(c) for c in columns])
+			self._r = 1
+
+	def write(self, df, index=False):
+		"""Append DataFrame rows (formatted with format_excel_df)."""
+		xl_df = format_excel_df(df, index=index)
+		if self._ws is None:
+			self._add_worksheet(xl_df.columns)
+		i = 0
+		while i < xl_df.shape[0]:
+			if self._r >= self.max_rows:
+				self._add_worksheet(xl_df.columns)
+			n = min(xl_df.shape[0] - i, self.max_rows - self._r)
+			self._r = write_excel_rows_helper(self._ws, self._r, xl_df.iloc[i:i + n])
+			i += n
+
+
+def excel_worksheets_helper(df_list, overflow='split', max_rows=EXCEL_MAX_ROWS):
+	"""Format DataFrames & split them into Excel worksheet sized tables.
+
+	Args:
+		df_list (List[list]): [df, sheet name, header, index] per worksheet.
+		overflow (str): Tables longer than the Excel row limit are either
+			'split' across multiple worksheets or 'skip'ped.
+		max_rows (int): Max number of rows per worksheet.
+
+	Yields:
+		tuple: (worksheet name, formatted DataFrame rows, header)
+
+	"""
+	for df, sheet, header, index in df_list:
+		xl_df = format_excel_df(df, index=index)
+		chunks = excel_sheet_chunks_helper(xl_df.shape[0], header=header, max_rows=max_rows)
+		if len(chunks) > 1:
+			if overflow == 'skip':
+				print("\tWARNING: skipping worksheet - too many rows for Excel: " + sheet)
+				continue
+			print("\t.. splitting worksheet across " + str(len(chunks)) + " sheets: " + sheet)
+		
+		for i, (start, stop) in enumerate(chunks):
+			suffix = ' (' + str(i + 1) + ')' if i > 0 else ''
+			yield sheet[:EXCEL_MAX_SHEET_NAME - len(suffix)] + suffix, xl_df.iloc[start:stop], header
+
+
+def write_excel_workbook_helper(df_list, fpath, overflow='split', max_rows=EXCEL_MAX_ROWS):
+	"""Write one or more DataFrames to a single multi-sheet Excel workbook.
+	
+	Uses the XlsxWriter constant memory mode, rows are flushed to disk as
+	they are written. Falls back to pandas + openpyxl if XlsxWriter is
+	not installed (same worksheets & formatting).
+
+	Args:
+		df_list (List[list]): [df, sheet name, header, index] per worksheet.
+		fpath (str): Output Excel file path.
+		overflow (str): Tables longer than the Excel row limit are either
+			'split' across multiple worksheets or 'skip'ped.
+		max_rows (int): Max number of rows per worksheet.
+
+	"""
+	sheets = excel_worksheets_helper(df_list, overflow=overflow, max_rows=max_rows)
+	try:
+		import xlsxwriter
+	except ImportError:
+		print("\tWARNING: xlsxwriter NOT installed --> writing Excel file with pandas")
+		with pd.ExcelWriter(fpath) as writer:
+			for sheet_name, xl_df, header in sheets:
+				xl_df.to_excel(writer, sheet_name=sheet_name, header=header,
+				               index=False, merge_cells=False)
+		return
+	
+	workbook = xlsxwriter.Workbook(fpath, {'constant_memory': True,
+	                                       'strings_to_urls': False,
+	                                       'strings_to_formulas': False})
+	try:
+		for sheet_name, xl_df, header in sheets:
+			write_excel_sheet_helper(workbook, sheet_name, xl_df, header=header)
+	finally:
+		workbook.close()
+
+
+
+################################################################################
+#### Write results database helper functions
+################################################################################
+
+def db_column_names_helper(cols):
+	"""Make column names unique, ignoring case (SQLite column names are case-insensitive).
+	
+	e.g. input variant column 'REF' & ClinVar column 'ref' --> 'REF', 'ref_1'
+
+	Args:
+		cols (List[str]): DataFrame column names.
+
+	Returns:
+		List[str]: unique column names.
+
+	"""
+	seen, cols_db = set(), []
+	for c in [str(c) for c in cols]:
+		c_db, i = c, 0
+		while c_db.lower() in seen:
+			i += 1
+			c_db = c + '_' + str(i)
+		seen.add(c_db.lower())
+		cols_db.append(c_db)
+	return cols_db
+
+
+def write_db_table_helper(con, df, table, index_cols, chunksize=50000, if_exists='replace'):
+	"""Load DataFrame into a (new) database table --> index the query columns.
+
+	Args:
+		con (sqlite3 Connection): Open database connection.
+		df (Pandas DataFrame): DataFrame to load.
+		table (str): Table name.
+		index_cols (List[str]): Columns to index (skipped if not in df).
+		chunksize (int): Number of rows inserted at once.
+		if_exists (str): 'replace' (new table) | 'append' (next rows of the table).
+	"""
+	db_df = format_container_cols_df(df.reset_index(drop=True).copy())
+	db_df.columns = db_column_names_helper(db_df.columns)
+	db_df.to_sql(table, con, if_exists=if_exists, index=False, chunksize=chunksize)
+	
+	for c in [c for c in index_cols if c in db_df.columns]:
+		con.execute('CREATE INDEX IF NOT EXISTS "idx_' + table + '_' + c + '" ON "'
+		            + table + '" ("' + c + '")')
+	con.commit()
+
+
+def write_results_db(fpath, table_list, index_cols=DB_INDEX_COLS):
+	"""Write DataFrames to an embedded SQLite results database with indexes.
+	
+	The HGVS ID column ('hgvs_id.<build>') is always indexed, in addition to
+	index_cols, e.g. for "all pathogenic variants in gene X" queries:
+		SELECT * FROM variant_summary
+		WHERE "gene.symbol" = 'X' AND clinical_significance = 'Pathogenic'
+
+	Args:
+		fpath (str): Output database file path (replaced if it exists).
+		table_list (List[list]): [df, table name] per table.
+		index_cols (List[str]): Columns to index.
+	"""
+	if os.path.exists(fpath):
+		os.remove(fpath)
+	
+	con = sqlite3.connect(fpath)
+	try:
+		## bulk load: no rollback journal (the file is rebuilt on failure)
+		con.execute('PRAGMA journal_mode = OFF')
+		con.execute('PRAGMA synchronous = OFF')
+		for df, table in table_list:
+			cols_id = [c for c in df.columns if str(c).startswith('hgvs_id.')]
+			write_db_table_helper(con, df, table, cols_id + index_cols)
+	finally:
+		con.close()
 
 
 
@@ -48,7 +648,9 @@ def write_df_file_helper(df, fname, out_dir, header=True, index=False, excel=Tru
 ################################################################################
 
 #@TODO: add param - subdir:False --> ONLY make annotation dir for EXPLORE
-def write_annot_df_files(out_path, out_prefix, today, cv_full_df, cv_summ_df, excel=True):
+def write_annot_df_files(out_path, out_prefix, today, cv_full_df, cv_summ_df, excel=True,
+                         excel_combined=False, executor=None, compression=None,
+                         database=False, parquet=False):
 	"""
 	
 	Args:
@@ -58,8 +660,16 @@ def write_annot_df_files(out_path, out_prefix, today, cv_full_df, cv_summ_df, ex
 		cv_full_df:
 		cv_summ_df:
 		excel:
+		excel_combined: write ONE multi-sheet Excel workbook (instead of
+			one Excel file per DF)
+		executor:
+		compression: compress the text files - None | 'gzip' | 'zstd'
+		database: also load both DFs into an indexed SQLite database file
+		parquet: also write both DFs to typed Parquet files (re-loaded by the
+			exploratory analysis from_annotation workflow)
 
 	Returns:
+		List[Future]: submitted file writes (empty if executor is None)
 
 	"""
 	
@@ -70,25 +680,112 @@ def write_annot_df_files(out_path, out_prefix, today, cv_full_df, cv_summ_df, ex
 	## specify output file names
 	fname_cv_full = out_prefix + '_ClinVar_variant_full_' + today
 	fname_cv_summ = out_prefix + '_ClinVar_variant_summary_' + today
+	fname_workbook = out_prefix + '_ClinVar_annotation_' + today
 	
 	## write Variant Summary DF output file
 	print("\t.. Writing ClinVar Variant summary")
-	write_df_file_helper(cv_summ_df, fname_cv_summ, out_dir, excel=excel)
+	futures = write_df_file_helper(cv_summ_df, fname_cv_summ, out_dir,
+	                               excel=excel and not excel_combined, executor=executor,
+	                               compression=compression)
 	
 	## write full ClinVar DF output file
 	print("\t.. Writing ClinVar Variant full detailed DF")
-	write_df_file_helper(cv_full_df, fname_cv_full, out_dir, excel=excel)
+	futures += write_df_file_helper(cv_full_df, fname_cv_full, out_dir,
+	                                excel=excel and not excel_combined, executor=executor,
+	                                compression=compression)
+	
+	## write combined Excel workbook
+	if excel and excel_combined:
+		print("\t.. Writing ClinVar annotation Excel workbook")
+		futures += write_task_helper(executor, write_excel_workbook_helper,
+		                             [[cv_summ_df, 'Variant summary', True, False],
+		                              [cv_full_df, 'Variant full', True, False]],
+		                             os.path.join(out_dir, fname_workbook + '.xlsx'))
+	
+	## write results database
+	if database:
+		print("\t.. Writing ClinVar annotation SQLite database")
+		futures += write_task_helper(executor, write_results_db,
+		                             os.path.join(out_dir, fname_workbook + '.sqlite'),
+		                             [[cv_summ_df, 'variant_summary'],
+		                              [cv_full_df, 'variant_full']])
+	
+	## write typed Parquet files
+	if parquet and not parquet_engine_helper():
+		print("\tWARNING: pyarrow | fastparquet NOT installed --> skipping Parquet files")
+	elif parquet:
+		print("\t.. Writing ClinVar annotation Parquet files")
+		futures += write_task_helper(executor, write_parquet_helper, cv_summ_df,
+		                             os.path.join(out_dir, fname_cv_summ + '.parquet'))
+		futures += write_task_helper(executor, write_parquet_helper, cv_full_df,
+		                             os.path.join(out_dir, fname_cv_full + '.parquet'))
+	return futures
+
+
+################################################################################
+#### HTML report helper functions
+################################################################################
+
+def report_table_helper(df, title):
+	"""DataFrame --> compact JSON-able table dict (named index --> columns).
+
+	Args:
+		df (Pandas DataFrame): Table.
+		title (str): Table title.
+
+	Returns:
+		dict: title, columns, data (list of rows)
+
+	"""
+	df = df.reset_index(drop=isinstance(df.index, pd.RangeIndex))
+	table = json.loads(df.to_json(orient='split', index=False, default_handler=str))
+	return dict(title=title, columns=[str(c).strip() for c in df.columns], data=table['data'])
+
+
+def write_html_report(fpath, title, plot_list, table_list):
+	"""Write a self-contained HTML report (NO image renderer).
+	
+	plotly.js is inlined ONCE & shared by all figures; figures & tables are
+	embedded as JSON and rendered in the browser.
+
+	Args:
+		fpath (str): Output file path.
+		title (str): Report title.
+		plot_list (list): [[Plotly Figure, title], ...]
+		table_list (list): [[DataFrame, title], ...]
+	"""
+	import plotly.io as pio
+	from plotly.offline import get_plotlyjs
+	
+	data = dict(figures=[dict(title=t, figure=json.loads(pio.to_json(fig, validate=False)))
+	                     for fig, t in plot_list if fig is not None],
+	            tables=[report_table_helper(df, t) for df, t in table_list if df is not None])
+	
+	## embedded JSON: escape '</' (cannot close the script element); title (user's out_prefix): HTML escaped
+	data = json.dumps(data, separators=(',', ':')).replace('</', '<\\/')
+	with open(fpath, 'w', encoding='utf-8') as f:
+		f.write(REPORT_HTML_TEMPLATE.substitute(title=html.escape(title), plotlyjs=get_plotlyjs(), data=data))
+
 
 
 ##----Driver function: write Annotation workflow output files-----------------##
 #@TODO: rename fxn
-def write_output_annotation(out_path, out_prefix, result_dict, excel=True):
+@prof.profiled('write_output_annotation')
+def write_output_annotation(out_path, out_prefix, result_dict, excel=True, excel_combined=False,
+                            max_workers=1, compression=None, database=False, parquet=False):
 	"""
 	
 	Args:
 		out_path:
 		out_prefix:
 		result_dict:
+		excel:
+		excel_combined:
+		max_workers: number of threads writing output files in parallel
+		compression: compress the text files - None | 'gzip' | 'zstd'
+		database: also write an indexed SQLite database (variant_summary &
+			variant_full tables)
+		parquet: also write typed Parquet files
 
 	Returns:
 
@@ -98,11 +795,107 @@ def write_output_annotation(out_path, out_prefix, result_dict, excel=True):
 	                                                 '_ClinVar_annotation_')
 		
 	## write DF output files
-	write_annot_df_files(output_path, out_prefix=out_prefix, today=timestamp,
-	                     cv_full_df=result_dict['cv_full_df'],
-	                     cv_summ_df=result_dict['cv_var_summary_df'],
-	                     excel=excel)
+	executor = write_executor_helper(max_workers)
+	try:
+		futures = write_annot_df_files(output_path, out_prefix=out_prefix, today=timestamp,
+		                               cv_full_df=result_dict['cv_full_df'],
+		                               cv_summ_df=result_dict['cv_var_summary_df'],
+		                               excel=excel, excel_combined=excel_combined,
+		                               executor=executor, compression=compression,
+		                               database=database, parquet=parquet)
+
+		## wait for (parallel) writes --> flush output files to disk
+		write_futures_wait_helper(futures, output_path)
+	finally:
+		## NO orphaned writes if a write fails to be submitted
+		if executor is not None:
+			executor.shutdown(wait=True)
+
+
+
+##----Driver function: write Annotation workflow output files batch by batch--##
+@prof.profiled('write_output_annotation_batches')
+def write_output_annotation_batches(out_path, out_prefix, batches, excel=True, excel_combined=False,
+                                    compression=None, database=False, parquet=False):
+	"""Write the Annotation workflow output files batch by batch (merged results larger
+	than the memory budget): text files & database tables are appended to, Excel
+	worksheets are streamed. Same files as write_output_annotation, except Parquet
+	files (whole tables: skipped).
+	
+	Args:
+		out_path:
+		out_prefix:
+		batches: (variant summary DF, full DF) batches, in output row order
+		excel:
+		excel_combined:
+		compression: compress the text files - None | 'gzip' | 'zstd'
+		database: also write an indexed SQLite database (variant_summary &
+			variant_full tables)
+		parquet: NOT supported (warning)
+
+	Returns:
+
+	"""
+	## create output directory
+	output_path, timestamp = write_output_dir_helper(out_path, out_prefix, '_ClinVar_annotation_')
+	out_dir = os.path.join(output_path, 'annotation')
+	if not os.path.exists(out_dir):
+		os.mkdir(out_dir)
 	
+	## specify output file names (write_annot_df_files)
+	fname_list = [out_prefix + '_ClinVar_variant_summary_' + timestamp,
+	              out_prefix + '_ClinVar_variant_full_' + timestamp]
+	fname_workbook = out_prefix + '_ClinVar_annotation_' + timestamp
+	sheet_list = ['Variant summary', 'Variant full'] if excel_combined else ['Sheet1', 'Sheet1']
+	table_list = ['variant_summary', 'variant_full']
+	
+	if parquet:
+		print("\tWARNING: Parquet files need the whole tables in memory --> skipping Parquet files")
+	if excel:
+		try:
+			import xlsxwriter
+		except ImportError:
+			print("\tWARNING: xlsxwriter NOT installed --> skipping Excel files")
+			excel = False
+	
+	files, workbooks, sheets, con = [], [], [], None
+	try:
+		files = [text_writer_helper(os.path.join(out_dir, fname + '.txt'), compression)
+		         for fname in fname_list]
+		if excel:
+			xl_fnames = [fname_workbook] if excel_combined else fname_list
+			workbooks = [xlsxwriter.Workbook(os.path.join(out_dir, fname + '.xlsx'),
+			                                 {'constant_memory': True, 'strings_to_urls': False,
+			                                  'strings_to_formulas': False}) for fname in xl_fnames]
+			sheets = [ExcelSheetAppender(workbooks[0 if excel_combined else i], sheet)
+			          for i, sheet in enumerate(sheet_list)]
+		if database:
+			fpath_db = os.path.join(out_dir, fname_workbook + '.sqlite')
+			if os.path.exists(fpath_db):
+				os.remove(fpath_db)
+			con = sqlite3.connect(fpath_db)
+			con.execute('PRAGMA journal_mode = OFF')
+			con.execute('PRAGMA synchronous = OFF')
+		
+		print("\t.. Writing ClinVar Variant summary & full detailed DF batches")
+		for i, batch in enumerate(batches):
+			for j, df in enumerate(batch):
+				df.to_csv(files[j], header=(i == 0), index=False, sep='\t')
+				if excel:
+					sheets[j].write(df)
+				if database:
+					cols_id = [c for c in df.columns if str(c).startswith('hgvs_id.')]
+					write_db_table_helper(con, df, table_list[j], cols_id + DB_INDEX_COLS,
+					                      if_exists='replace' if i == 0 else 'append')
+	finally:
+		for f in files + workbooks:
+			f.close()
+		if con is not None:
+			con.close()
+	
+	## flush output files to disk
+	fsync_output_dir_helper(output_path)
+
 
 
 ################################################################################
@@ -112,7 +905,8 @@ def write_output_annotation(out_path, out_prefix, result_dict, excel=True):
 ##----write Panda Dataframes output files function----------------------------##
 def write_explore_df_files(out_path, out_prefix, today, data_summ_df=None,
                            patho_var_df=None, patho_full_df=None, cs_var_df=None,
-                           cs_rcv_df=None, cs_gene_df=None, cs_cond_df=None, excel=True):
+                           cs_rcv_df=None, cs_gene_df=None, cs_cond_df=None, excel=True,
+                           excel_combined=False, executor=None):
 	"""
 	
 	Args:
@@ -127,8 +921,11 @@ def write_explore_df_files(out_path, out_prefix, today, data_summ_df=None,
 		cs_gene_df:
 		cs_cond_df:
 		excel:
+		excel_combined:
+		executor:
 
 	Returns:
+		List[Future]: submitted file writes (empty if executor is None)
 
 	"""
 	
@@ -144,6 +941,7 @@ def write_explore_df_files(out_path, out_prefix, today, data_summ_df=None,
 	fname_cs_rcv = out_prefix + '_ClinVar_clinsig-RCV_counts_' + today
 	fname_cs_gene = out_prefix + '_ClinVar_clinsig-Variant_counts_per_gene_' + today
 	fname_cs_cond = out_prefix + '_ClinVar_clinsig-Variant_counts_per_condition_' + today
+	fname_workbook = out_prefix + '_ClinVar_exploratory_analysis_' + today
 	
 	## write DF output files
 	_write = [
@@ -156,16 +954,28 @@ def write_explore_df_files(out_path, out_prefix, today, data_summ_df=None,
 			[cs_cond_df, fname_cs_cond, True, True, "Condition clinsig counts"]
 	]
 
+	futures = []
 	for w in _write:
 		if w[0] is not None:
 			print("\t.. Writing " + w[4] + " DF files")
-			write_df_file_helper(w[0], w[1], out_dir, header=w[2], index=w[3], excel=excel)
+			futures += write_df_file_helper(w[0], w[1], out_dir, header=w[2], index=w[3],
+			                                excel=excel and not excel_combined,
+			                                executor=executor)
+	
+	## write combined Excel workbook
+	if excel and excel_combined:
+		print("\t.. Writing exploratory analysis Excel workbook")
+		futures += write_task_helper(executor, write_excel_workbook_helper,
+		                             [[w[0], w[4], w[2], w[3]] for w in _write if w[0] is not None],
+		                             os.path.join(out_dir, fname_workbook + '.xlsx'))
+	return futures
 
 
 ##----write Plot output files functions---------------------------------------##
 def write_plot_files(out_path, out_prefix='', pie_var=None, pie_rcv=None,
 					 bar_cond=None, bar_gene=None, today='',
-					 write_plot_fxn=None):
+					 write_plot_fxn=None, executor=None, write_plot_batch_fxn=None,
+					 plot_formats=('png', 'pdf')):
 	"""
 	
 	Args:
@@ -177,8 +987,13 @@ def write_plot_files(out_path, out_prefix='', pie_var=None, pie_rcv=None,
 		bar_gene:
 		today:
 		write_plot_fxn:
+		executor:
+		write_plot_batch_fxn: optional - write ALL plots with one call,
+			write_plot_batch_fxn(plot_list, plot_path, formats) (replaces write_plot_fxn)
+		plot_formats: image formats written by write_plot_batch_fxn
 
 	Returns:
+		List[Future]: submitted file writes (empty if executor is None)
 
 	"""
 	## create output directory
@@ -186,11 +1001,11 @@ def write_plot_files(out_path, out_prefix='', pie_var=None, pie_rcv=None,
 		os.mkdir(os.path.join(out_path, 'images'))
 	plot_path = os.path.join(out_path, 'images')
 	
-	if not os.path.exists(os.path.join(plot_path, 'pdf')):
-		os.mkdir(os.path.join(plot_path, 'pdf'))
-	
-	if not os.path.exists(os.path.join(plot_path, 'png')):
-		os.mkdir(os.path.join(plot_path, 'png'))
+	if write_plot_batch_fxn is None:
+		plot_formats = ('png', 'pdf')
+	for fmt in plot_formats:
+		if not os.path.exists(os.path.join(plot_path, fmt)):
+			os.mkdir(os.path.join(plot_path, fmt))
 	
 	## specify file names
 	fname_pie_var = out_prefix + '_clinsig_Variant_donut_plot_' + today
@@ -204,15 +1019,28 @@ def write_plot_files(out_path, out_prefix='', pie_var=None, pie_rcv=None,
 				 [bar_gene, fname_bar_gene, plot_path, "Gene Variant clinsig bar"],
 				 [bar_cond, fname_bar_cond, plot_path, "Condition Variant clinsig bar"]]
 	
+	## write all image files with one call (single image renderer)
+	if write_plot_batch_fxn is not None:
+		print("\t.. Writing plot files: " + ', '.join([p[3] for p in plot_list if p[0] is not None]))
+		return write_task_helper(executor, write_plot_batch_fxn,
+		                         [[p[0], p[1]] for p in plot_list if p[0] is not None],
+		                         plot_path, formats=plot_formats)
+	
+	futures = []
 	for p in plot_list:
 		if p[0] is not None:
 			print("\t.. Writing " + p[3] + " plot files")
-			write_plot_fxn(p[0], p[1], p[2])
+			futures += write_task_helper(executor, write_plot_fxn, p[0], p[1], p[2])
+	return futures
 
 
 ##----Driver function: write Exploratory Analysis workflow output files-------##
 #@TODO: rename fxn
-def write_output_exploratory_analysis(out_path, out_prefix, result_dict, write_plot_fxn):
+@prof.profiled('write_output_exploratory_analysis')
+def write_output_exploratory_analysis(out_path, out_prefix, result_dict, write_plot_fxn,
+                                      excel=True, excel_combined=False, max_workers=1,
+                                      write_plot_batch_fxn=None, plot_formats=('png', 'pdf'),
+                                      compression=None):
 	"""
 	
 	Args:
@@ -220,6 +1048,13 @@ def write_output_exploratory_analysis(out_path, out_prefix, result_dict, write_p
 		out_prefix:
 		result_dict:
 		write_plot_fxn:
+		excel:
+		excel_combined:
+		max_workers: number of threads writing output files in parallel
+		write_plot_batch_fxn:
+		plot_formats: image formats &/or 'html' (self-contained HTML report,
+			written without the image renderer)
+		compression: compress the annotation text files - None | 'gzip' | 'zstd'
 
 	Returns:
 
@@ -229,26 +1064,63 @@ def write_output_exploratory_analysis(out_path, out_prefix, result_dict, write_p
 	                                                 '_ClinVar_analysis_')
 	
 	## write DF output files
-	write_annot_df_files(output_path, out_prefix=out_prefix, today=timestamp,
-	                     cv_full_df=result_dict['cv_full_df'],
-	                     cv_summ_df=result_dict['cv_var_summary_df'])
-	
-	write_explore_df_files(output_path, out_prefix=out_prefix, today=timestamp,
-	                       data_summ_df=result_dict['data_summary_df'],
-	                       patho_var_df=result_dict['patho_var_df'],
-	                       patho_full_df=result_dict['patho_var_detail_df'],
-	                       cs_var_df=result_dict['clinsig_var']['df'],
-	                       cs_rcv_df=result_dict['clinsig_rcv']['df'],
-	                       cs_gene_df=result_dict['clinsig_var_gene']['df'],
-	                       cs_cond_df=result_dict['clinsig_var_cond']['df'])
-	
-	## write plot image files
-	write_plot_files(output_path, out_prefix=out_prefix, today=timestamp,
-					 pie_var=result_dict['clinsig_var']['plot'],
-					 pie_rcv=result_dict['clinsig_rcv']['plot'],
-					 bar_cond=result_dict['clinsig_var_cond']['plot'],
-					 bar_gene=result_dict['clinsig_var_gene']['plot'],
-					 write_plot_fxn=write_plot_fxn)
+	executor = write_executor_helper(max_workers)
+	try:
+		## annotation tables (NOT in the results of several merged annotation output directories)
+		futures = []
+		if 'cv_full_df' in result_dict:
+			futures += write_annot_df_files(output_path, out_prefix=out_prefix, today=timestamp,
+			                                cv_full_df=result_dict['cv_full_df'],
+			                                cv_summ_df=result_dict['cv_var_summary_df'],
+			                                excel=excel, excel_combined=excel_combined,
+			                                executor=executor, compression=compression)
+	
+		futures += write_explore_df_files(output_path, out_prefix=out_prefix, today=timestamp,
+		                                  data_summ_df=result_dict['data_summary_df'],
+		                                  patho_var_df=result_dict['patho_var_df'],
+		                                  patho_full_df=result_dict['patho_var_detail_df'],
+		                                  cs_var_df=result_dict['clinsig_var']['df'],
+		                                  cs_rcv_df=result_dict['clinsig_rcv']['df'],
+		                                  cs_gene_df=result_dict['clinsig_var_gene']['df'],
+		                                  cs_cond_df=result_dict['clinsig_var_cond']['df'],
+		                                  excel=excel, excel_combined=excel_combined,
+		                                  executor=executor)
+	
+		## write HTML report
+		if 'html' in plot_formats:
+			print("\t.. Writing exploratory analysis HTML report")
+			futures += write_task_helper(executor, write_html_report,
+			                             os.path.join(output_path, out_prefix + '_ClinVar_report_' + timestamp + '.html'),
+			                             out_prefix + ' ClinVar exploratory analysis ' + timestamp,
+			                             [[result_dict['clinsig_var']['plot'], 'Variant Clinical Significance'],
+			                              [result_dict['clinsig_rcv']['plot'], 'Variant-Condition (RCV) Clinical Significance'],
+			                              [result_dict['clinsig_var_gene']['plot'], 'Variant Clinical Significance, grouped by Gene'],
+			                              [result_dict['clinsig_var_cond']['plot'], 'Variant Clinical Significance, grouped by Condition']],
+			                             [[result_dict['data_summary_df'], 'Dataset summary'],
+			                              [result_dict['clinsig_var']['df'], 'Variant Clinical Significance counts'],
+			                              [result_dict['clinsig_rcv']['df'], 'Variant-Condition (RCV) Clinical Significance counts'],
+			                              [result_dict['clinsig_var_gene']['df'], 'Variant Clinical Significance counts per Gene'],
+			                              [result_dict['clinsig_var_cond']['df'], 'Variant Clinical Significance counts per Condition'],
+			                              [result_dict['patho_var_df'], 'Pathogenic variants']])
+	
+		## write plot image files
+		image_formats = tuple(f for f in plot_formats if f != 'html')
+		if len(image_formats) > 0:
+			futures += write_plot_files(output_path, out_prefix=out_prefix, today=timestamp,
+										pie_var=result_dict['clinsig_var']['plot'],
+										pie_rcv=result_dict['clinsig_rcv']['plot'],
+										bar_cond=result_dict['clinsig_var_cond']['plot'],
+										bar_gene=result_dict['clinsig_var_gene']['plot'],
+										write_plot_fxn=write_plot_fxn, executor=executor,
+										write_plot_batch_fxn=write_plot_batch_fxn,
+										plot_formats=image_formats)
+	
+		## wait for (parallel) writes --> flush output files to disk
+		write_futures_wait_helper(futures, output_path)
+	finally:
+		## NO orphaned writes if a write fails to be submitted
+		if executor is not None:
+			executor.shutdown(wait=True)
 
 
 
@@ -1,14 +1,22 @@
 # clinvar_query.py
+import threading
+from collections import OrderedDict
 
 ## Pandas - setup
+import numpy as np
 import pandas as pd
 pd.options.mode.chained_assignment = None
 pd.set_option('display.max_columns', None)
 
 
-## ClinVar query API - myvariant - setup
-import myvariant
-mv = myvariant.MyVariantInfo()
+## ClinVar query API - myvariant - setup: client created on 1st query (get_myvariant_client)
+mv = None
+_mv_lock = threading.Lock()
+
+## ClinVar workflow imports
+from clinvar_workflow.helpers import profiling as prof
+from clinvar_workflow.helpers import checkpoints as ckpt
+from clinvar_workflow.helpers import sorting
 
 #TODO: change set() --> set literal --> remove warnings
 
@@ -24,10 +32,104 @@ COL_RCV = 'accession'
 ## integer columns
 cv_int_fields = ['number_submitters', 'variant_id', 'hg19.start', 'hg19.end', 'hg38.start', 'hg38.end']
 
+## single value per variant fields
+###################### @TODO: MAKE DYNAMIC!!!
+cv_non_rcv_fields = ['clinvar_status', 'preferred_name', 'variant_id', 'type', 'rsid', 'gene.symbol', 'chrom', 'ref', 'alt', 'hg19.start', 'hg19.end', 'hg38.start', 'hg38.end', 'hgvs.coding', 'hgvs.genomic']
+############################################
+
 ## ClinVar fields to drop:
 cv_drop_fields = ['_license', 'allele_id', 'gene.id', 'cytogenic']
 
+## RefSeq chromosome accessions (hgvs.genomic) per genome build: chromosomes 1-22, X, Y, MT
+REFSEQ_CHROM_ACCESSIONS = {
+	'hg19':dict(zip([str(c) for c in range(1, 23)] + ['X', 'Y', 'MT'],
+	                ['NC_0000%02d.%d' % (c, v) for c, v in
+	                 zip(range(1, 25), [10, 11, 11, 11, 9, 11, 13, 10, 11, 10, 11, 11,
+	                                    10, 8, 9, 9, 10, 9, 9, 10, 8, 10, 10, 9])] + ['NC_012920.1'])),
+	'hg38':dict(zip([str(c) for c in range(1, 23)] + ['X', 'Y', 'MT'],
+	                ['NC_0000%02d.%d' % (c, v) for c, v in
+	                 zip(range(1, 25), [11, 12, 12, 12, 10, 12, 14, 11, 12, 11, 10, 12,
+	                                    11, 9, 10, 10, 11, 10, 10, 11, 9, 11, 11, 10])] + ['NC_012920.1']))}
+
+## MyVariant query response cache (in memory, per genome build & HGVS ID): disabled by default,
+##  enabled by long-running processes (annotation service); least recently used IDs are evicted
+QUERY_CACHE = dict(enabled=False, max_entries=100000)
+_query_cache = OrderedDict()
+_query_cache_lock = threading.Lock()
+
+
+def get_myvariant_client():
+	"""MyVariant client (created & its package imported on 1st use --> fast package import).
+
+	Returns:
+		myvariant.MyVariantInfo
+	"""
+	global mv
+	with _mv_lock:
+		if mv is None:
+			import myvariant
+			mv = myvariant.MyVariantInfo()
+	return mv
+
+
+def set_query_cache(enabled=True, max_entries=100000):
+	"""Enable | disable (& clear) the MyVariant query response cache.
+
+	Args:
+		enabled (bool):
+		max_entries (int): max number of cached variant IDs
+	"""
+	QUERY_CACHE.update(enabled=enabled, max_entries=max_entries)
+	if not enabled:
+		with _query_cache_lock:
+			_query_cache.clear()
+
+
+def query_cache_info():
+	## cache settings & number of cached variant IDs
+	return dict(QUERY_CACHE, entries=len(_query_cache))
+
+
+def myvariant_getvariants_cached(hgvs_ids, genome_build):
+	"""MyVariant ClinVar query of the variant IDs NOT in the response cache.
+	
+	The raw hits (JSON dicts) are cached & normalized per call, as getvariants
+	does (json_normalize --> 'query' index) --> same DataFrame as an uncached query.
+
+	Args:
+		hgvs_ids: variant HGVS IDs
+		genome_build:
+
+	Returns:
+		Pandas DataFrame: getvariants(..., as_dataframe=1) rows of all IDs (input order)
+
+	"""
+	ids_uniq = list(OrderedDict.fromkeys(hgvs_ids))
+	hits = {}
+	with _query_cache_lock:
+		for hgvs_id in ids_uniq:
+			if (genome_build, hgvs_id) in _query_cache:
+				_query_cache.move_to_end((genome_build, hgvs_id))
+				hits[hgvs_id] = _query_cache[(genome_build, hgvs_id)]
+	
+	## query missing IDs --> cache response hits (notfound IDs: {'query', 'notfound'} hit)
+	ids_query = [i for i in ids_uniq if i not in hits]
+	if len(ids_query) > 0:
+		query_hits = get_myvariant_client().getvariants(ids_query, fields='clinvar', assembly=genome_build)
+		id_hits = OrderedDict()
+		for hit in query_hits:
+			id_hits.setdefault(hit['query'], []).append(hit)
+		with _query_cache_lock:
+			for hgvs_id, hit_list in id_hits.items():
+				hits[hgvs_id] = hit_list
+				_query_cache[(genome_build, hgvs_id)] = hit_list
+			while len(_query_cache) > QUERY_CACHE['max_entries']:
+				_query_cache.popitem(last=False)
+	
+	return pd.json_normalize([h for i in ids_uniq if i in hits for h in hits[i]]).set_index('query')
+
 
+@prof.profiled('myvariant_run_clinvar_query')
 def myvariant_run_clinvar_query(input_var_df, col_hgvs, genome_build):
 	"""
 
@@ -40,9 +142,23 @@ def myvariant_run_clinvar_query(input_var_df, col_hgvs, genome_build):
 
 	"""
 	## use MyVariant API to query ClinVar
-	raw_query_df = mv.getvariants(input_var_df[col_hgvs], fields='clinvar',
-								  assembly=genome_build, as_dataframe=1)
-		
+	if QUERY_CACHE['enabled']:
+		raw_query_df = myvariant_getvariants_cached(input_var_df[col_hgvs], genome_build)
+	else:
+		raw_query_df = get_myvariant_client().getvariants(input_var_df[col_hgvs], fields='clinvar',
+														  assembly=genome_build, as_dataframe=1)
+	return extract_clinvar_raw_df(raw_query_df)
+
+
+def extract_clinvar_raw_df(raw_query_df):
+	"""Extract the reported variants' ClinVar fields from a MyVariant query DataFrame.
+
+	Args:
+		raw_query_df: MyVariant getvariants(..., as_dataframe=1) DataFrame
+
+	Returns:
+
+	"""
 	## check if all variants were 'notfound'
 	if ('notfound' in raw_query_df.columns) & (len(raw_query_df.columns)==1):
 		print("\tALERT: NONE of the input variants were found in ClinVar database.")
@@ -275,6 +391,7 @@ def int_col_cast_helper(df, cols_int):
 	return df
 
 
+@prof.profiled('myvariant_clinvar_rcv_data_wrangling')
 def myvariant_clinvar_rcv_data_wrangling(cv_raw_df, col_id, col_clinsig, cols_int):
 	"""
 
@@ -338,51 +455,12 @@ def agg_uniq_sorted_list_dropna(df, grp_col, agg_col):
 		.agg(lambda x: sorted(list(x)) if x.nunique() > 1 else x)
 
 
-##----convert chromosome column to integer for proper sorting-----------------##
-def chrN_df_helper(c, chr_map):
-	"""
-
-	Args:
-		c:
-		chr_map:
-
-	Returns:
-
-	"""
-	if c.strip().lower() in chr_map:
-		return chr_map[c.strip().lower()]
-	return 30
-
-
-def add_chrN_sort_cols(df, var_cols, chr_map={'x':24, 'y':25, 'mt':26}):
-	"""
-
-	Args:
-		df:
-		var_cols:
-		chr_map:
-
-	Returns:
-
-	"""
-	## copy original chrom & position column before multiindexing
-	df['sort_chr'] = df[var_cols[0]].copy().astype('str')
-	df['sort_pos'] = df[var_cols[1]].copy()
-	df['sort_date'] = df['last_evaluated'].copy().fillna('')
-	df['sort_asc'] = df['accession'].copy().fillna('')
-
-	## map chrom str to int: 'X':24, 'Y':25, 'MT':26
-	mask_chr = df['sort_chr'].str.isnumeric()
-	df.loc[mask_chr, 'sort_chrN'] = df.loc[mask_chr,'sort_chr'].copy().astype('int')
-	df.loc[~mask_chr, 'sort_chrN'] = df['sort_chr'].apply(lambda x: chrN_df_helper(x, chr_map))
-	return df
-
-
 
 ################################################################################
 #### Generate variant ClinVar summary from MyVariant RCV-level data functions
 ################################################################################
 
+@prof.profiled('variant_summary_non_clinsig_fields')
 def variant_summary_non_clinsig_fields(cv_df, col_id, col_clinsig, cols_non_rcv):
 	"""
 
@@ -441,6 +519,13 @@ def variant_summary_non_clinsig_fields(cv_df, col_id, col_clinsig, cols_non_rcv)
 
 
 ##----clinsig classification rules--------------------------------------------##
+def empty_classified_helper(col_id, col_clinsig, rule_num):
+	## NO variants classified by a rule (empty frames break the rules' .loc assignments)
+	classified = pd.DataFrame({col_id:pd.Series(dtype=object), col_clinsig:pd.Series(dtype=object)})
+	classified['rule'] = pd.Series(dtype='int64')
+	return classified
+
+
 def classify_clinsig_rule1_single_rcv(cv_df, col_id, col_clinsig, rule_num=1):
 	"""
 
@@ -535,6 +620,9 @@ def classify_clinsig_rule5_patho_rcv(cv_df, col_id, col_clinsig, rule_num=5):
 				.groupby(col_id)\
 				.filter(lambda x: any(x[col_clinsig].isin(patho_list))).copy()\
 				.reset_index(drop=True)
+	## NO patho variants (e.g. small inputs | partitions) --> none classified
+	if len(p_any.index) == 0:
+		return empty_classified_helper(col_id, col_clinsig, rule_num)
 	p_any['clinsig'] = p_any[col_clinsig].copy().str.lower().str.strip()
 
 	##--------------------------------------------------------##
@@ -543,6 +631,7 @@ def classify_clinsig_rule5_patho_rcv(cv_df, col_id, col_clinsig, rule_num=5):
 					.groupby(col_id)['clinsig']\
 					.agg([('_set', set)]).reset_index(drop=False)
 
+	agg1[col_clinsig] = None  ## unclassified (.loc assignment needs the column if agg1 is empty)
 	## identify & classify "Likely pathogenic" variants
 	agg1['_likely'] = agg1['_set'].apply(lambda x: x == set(['likely pathogenic']))
 	agg1.loc[agg1['_likely'], col_clinsig] = "Likely pathogenic"
@@ -561,6 +650,7 @@ def classify_clinsig_rule5_patho_rcv(cv_df, col_id, col_clinsig, rule_num=5):
 					.groupby(col_id)['clinsig']\
 					.agg([('_set', set)]).reset_index(drop=False)
 
+	agg2[col_clinsig] = None  ## unclassified (.loc assignment needs the column if agg2 is empty)
 	## identify & classify {'Pathogenic', 'Likely pathogenic'} variants
 	agg2['_p+Lp'] = agg2['_set'].apply(lambda x: x == lp_set)
 	agg2.loc[agg2['_p+Lp'], col_clinsig] = "Likely pathogenic"
@@ -600,6 +690,10 @@ def classify_clinsig_rule6_likely_benign(cv_df, col_id, col_clinsig, rule_num=6)
 			[col_clinsig].agg([('_set', set)])\
 			.reset_index(drop=False)
 	
+	## NO benign variants (e.g. small inputs | partitions) --> none classified
+	if len(tmp.index) == 0:
+		return empty_classified_helper(col_id, col_clinsig, rule_num)
+	
 	## identify possible 'Benign/Likely benign' variants
 	tmp['_likely'] = tmp['_set'].apply(lambda x: x.issubset(benign_set) & len(x)>0)
 	benign_likely_vars = tmp[tmp['_likely']][col_id].copy()
@@ -644,6 +738,7 @@ def classify_clinsig_ruleX_default_conflicting(cv_df, col_id, col_clinsig, rule_
 	return classified
 ##----------------------------------------------------------------------------##
 
+@prof.profiled('variant_summary_classify_rcv_clinsig')
 def variant_summary_classify_rcv_clinsig(cv_df, col_id, col_clinsig):
 	## clinsig classification rules helper functions
 	rule_fxn_list = [(classify_clinsig_rule1_single_rcv, 1),
@@ -688,6 +783,7 @@ def variant_summary_classify_rcv_clinsig(cv_df, col_id, col_clinsig):
 	return clinsig_classified
 
 
+@prof.profiled('generate_clinvar_variant_summary_df')
 def generate_clinvar_variant_summary_df(cv_df, col_id, col_clinsig, cols_non_rcv):
 	"""
 
@@ -805,6 +901,7 @@ def flag_condition_duplicated_helper(cv_df, col_id, col_cond, col_rcv, col_rcv_c
 	return flag_df
 
 
+@prof.profiled('add_agg_stats_summary_df')
 def add_agg_stats_summary_df(cv_df, cv_var_summary_df, col_id, col_clinsig, col_cond, col_rcv):
 	"""
 
@@ -853,8 +950,7 @@ def add_agg_stats_summary_df(cv_df, cv_var_summary_df, col_id, col_clinsig, col_
 	cv_var_agg['_.patho_ANY_cond'] = (cv_var_agg['patho_cond.nuniq'] > 0)
 	
 	## merge with summary DF
-	cv_var_summary_df = cv_var_summary_df.merge(cv_var_agg, on=col_id, left_index=False,
-												right_index=True, how='outer')
+	cv_var_summary_df = cv_var_summary_df.merge(cv_var_agg, on=col_id, how='outer')
 	
 	## add FLAGS to variant summary
 	flag_cond_dup = flag_condition_duplicated_helper(cv_df, col_id, col_cond, col_rcv,
@@ -875,6 +971,7 @@ def add_agg_stats_summary_df(cv_df, cv_var_summary_df, col_id, col_clinsig, col_
 
 
 ## add variant summary DF columns to full ClinVar DF
+@prof.profiled('add_clinvar_variant_summary_columns')
 def add_clinvar_variant_summary_columns(cv_summary_df, cv_df, col_id, col_clinsig,
 										cols_cv, cols_var, cols_input):
 	"""
@@ -919,6 +1016,7 @@ def add_clinvar_variant_summary_columns(cv_summary_df, cv_df, col_id, col_clinsi
 
 
 
+@prof.profiled('clinvar_summary_add_input_cols')
 def clinvar_summary_add_input_cols(cv_summary_df, input_var_df, col_id, col_clinsig, cols_var, cols_input):
 	"""
 
@@ -941,17 +1039,171 @@ def clinvar_summary_add_input_cols(cv_summary_df, input_var_df, col_id, col_clin
 	
 	cv_var_df.loc[cv_var_df[col_clinsig] == 'UNREPORTED', col_clinsig + '.rcv.set'] = \
 	cv_var_df[col_clinsig].apply(lambda x: set([x]))
+	return sort_variant_summary_df(cv_var_df, cols_var)
+
+
+def sort_variant_summary_df(cv_var_df, cols_var):
+	"""Sort variant summary DF rows by chromosome (1-22, X, Y, MT, alt contigs) & position.
+
+	Args:
+		cv_var_df:
+		cols_var:
+
+	Returns:
+
+	"""
+	## chromosome (natural order) & position sort indexer (None: already sorted)
+	order = sorting.coordinate_sort_indexer(cv_var_df[cols_var[0]], cv_var_df[cols_var[1]])
+	if order is None:
+		return cv_var_df.reset_index(drop=True)
+	return cv_var_df.take(order).reset_index(drop=True)
+
+
+def sort_full_df_by_summary(cv_full_df, cv_var_summary_df, col_id):
+	"""Sort full ClinVar DF rows in variant summary DF order (stable: row order within a variant kept).
+
+	Args:
+		cv_full_df:
+		cv_var_summary_df: sorted variant summary DF (sort_variant_summary_df)
+		col_id:
+
+	Returns:
+
+	"""
+	summ_order = pd.Index(pd.unique(cv_var_summary_df[col_id])).get_indexer(cv_full_df[col_id])
+	return cv_full_df.take(np.argsort(summ_order, kind='stable')).reset_index(drop=True)
+
+
+
+################################################################################
+#### Dual-build (hg19 + hg38) variant ID functions
+################################################################################
+
+def other_build_helper(build):
+	## hg19 <--> hg38
+	return 'hg38' if build == 'hg19' else 'hg19'
+
+
+def other_build_hgvs_id_helper(df, build_other):
+	"""Other build HGVS IDs of SNVs from the ClinVar record's other build genomic
+	HGVS (NO query).
+
+	The position, ref & alt come from the other build's RefSeq chromosome entry of
+	hgvs.genomic (NOT the input build's ref & alt); IDs are dropped if that entry
+	is missing or disagrees with the <build_other>.start coordinate.
+
+	Args:
+		df: DF with chrom, hgvs.genomic & <build_other>.start columns
+		build_other:
+
+	Returns:
+		Pandas Series: HGVS IDs (NaN: NOT an SNV | NO matching other build HGVS)
+
+	"""
+	hgvs_ids = pd.Series(float('nan'), index=df.index, dtype=object)
+	
+	## other build RefSeq chromosome accession of each variant
+	chrom = df['chrom'].astype(str).str.upper().str.replace('^CHR', '', regex=True).replace('M', 'MT')
+	accession = chrom.map(REFSEQ_CHROM_ACCESSIONS[build_other])
+	start = df[build_other + '.start'].astype(str).str.strip()
+	candidates = accession.notnull() & start.str.fullmatch('[0-9]+') & df['hgvs.genomic'].notnull()
+	if not candidates.any():
+		return hgvs_ids
+	
+	## SNV genomic HGVS entries --> entry of the other build's chromosome accession & start
+	entries = df.loc[candidates, 'hgvs.genomic'].astype(str)\
+		.str.extractall(r'(NC_[0-9]+\.[0-9]+):g\.([0-9]+)([ACGT])>([ACGT])')
+	if len(entries.index) == 0:
+		return hgvs_ids
+	entries.columns = ['accession', 'pos', 'ref', 'alt']
+	rows = entries.index.get_level_values(0)
+	match = (entries['accession'].values == accession.loc[rows].values) & \
+			(entries['pos'].values == start.loc[rows].values)
+	entries = entries[match].groupby(level=0).first()
+	
+	hgvs_ids[entries.index] = 'chr' + chrom.loc[entries.index] + ':g.' + entries['pos'] \
+							  + entries['ref'] + '>' + entries['alt']
+	return hgvs_ids
 
-	## add columns for sorting full variant ClinVar DataFrame
-	if 'sort_chrN' not in cv_var_df.columns:
-		cv_var_df = add_chrN_sort_cols(cv_var_df, cols_var)
+
+def myvariant_lookup_other_build_ids(variant_ids, build_other):
+	"""Other build HGVS IDs (MyVariant _id) by ClinVar variant_id, through the query cache.
+
+	Args:
+		variant_ids: ClinVar variant IDs
+		build_other:
+
+	Returns:
+		dict: variant_id --> other build HGVS ID
+
+	"""
+	cache_keys = {v:(build_other, 'clinvar.variant_id:' + str(v)) for v in OrderedDict.fromkeys(variant_ids)}
+	id_dict = {}
+	if QUERY_CACHE['enabled']:
+		with _query_cache_lock:
+			for v, k in cache_keys.items():
+				if k in _query_cache:
+					_query_cache.move_to_end(k)
+					id_dict[v] = _query_cache[k]
+
+	ids_query = [v for v in cache_keys if v not in id_dict]
+	if len(ids_query) > 0:
+		raw_query_df = get_myvariant_client().querymany(ids_query, scopes='clinvar.variant_id',
+		                                                fields='clinvar.variant_id',
+		                                                assembly=build_other, as_dataframe=1)
+		if '_id' in raw_query_df.columns:
+			found = raw_query_df['_id'].dropna().groupby(level=0, sort=False).first()
+			id_dict.update({v:found[str(v)] for v in ids_query if str(v) in found.index})
+		if QUERY_CACHE['enabled']:
+			with _query_cache_lock:
+				for v in ids_query:
+					if v in id_dict:
+						_query_cache[cache_keys[v]] = id_dict[v]
+				while len(_query_cache) > QUERY_CACHE['max_entries']:
+					_query_cache.popitem(last=False)
+	return id_dict
+
+
+@prof.profiled('add_dual_build_ids')
+def add_dual_build_ids(result_dict, col_id, build, lookup=True):
+	"""Add the other build's HGVS ID column to the variant summary & full DFs
+	(annotations keyed for both assemblies, from ONE query & classification).
+
+	SNV IDs are derived from the ClinVar record's other build genomic HGVS &
+	coordinates; the remaining reported variants are looked up by ClinVar variant_id.
+
+	Args:
+		result_dict: process_clinvar_query results
+		col_id: input build HGVS ID column
+		build: input genome build
+		lookup: query MyVariant by variant_id for IDs NOT derived from coordinates
+
+	Returns:
+		dict: result_dict with the other build ID column next to col_id
+
+	"""
+	build_other = other_build_helper(build)
+	col_other = col_id.rsplit('.', 1)[0] + '.' + build_other
+	summ_df = result_dict['cv_var_summary_df']
+	
+	## derive SNV IDs --> look up remaining reported variants by variant_id
+	other_ids = other_build_hgvs_id_helper(summ_df, build_other)
+	missing = other_ids.isnull() & summ_df['variant_id'].notnull() & (summ_df['variant_id'] != '')
+	if lookup and missing.any():
+		print("\t.. looking up " + str(int(missing.sum())) + " " + build_other + " variant IDs by ClinVar variant_id")
+		id_dict = myvariant_lookup_other_build_ids(summ_df.loc[missing, 'variant_id'], build_other)
+		other_ids[missing] = summ_df.loc[missing, 'variant_id'].map(id_dict)
+	id_map = pd.Series(other_ids.values, index=summ_df[col_id].values)
+	id_map = id_map[~id_map.index.duplicated()]
 	
-	## sort full variant ClinVar DataFrame
-	sort_cols = [c for c in cv_var_df.columns if 'sort_' in c]
-	cv_var_df = cv_var_df.sort_values(['sort_chrN', 'sort_pos'],
-									  ascending=[True, True]).reset_index(drop=True)
-	cv_var_df.drop(sort_cols, axis=1, inplace=True)
-	return cv_var_df
+	## insert other build ID column after the input build ID column
+	for k in ['cv_var_summary_df', 'cv_full_df']:
+		df = result_dict[k]
+		if col_other in df.columns:
+			df = df.drop(columns=[col_other])
+		df.insert(df.columns.get_loc(col_id) + 1, col_other, df[col_id].map(id_map))
+		result_dict[k] = df
+	return result_dict
 
 
 
@@ -959,8 +1211,9 @@ def clinvar_summary_add_input_cols(cv_summary_df, input_var_df, col_id, col_clin
 #### Driver functions
 ################################################################################
 
+@prof.profiled('run_clinvar_query')
 def run_clinvar_query(input_var_df, build, col_id, col_clinsig=COL_CLINSIG,
-                      cols_int=cv_int_fields):
+                      cols_int=cv_int_fields, checkpoint_dir=None, resume=False):
 	"""
 
 	Args:
@@ -969,24 +1222,30 @@ def run_clinvar_query(input_var_df, build, col_id, col_clinsig=COL_CLINSIG,
 		col_id:
 		col_clinsig:
 		cols_int:
+		checkpoint_dir: checkpoint run directory - save the raw query & wrangled
+			RCV DFs (None: no checkpoints)
+		resume: load the completed steps' checkpoints instead of re-running them
 
 	Returns:
 
 	"""
 	## run ClinVar query
 	print("\t.. run ClinVar query")
-	cv_raw_df = myvariant_run_clinvar_query(input_var_df, col_hgvs=col_id, genome_build=build)
+	cv_raw_df = ckpt.run_step(checkpoint_dir, 'raw_query', resume, myvariant_run_clinvar_query,
+	                          input_var_df=input_var_df, col_hgvs=col_id, genome_build=build)
 	
 	if cv_raw_df is None:
 		return None
 	
 	## ClinVar query data wrangling
 	print("\t.. ClinVar query data wrangling")
-	cv_df = myvariant_clinvar_rcv_data_wrangling(cv_raw_df, col_id, col_clinsig, cols_int)
+	cv_df = ckpt.run_step(checkpoint_dir, 'wrangled', resume, myvariant_clinvar_rcv_data_wrangling,
+	                      cv_raw_df=cv_raw_df, col_id=col_id, col_clinsig=col_clinsig, cols_int=cols_int)
 	return cv_df
 
 
 
+@prof.profiled('process_clinvar_query')
 def process_clinvar_query(cv_df, input_var_df, cols_var, cols_input, col_id,
 						  col_clinsig=COL_CLINSIG, col_rcvclinsig=COL_CLINSIG+'.rcv',
 						  col_cond=COL_COND, col_rcv=COL_RCV, col_gene='gene.symbol'):
@@ -1008,9 +1267,7 @@ def process_clinvar_query(cv_df, input_var_df, cols_var, cols_input, col_id,
 
 	"""
 	## single value per variant columns
-	###################### @TODO: MAKE DYNAMIC!!!
-	cols_collapse_non_rcv = ['clinvar_status', 'preferred_name', 'variant_id', 'type', 'rsid', 'gene.symbol', 'chrom', 'ref', 'alt', 'hg19.start', 'hg19.end', 'hg38.start', 'hg38.end', 'hgvs.coding', 'hgvs.genomic']
-	############################################
+	cols_collapse_non_rcv = cv_non_rcv_fields
 	cols_cv_extracted = cv_df.columns.tolist()
 	
 	## generate variant ClinVar summary (1 row per variant)
@@ -1028,6 +1285,7 @@ def process_clinvar_query(cv_df, input_var_df, cols_var, cols_input, col_id,
 	## add variant summary DF columns to full ClinVar DF
 	print("\t.. adding variant summary DF columns to full ClinVar DF")
 	cv_full_df = add_clinvar_variant_summary_columns(cv_var_summary_df, cv_df, col_id=col_id, col_clinsig=col_clinsig, cols_cv=cols_cv_extracted, cols_var=cols_var, cols_input=cols_input)
+	cv_full_df = sort_full_df_by_summary(cv_full_df, cv_var_summary_df, col_id=col_id)
 	
 	return dict(cv_var_summary_df=cv_var_summary_df, cv_full_df=cv_full_df, input_df=input_var_df)
 
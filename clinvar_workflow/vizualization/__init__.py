@@ -1,6 +1,4 @@
 # __init__.py
-print(f'Invoking __init__.py for {__name__}')
-
 _COLOR_LINE = '#E1E5ED'  ## DEFAULT color
 _COLOR_BG = 'rgb(255,255,255)'
 
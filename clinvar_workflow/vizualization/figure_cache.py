@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import print_function
+import os
+import json
+import inspect
+import hashlib
+import functools
+
+## Pandas - setup
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+## Plotly data viz
+from plotly import __version__
+import plotly.graph_objs as go
+
+## ClinVar workflow imports
+from clinvar_workflow.helpers import clinsig_rgb_dict
+
+
+## figure cache settings: directory (None = cache disabled) & max size in bytes
+##  (least recently used files are evicted); bump the version when plot functions change
+FIGURE_CACHE = dict(cache_dir=os.environ.get('CLINVAR_WORKFLOW_FIGURE_CACHE'),
+                    max_bytes=256 * 1024**2)
+FIGURE_CACHE_VERSION = 1
+
+
+
+################################################################################
+#### Figure cache settings & fingerprint functions
+################################################################################
+
+def set_figure_cache(cache_dir=None, max_bytes=256 * 1024**2):
+	"""Enable (cache_dir) or disable (None) the figure & image cache.
+
+	Args:
+		cache_dir (str): cache directory (created if necessary).
+		max_bytes (int): max cache size.
+	"""
+	if cache_dir is not None:
+		cache_dir = os.path.abspath(cache_dir)
+		os.makedirs(cache_dir, exist_ok=True)
+	FIGURE_CACHE.update(cache_dir=cache_dir, max_bytes=max_bytes)
+
+
+def fingerprint_update_helper(h, obj):
+	"""Add an object's content to the hash (DataFrames, containers, functions, figures).
+
+	Args:
+		h: hashlib hash object
+		obj:
+	"""
+	if isinstance(obj, pd.DataFrame):
+		h.update(repr((obj.shape, [str(c) for c in obj.columns], [str(d) for d in obj.dtypes],
+		               list(obj.index.names), list(obj.columns.names))).encode('utf-8'))
+		try:
+			h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+		except TypeError:
+			h.update(obj.astype(str).to_csv().encode('utf-8'))
+	elif isinstance(obj, dict):
+		h.update(json.dumps(obj, sort_keys=True, default=str).encode('utf-8'))
+	elif isinstance(obj, (list, tuple)):
+		h.update(('seq' + str(len(obj))).encode('utf-8'))
+		for o in obj:
+			fingerprint_update_helper(h, o)
+	elif callable(obj) and hasattr(obj, '__qualname__'):
+		h.update((getattr(obj, '__module__', '') + '.' + obj.__qualname__).encode('utf-8'))
+	elif hasattr(obj, 'to_plotly_json'):
+		h.update(obj.to_json().encode('utf-8'))
+	else:
+		h.update(repr(obj).encode('utf-8'))
+
+
+def fingerprint(*objs):
+	"""Content hash of the objects (+ cache version & plotly version).
+
+	Returns:
+		str: hex digest
+
+	"""
+	h = hashlib.sha256()
+	fingerprint_update_helper(h, (FIGURE_CACHE_VERSION, __version__) + objs)
+	return h.hexdigest()
+
+
+
+################################################################################
+#### Figure cache file functions
+################################################################################
+
+def cache_get(key, ext):
+	"""Cached bytes (or None); a hit marks the file as recently used. Cache I/O
+	errors are misses.
+
+	Args:
+		key (str): fingerprint
+		ext (str): file extension ('.json', '.png', '.pdf')
+
+	Returns:
+		bytes
+
+	"""
+	if FIGURE_CACHE['cache_dir'] is None:
+		return None
+	fpath = os.path.join(FIGURE_CACHE['cache_dir'], key + ext)
+	try:
+		with open(fpath, 'rb') as f:
+			data = f.read()
+		os.utime(fpath)
+	except OSError:
+		return None
+	return data
+
+
+def cache_put(key, ext, data):
+	"""Store bytes in the cache (atomic rename), then evict by size. The cache
+	directory is created if necessary; cache I/O errors are NOT raised (warning).
+
+	Args:
+		key (str): fingerprint
+		ext (str): file extension
+		data (bytes):
+	"""
+	if FIGURE_CACHE['cache_dir'] is None:
+		return
+	fpath = os.path.join(FIGURE_CACHE['cache_dir'], key + ext)
+	fpath_tmp = fpath + '.' + str(os.getpid()) + '.' + str(id(data)) + '.tmp'
+	try:
+		os.makedirs(FIGURE_CACHE['cache_dir'], exist_ok=True)
+		with open(fpath_tmp, 'wb') as f:
+			f.write(data)
+		os.replace(fpath_tmp, fpath)
+		cache_evict()
+	except OSError as e:
+		print("\tWARNING: figure cache NOT updated: " + str(e))
+		if os.path.exists(fpath_tmp):
+			os.remove(fpath_tmp)
+
+
+def cache_evict(max_bytes=None):
+	"""Remove least recently used cache files until the cache fits max_bytes.
+
+	Args:
+		max_bytes (int): default FIGURE_CACHE['max_bytes']
+	"""
+	cache_dir = FIGURE_CACHE['cache_dir']
+	max_bytes = FIGURE_CACHE['max_bytes'] if max_bytes is None else max_bytes
+	if cache_dir is None:
+		return
+
+	entries = []
+	for entry in os.scandir(cache_dir):
+		if entry.is_file() and not entry.name.endswith('.tmp'):
+			st = entry.stat()
+			entries.append((st.st_mtime, st.st_size, entry.path))
+	total = sum(e[1] for e in entries)
+
+	for mtime, size, fpath in sorted(entries):
+		if total <= max_bytes:
+			break
+		try:
+			os.remove(fpath)
+		except FileNotFoundError:
+			pass
+		total -= size
+
+
+
+################################################################################
+#### Cached figures & images
+################################################################################
+
+def cached_figure(fxn):
+	"""Decorator: reuse the Plotly figure (JSON) of a previous call with the same
+	arguments (count DF content, plot parameters) & clinsig colors.
+
+	Args:
+		fxn: function returning a Plotly Figure
+
+	Returns:
+
+	"""
+	sig = inspect.signature(fxn)
+
+	@functools.wraps(fxn)
+	def cached_figure_fxn(*args, **kwargs):
+		if FIGURE_CACHE['cache_dir'] is None:
+			return fxn(*args, **kwargs)
+
+		## key: function, ALL arguments (incl. defaults) & clinsig colors
+		bound = sig.bind(*args, **kwargs)
+		bound.apply_defaults()
+		key = fingerprint(fxn, sorted(bound.arguments.items()), clinsig_rgb_dict)
+
+		## cached figure JSON was written by plotly --> skip re-validation
+		## unreadable cached figure --> miss
+		fig_json = cache_get(key, '.json')
+		if fig_json is not None:
+			try:
+				return go.Figure(json.loads(fig_json.decode('utf-8')), _validate=False)
+			except ValueError:
+				pass
+		fig = fxn(*args, **kwargs)
+		cache_put(key, '.json', fig.to_json().encode('utf-8'))
+		return fig
+	return cached_figure_fxn
+
+
+def image_cache_get(fig, fmt, height, width):
+	"""Cached image bytes of a figure.
+
+	Args:
+		fig:
+		fmt:
+		height:
+		width:
+
+	Returns:
+		tuple: (key, bytes | None) - key is None if the cache is disabled
+
+	"""
+	if FIGURE_CACHE['cache_dir'] is None:
+		return None, None
+	key = fingerprint(fig, fmt, height, width)
+	return key, cache_get(key, '.' + fmt)
+
+
+def image_cache_put(key, fmt, fpath):
+	"""Store a written image file in the cache.
+
+	Args:
+		key: image_cache_get key (None: cache disabled)
+		fmt:
+		fpath: image file path
+	"""
+	if key is None:
+		return
+	with open(fpath, 'rb') as f:
+		cache_put(key, '.' + fmt, f.read())
+
+
+def write_image_bytes_helper(data, fpath):
+	"""Write cached image bytes to the image file.
+
+	Args:
+		data (bytes):
+		fpath (str):
+	"""
+	with open(fpath, 'wb') as f:
+		f.write(data)
+
+
+
+
+
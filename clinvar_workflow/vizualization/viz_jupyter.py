@@ -11,10 +11,14 @@ pd.set_option('display.max_columns', None)
 ## Plotly data viz
 import plotly.graph_objs as go
 from plotly.offline import init_notebook_mode
-init_notebook_mode(connected=True)
 ## ipywidgets
-from ipywidgets import HBox, VBox, AppLayout, Accordion, Layout
+from ipywidgets import HBox, VBox, AppLayout, Accordion, Layout, Button, Label, HTML
 
+## grouped (gene | condition) tables: max # of rows per table page
+TABLE_PAGE_SIZE = 50
+
+## Plotly notebook mode: initialized on 1st display (NOT at import)
+_NOTEBOOK_MODE = dict(initialized=False)
 
 
 
@@ -22,6 +26,13 @@ from ipywidgets import HBox, VBox, AppLayout, Accordion, Layout
 #### Data Viz: Plotly Table functions
 ################################################################################
 
+def init_notebook_mode_helper():
+	## Plotly notebook mode (connected: plotly.js from CDN) - once per kernel
+	if not _NOTEBOOK_MODE['initialized']:
+		init_notebook_mode(connected=True)
+		_NOTEBOOK_MODE['initialized'] = True
+
+
 def get_clinsig_table(count_df, clinsig_type):
 	"""
 
@@ -110,7 +121,15 @@ def get_clinsig_table_color(count_df, clinsig_type, clinsig_color_dict):
 
 
 
-def get_grouped_clinsig_table(count_df):
+def grouped_clinsig_table_df(count_df):
+	"""
+
+	Args:
+		count_df:
+
+	Returns:
+
+	"""
 	## select non-zero columns & reset index
 	cols_keep = [c for c in count_df.columns if count_df[c].sum() > 0]
 	count_df = count_df[cols_keep].copy().reset_index(drop=False)
@@ -128,17 +147,42 @@ def get_grouped_clinsig_table(count_df):
 			  'Benign / Likely benign':'Benign<br>/ Likely<br>benign',
 			  'Uncertain significance':'Uncertain<br>significance'}
 	count_df.rename(columns=r_dict, inplace=True)
+	return count_df
 
-	## specify Cell & Header data
-	cell_vals = [count_df[c] for c in count_df.columns]
-	head_vals = ['<b>'+str(c)+'</b>' for c in count_df.columns]
 
-	## set up Table colors
-	headerColor = 'grey'
+def table_page_helper(table_df, page=0, page_size=None):
+	"""Table cell values & row fill colors of one page of rows.
+
+	Args:
+		table_df:
+		page:
+		page_size: # of rows per page (None: all rows)
+
+	Returns:
+
+	"""
+	if page_size is not None:
+		table_df = table_df.iloc[page*page_size:(page+1)*page_size]
+	cell_vals = [table_df[c] for c in table_df.columns]
+
+	## set up Table row colors
 	rowEvenColor = 'lightgrey'
 	rowOddColor = 'white'
-	fill_color=[[rowOddColor,rowEvenColor] * (int(count_df.shape[0]/2)+1)
+	fill_color=[[rowOddColor,rowEvenColor] * (int(table_df.shape[0]/2)+1)
 	            for _ in cell_vals]
+	return cell_vals, fill_color
+
+
+def get_grouped_clinsig_table(count_df, page_size=None):
+	## select non-zero columns, reset index & rename DF columns for Table
+	count_df = grouped_clinsig_table_df(count_df)
+
+	## specify Cell (first page) & Header data
+	cell_vals, fill_color = table_page_helper(count_df, page=0, page_size=page_size)
+	head_vals = ['<b>'+str(c)+'</b>' for c in count_df.columns]
+
+	## set up Table colors
+	headerColor = 'grey'
 
 	## set column widths
 	if 'Gene' in count_df.columns[0]:
@@ -287,17 +331,60 @@ def get_clinsig_plot_table_figure(count_df, cs_plot, clinsig_type='Variant',
 	return plot_table_fig, tmp_return
 
 
-def get_grouped_clinsig_plot_table_figure(count_df, count_plot):
+def get_table_pager_widget(table_widget, table_df, page_size=TABLE_PAGE_SIZE):
+	"""Previous / next page buttons: update the Table FigureWidget rows in place.
+
+	Args:
+		table_widget: Plotly Table FigureWidget
+		table_df: full Table DF (grouped_clinsig_table_df)
+		page_size:
+
+	Returns:
+
+	"""
+	nrow = table_df.shape[0]
+	n_page = max(-(-nrow // page_size), 1)
+	page = dict(i=0)
+	
+	btn_prev = Button(description='<', layout=Layout(width='40px'))
+	btn_next = Button(description='>', layout=Layout(width='40px'))
+	page_label = Label()
+	
+	def show_page(i):
+		page['i'] = min(max(i, 0), n_page-1)
+		cell_vals, fill_color = table_page_helper(table_df, page=page['i'], page_size=page_size)
+		with table_widget.batch_update():
+			table_widget.data[0].cells.update(dict(values=cell_vals, fill=dict(color=fill_color)))
+		page_label.value = 'rows ' + str(page['i']*page_size + 1) + '-' + \
+						   str(min((page['i']+1)*page_size, nrow)) + ' of ' + str(nrow)
+	
+	btn_prev.on_click(lambda b: show_page(page['i']-1))
+	btn_next.on_click(lambda b: show_page(page['i']+1))
+	show_page(0)
+	return HBox([btn_prev, page_label, btn_next])
+
+
+def get_grouped_clinsig_plot_table_figure(count_df, count_plot, page_size=TABLE_PAGE_SIZE):
 
 	## convert Plotly stacked bar Figure to FigureWidget
 	cs_plot_widget = get_bar_plot_figure_widget(go.Figure(count_plot))
 
-	## generate Plotly Table Figure & convert to FigureWidget
-	cs_table = get_grouped_clinsig_table(count_df.copy())
+	## generate Plotly Table Figure (first page of rows) & convert to FigureWidget
+	paged = (page_size is not None) and (count_df.shape[0] > page_size)
+	cs_table = get_grouped_clinsig_table(count_df.copy(), page_size=page_size if paged else None)
 	cs_table_widget = go.FigureWidget(cs_table)
 	cs_table_widget.layout.update(dict(autosize=True, margin=dict(autoexpand=True)))
 
 	curr_width = cs_table_widget.layout.width
+	table_box = HBox([cs_table_widget],
+					 layout=Layout(overflow='scroll',
+								   min_width=str(curr_width+20)+'px'))
+	
+	## large tables: page through the rows (instead of one giant Table trace)
+	if paged:
+		table_pager = get_table_pager_widget(cs_table_widget, grouped_clinsig_table_df(count_df.copy()),
+		                                     page_size=page_size)
+		table_box = VBox([table_pager, table_box])
 	
 	plot_table_fig = AppLayout(header=None,
 							  left_sidebar=None,
@@ -305,11 +392,9 @@ def get_grouped_clinsig_plot_table_figure(count_df, count_plot):
 										  layout=Layout(min_width=str(cs_plot_widget.layout.width)+'px',
 														overflow='scroll hidden')),
 							  right_sidebar=None,
-							  footer=HBox([cs_table_widget],
-										  layout=Layout(overflow='scroll',
-														min_width=str(curr_width+20)+'px')),
+							  footer=table_box,
 							  pane_widths=["0px", 10, "0px"],
-							  pane_heights=["0px", 3, "250px"])
+							  pane_heights=["0px", 3, "290px" if paged else "250px"])
 
 	##############################
 	#### @TODO: REMOVE ME AFTER DEV
@@ -324,37 +409,92 @@ def display_css(widget, css_class):
 	return widget
 
 
-def display_clinsig_exploratory_analysis(result_dict):
-	## generate Variant Clinical Significance Plotly Table
-	print("\t\t.. generating Variant Clinical Significance Plotly Table")
-	clinsig_var = get_clinsig_plot_annot_legend_figure(result_dict['clinsig_var']['plot'])
+def build_lazy_placeholder(widget):
+	## lazy placeholder (NOT yet built) --> build its widget in place
+	if getattr(widget, 'build_fxn', None) is not None:
+		widget.children = [widget.build_fxn()]
+		widget.build_fxn = None
+	return widget
+
+
+def lazy_accordion_helper(title, build_fxn, cache_dict, cache_key='plot_table_widget', lazy=True):
+	"""Accordion (1 section): build its widget when first expanded & cache it.
+
+	cache_dict[cache_key] is always filled: the built widget (lazy=False) or a VBox
+	placeholder, built in place when the section is first expanded (or by
+	build_lazy_placeholder).
+
+	Args:
+		title:
+		build_fxn: function returning the section widget
+		cache_dict: dict caching the built widget (e.g. result_dict[clinsig key])
+		cache_key:
+		lazy: False --> build the widget now (section expanded)
+
+	Returns:
+
+	"""
+	if not lazy:
+		if cache_key not in cache_dict:
+			cache_dict[cache_key] = build_fxn()
+		acc = Accordion(children=[build_lazy_placeholder(cache_dict[cache_key])])
+		acc.set_title(0, title)
+		return acc
+	
+	## collapsed section with placeholder (or cached widget)
+	if cache_key not in cache_dict:
+		cache_dict[cache_key] = VBox([HTML('Loading ...')])
+		cache_dict[cache_key].build_fxn = build_fxn
+	acc = Accordion(children=[cache_dict[cache_key]], selected_index=None)
+	acc.set_title(0, title)
+	
+	def on_expand(change):
+		if change['new'] is not None:
+			build_lazy_placeholder(acc.children[0])
+	
+	acc.observe(on_expand, names='selected_index')
+	return acc
+
 
-	## generate Variant-Condition (RCV) Clinical Significance Plotly Table
-	print("\t\t.. generating Variant-Condition (RCV) Clinical Significance Plotly Table")
-	clinsig_rcv = get_clinsig_plot_annot_legend_figure(result_dict['clinsig_rcv']['plot'])
+def display_clinsig_exploratory_analysis(result_dict, lazy=True, page_size=TABLE_PAGE_SIZE):
+	"""
 
-	## generate Gene Variant Clinical Significance Plotly Table
-	print("\t\t.. generating Gene Variant Clinical Significance Plotly Table")
-	gene = get_grouped_clinsig_plot_table_figure(result_dict['clinsig_var_gene']['df'],
-												 result_dict['clinsig_var_gene']['plot'])
+	Args:
+		result_dict:
+		lazy: build each section's figures when its Accordion is first expanded
+		page_size: grouped tables: max # of rows per table page (None: all rows)
+
+	Returns:
 
-	## generate Condition Variant Clinical Significance Plotly Table
-	print("\t\t.. generating Condition Variant Clinical Significance Plotly Table")
-	cond = get_grouped_clinsig_plot_table_figure(result_dict['clinsig_var_cond']['df'],
-												 result_dict['clinsig_var_cond']['plot'])
+	"""
+	init_notebook_mode_helper()
 	
-	## generate containers to display widgets
+	## figure builders: Clinical Significance donut plots
+	def build_clinsig(k, desc):
+		print("\t\t.. generating " + desc + " Plotly Table")
+		return get_clinsig_plot_annot_legend_figure(result_dict[k]['plot'])
+	
+	## figure builders: grouped (gene | condition) stacked bar plots & Tables
+	def build_grouped(k, desc):
+		print("\t\t.. generating " + desc + " Plotly Table")
+		return get_grouped_clinsig_plot_table_figure(result_dict[k]['df'], result_dict[k]['plot'],
+		                                             page_size=page_size)[0]
+	
+	## (result_dict key, Accordion title, builder, builder description)
+	sections = [('clinsig_var', 'Variant Clinical Significance', build_clinsig,
+				 'Variant Clinical Significance'),
+				('clinsig_rcv', 'Variant-Condition (RCV) Clinical Significance', build_clinsig,
+				 'Variant-Condition (RCV) Clinical Significance'),
+				('clinsig_var_gene', 'Variant Clinical Significance, grouped by Gene', build_grouped,
+				 'Gene Variant Clinical Significance'),
+				('clinsig_var_cond', 'Variant Clinical Significance, grouped by Condition', build_grouped,
+				 'Condition Variant Clinical Significance')]
+	
+	## generate list of Accordion containers (widgets cached in result_dict[k]['plot_table_widget'])
 	print("\t\t.. generating containers to display widgets")
-	clinsig_fig_list = [clinsig_var, clinsig_rcv, gene[0], cond[0]]
-	acc_titles = ['Variant Clinical Significance',
-				  'Variant-Condition (RCV) Clinical Significance',
-				  'Variant Clinical Significance, grouped by Gene',
-				  'Variant Clinical Significance, grouped by Condition']
-
-	## generate list of Accordion containers
-	acc_list = [Accordion(children=[plot_table_widget]) for plot_table_widget in clinsig_fig_list]
-	for i in range(len(acc_list)):
-		acc_list[i].set_title(0, acc_titles[i])
+	acc_list = [lazy_accordion_helper(title, lambda k=k, fxn=fxn, desc=desc: fxn(k, desc),
+	                                  result_dict[k], lazy=lazy)
+				for k, title, fxn, desc in sections]
 	
 	print("\t\t.. assembling results to display")
 	## assemble side-by-side donut plots
@@ -362,15 +502,6 @@ def display_clinsig_exploratory_analysis(result_dict):
 	
 	## assemble results to display
 	display_acc = VBox([donut_acc, acc_list[2], acc_list[3]])
-	
-	##############################
-	#### @TODO: REMOVE ME AFTER DEV
-	cs_keys = ['clinsig_var', 'clinsig_rcv', 'clinsig_var_gene', 'clinsig_var_cond']
-	viz_list = [clinsig_var, clinsig_rcv, gene[0], cond[0]]
-	for k,v in zip(cs_keys, viz_list):
-		result_dict[k]['plot_table_widget'] = v
-	##############################
-	
 	return result_dict, display_acc
 
 
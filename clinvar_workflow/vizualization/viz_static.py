@@ -18,22 +18,39 @@ import plotly.graph_objs as go
 from clinvar_workflow.helpers import clinsig_rgb_dict
 from clinvar_workflow.helpers import sorting as sort
 from clinvar_workflow.vizualization import _COLOR_LINE, _COLOR_BG
+from clinvar_workflow.vizualization import figure_cache as fc
 
 
+## static image formats (images/ sub-directory names)
+PLOT_FORMATS = ('png', 'pdf')
+
+## stacked bar plots: top N groups, remaining groups bar label & excluded conditions
+PLOT_TOP_N = 25
+PLOT_OTHER_LABEL = 'Other'
+PLOT_COND_EXCLUDE = ['not provided', 'not specified']
+
+## stacked bar plots, large-data mode (> PLOT_PAGE_GROUPS groups):
+##  max # of plotted groups (rest --> 1 aggregated bar), groups visible at once & max label length
+PLOT_MAX_GROUPS = 200
+PLOT_PAGE_GROUPS = 50
+PLOT_MAX_LABEL = 40
+
 
 ################################################################################
 #### REQUIRED write plot file helper function
 ################################################################################
 
-def write_plot_helper(fig, fig_file, out_dir, height=None, width=None):
-	"""
+def plot_size_helper(fig, height=None, width=None):
+	"""Image height & width: figure layout --> user value --> default.
 
 	Args:
 		fig:
-		fig_file:
-		out_dir:
 		height:
 		width:
+
+	Returns:
+		tuple: (height, width)
+
 	"""
 	## specify image height
 	if ('height' in fig.layout) & (fig.layout['height'] is not None):
@@ -55,10 +72,89 @@ def write_plot_helper(fig, fig_file, out_dir, height=None, width=None):
 			w = 600
 		else:
 			w=600
+	return h, w
+
+
+def write_plot_helper(fig, fig_file, out_dir, height=None, width=None, formats=PLOT_FORMATS):
+	"""
+
+	Args:
+		fig:
+		fig_file:
+		out_dir:
+		height:
+		width:
+		formats: image formats to write ('png', 'pdf')
+	"""
+	h, w = plot_size_helper(fig, height=height, width=width)
 	
-	## write image files - pdf & png
-	pio.write_image(fig, os.path.join(out_dir, 'png', fig_file+'.png'), height=h, width=w)
-	pio.write_image(fig, os.path.join(out_dir, 'pdf', fig_file+'.pdf'), height=h, width=w)
+	## write image files - pdf & png (cached images: NO rendering)
+	for fmt in formats:
+		fpath = os.path.join(out_dir, fmt, fig_file+'.'+fmt)
+		key, img = fc.image_cache_get(fig, fmt, h, w)
+		if img is not None:
+			fc.write_image_bytes_helper(img, fpath)
+			continue
+		pio.write_image(fig, fpath, height=h, width=w)
+		fc.image_cache_put(key, fmt, fpath)
+
+
+def kaleido_batch_helper():
+	"""Test if plotly can export a batch of images with one Kaleido (v1+) process.
+
+	Returns:
+		bool
+
+	"""
+	if not hasattr(pio, 'write_images'):
+		return False
+	try:
+		import kaleido
+	except ImportError:
+		return False
+	## Kaleido v1+ exposes the Kaleido (browser process) class
+	return hasattr(kaleido, 'Kaleido')
+
+
+def write_plot_batch_helper(plot_list, out_dir, formats=PLOT_FORMATS, height=None, width=None):
+	"""Write all figures, in all requested formats, with ONE image export call.
+	
+	With Kaleido v1+ every image is rendered by the same browser process
+	(pio.write_images). Older plotly/Kaleido versions fall back to
+	write_plot_helper, which reuses the Kaleido 0.x scope process.
+
+	Args:
+		plot_list (List[list]): [fig, fig_file] per figure.
+		out_dir (str): images directory (contains one sub-directory per format).
+		formats (tuple): image formats to write ('png', 'pdf').
+		height (int): default image height.
+		width (int): default image width.
+	"""
+	if not kaleido_batch_helper():
+		for fig, fig_file in plot_list:
+			write_plot_helper(fig, fig_file, out_dir, height=height, width=width, formats=formats)
+		return
+	
+	## one entry per figure x format (cached images: written, NOT rendered)
+	figs, files, heights, widths, keys = [], [], [], [], []
+	for fig, fig_file in plot_list:
+		h, w = plot_size_helper(fig, height=height, width=width)
+		for fmt in formats:
+			fpath = os.path.join(out_dir, fmt, fig_file+'.'+fmt)
+			key, img = fc.image_cache_get(fig, fmt, h, w)
+			if img is not None:
+				fc.write_image_bytes_helper(img, fpath)
+				continue
+			figs.append(fig)
+			files.append(fpath)
+			heights.append(h)
+			widths.append(w)
+			keys.append((key, fmt))
+	
+	if len(figs) > 0:
+		pio.write_images(figs, files, height=heights, width=widths)
+		for (key, fmt), fpath in zip(keys, files):
+			fc.image_cache_put(key, fmt, fpath)
 
 
 
@@ -115,17 +211,89 @@ def clinsig_color_donut(fig, clinsig_color_dict=clinsig_rgb_dict):
 #### Data Viz: Plotly Clinical Significance by GROUP stacked bar plot functions
 ################################################################################
 
+def large_bar_df_helper(df, max_groups=PLOT_MAX_GROUPS, other_label=PLOT_OTHER_LABEL, other_first=False):
+	"""Keep the max_groups-1 largest groups (by Total) & sum the rest into one bar.
+
+	Args:
+		df: grouped count DF (groups = index)
+		max_groups:
+		other_label: aggregated bar label (an existing other_label row is added to it)
+		other_first: put the aggregated bar first (instead of last)
+
+	Returns:
+
+	"""
+	if df.shape[0] <= max_groups:
+		return df
+	
+	## existing remaining groups row: NEVER kept as a group
+	is_other = pd.Series(df.index == other_label, index=range(df.shape[0]))
+	total = df['Total'] if 'Total' in df.columns else df.sum(axis=1)
+	total = total.reset_index(drop=True)
+	keep = total[~is_other].nlargest(max_groups-1, keep='first').index
+	mask = pd.Series(False, index=range(df.shape[0]))
+	mask[keep] = True
+	
+	## aggregated bar: sum of the remaining groups (original group order is kept)
+	rest = df[~mask.values]
+	n_rest = str(int((~mask & ~is_other).sum())) + ('+' if is_other.any() else '')
+	other_df = pd.DataFrame([rest.sum(axis=0).values], columns=df.columns,
+	                        index=[other_label + ' (' + n_rest + ')'])
+	if other_first:
+		return pd.concat([other_df, df[mask.values]], axis=0)
+	return pd.concat([df[mask.values], other_df], axis=0)
+
+
+def pin_other_row_helper(df, other_label=PLOT_OTHER_LABEL, first=False):
+	## move the remaining groups row to the end of the bar axis (after sorting rows)
+	if (other_label is None) or (other_label not in df.index):
+		return df
+	mask = df.index == other_label
+	if first:
+		return pd.concat([df[mask], df[~mask]], axis=0)
+	return pd.concat([df[~mask], df[mask]], axis=0)
+
+
+def truncate_labels_helper(labels, max_len=PLOT_MAX_LABEL):
+	"""Truncate group labels to max_len characters (vectorized), keeping labels unique.
+
+	Args:
+		labels:
+		max_len:
+
+	Returns:
+
+	"""
+	labels = pd.Series(labels, dtype=str)
+	long_label = labels.str.len() > max_len
+	labels[long_label] = labels[long_label].str.slice(0, max_len-3) + '...'
+	
+	## truncated labels sharing a prefix --> add suffix
+	dup = labels.duplicated(keep=False) & long_label
+	labels[dup] = labels[dup] + ' [' + (labels[dup].groupby(labels[dup]).cumcount() + 1).astype(str) + ']'
+	return labels.tolist()
+
+
 def plot_stacked_bar_horizontal(df, title, title_group, title_count, axis_order='total',
-								bg_color=_COLOR_BG, line_color=_COLOR_LINE):
+								bg_color=_COLOR_BG, line_color=_COLOR_LINE,
+								max_groups=PLOT_MAX_GROUPS, page_groups=PLOT_PAGE_GROUPS,
+								max_label=PLOT_MAX_LABEL):
+	#### large-data mode: aggregate groups, truncate labels & show 1 page of groups (pan to scroll)
+	large = df.shape[0] > page_groups
+	if large:
+		df = large_bar_df_helper(df, max_groups=max_groups, other_first=True)
+		y_values = truncate_labels_helper(df.index, max_len=max_label)
+	else:
+		y_values = df.index.tolist()
+	
 	#### generate Plotly traces
-	y_values=df.index.tolist()
 	traces = [go.Bar(name=c, y=y_values, x=df[c].tolist(), orientation='h')
 					for c in df.columns if c.lower()!='total']
 
 	#### setup plot layout
 	## specify plot & formatting variables
 	axis_title_font = dict(size=14)
-	grp_max = pd.Series(df.index).apply(lambda x: len(x)).max()
+	grp_max = pd.Series(y_values, dtype=str).str.len().max()
 	grp_offset = (grp_max*6 + 35)
 	margin_l = grp_offset + 15
 	margin_r = 30
@@ -176,6 +344,12 @@ def plot_stacked_bar_horizontal(df, title, title_group, title_count, axis_order=
 					   autosize=False,
 					   legend=_legend)
 	
+	## large-data mode: bounded height, last page of groups (top) shown
+	if large:
+		n = len(y_values)
+		_axis_y.update(dict(autorange=False, range=[n-page_groups-0.5, n-0.5]))
+		layout_dict.update(dict(height=450+(page_groups * 4), dragmode='pan'))
+	
 	## generate Ploty Figure
 	bar_plot = go.Figure(data=traces, layout=layout_dict)
 
@@ -186,9 +360,18 @@ def plot_stacked_bar_horizontal(df, title, title_group, title_count, axis_order=
 
 
 def plot_stacked_bar_vertical(df, title, title_group, title_count, axis_order='total',
-							  bg_color=_COLOR_BG, line_color=_COLOR_LINE):
+							  bg_color=_COLOR_BG, line_color=_COLOR_LINE,
+							  max_groups=PLOT_MAX_GROUPS, page_groups=PLOT_PAGE_GROUPS,
+							  max_label=PLOT_MAX_LABEL):
+	#### large-data mode: aggregate groups, truncate labels & show 1 page of groups (range slider)
+	large = df.shape[0] > page_groups
+	if large:
+		df = large_bar_df_helper(df, max_groups=max_groups, other_first=False)
+		x_values = truncate_labels_helper(df.index, max_len=max_label)
+	else:
+		x_values = df.index.tolist()
+	
 	#### generate Plotly traces
-	x_values = df.index.tolist()
 	traces = [go.Bar(name=c, x=x_values, y=df[c].tolist(), orientation='v')
 					for c in df.columns if c.lower()!='total']
 
@@ -196,7 +379,7 @@ def plot_stacked_bar_vertical(df, title, title_group, title_count, axis_order='t
 	## specify plot & formatting variables
 	axis_title_font = dict(size=14)
 	grp_tickangle = -45
-	grp_max = pd.Series(df.index).apply(lambda x: len(x)).max()
+	grp_max = pd.Series(x_values, dtype=str).str.len().max()
 	grp_offset = grp_max * 9.5 * (-grp_tickangle/100) + 35
 	margin_b = grp_offset + 20
 	margin_r = 70
@@ -243,6 +426,11 @@ def plot_stacked_bar_vertical(df, title, title_group, title_count, axis_order='t
 					   autosize=False,
 					   legend=_legend)
 	
+	## large-data mode: first page of groups shown
+	if large:
+		_axis_x.update(dict(autorange=False, range=[-0.5, page_groups-0.5],
+		                    rangeslider=dict(visible=True, thickness=0.05)))
+	
 	## generate Ploty Figure
 	bar_plot = go.Figure(data=traces, layout=layout_dict)
 
@@ -251,7 +439,9 @@ def plot_stacked_bar_vertical(df, title, title_group, title_count, axis_order='t
 	return bar_plot
 
 
-def plot_clinsig_stacked_bar_by_gene(plot_df, col_clinsig, axis_order=None):
+@fc.cached_figure
+def plot_clinsig_stacked_bar_by_gene(plot_df, col_clinsig, axis_order=None, top_n=PLOT_TOP_N,
+                                     other_label=PLOT_OTHER_LABEL):
 	if axis_order is None:
 		axis_order='total'
 	
@@ -265,7 +455,7 @@ def plot_clinsig_stacked_bar_by_gene(plot_df, col_clinsig, axis_order=None):
 	plot_title = 'ClinVar ' + clinsig_type + ' Clinical Significance classifications<br>' + count_title + ', grouped by <i>Gene</i>'
 	
 	## filter top N genes for plot
-	num_gene = 25
+	num_gene = top_n
 	if plot_df.shape[0] > num_gene:
 		tmp_df = sort.sort_grouped_count_df_total(plot_df)
 		plot_df = tmp_df.head(num_gene)
@@ -283,6 +473,9 @@ def plot_clinsig_stacked_bar_by_gene(plot_df, col_clinsig, axis_order=None):
 		plot_df = sort.sort_grouped_count_df_total(plot_df)
 	else:
 		plot_df = sort.sort_grouped_count_df_alpha(plot_df)
+	
+	## remaining genes bar: last (right)
+	plot_df = pin_other_row_helper(plot_df, other_label=other_label)
 
 	## call stacked bar function
 	bar_plot = plot_stacked_bar_vertical(plot_df[cols_plot],
@@ -293,7 +486,9 @@ def plot_clinsig_stacked_bar_by_gene(plot_df, col_clinsig, axis_order=None):
 	return bar_plot
 
 
-def plot_clinsig_stacked_bar_by_condition(plot_df, col_clinsig):
+@fc.cached_figure
+def plot_clinsig_stacked_bar_by_condition(plot_df, col_clinsig, top_n=PLOT_TOP_N,
+                                          other_label=PLOT_OTHER_LABEL):
 	## set up plot & axis titles
 	if 'rcv' in col_clinsig:
 		clinsig_type = 'Variant-Condition (RCV)'
@@ -303,10 +498,10 @@ def plot_clinsig_stacked_bar_by_condition(plot_df, col_clinsig):
 	plot_title = 'ClinVar ' + clinsig_type + ' Clinical Significance classifications<br>' + count_title + ', grouped by <i>Condition</i>'
 	
 	## exclude 'not provided', 'not specified' rows
-	plot_df = plot_df[~plot_df.index.isin(['not provided', 'not specified'])].copy()
+	plot_df = plot_df[~plot_df.index.isin(PLOT_COND_EXCLUDE)].copy()
 	
 	## filter top N cond for plot
-	num_cond = 25
+	num_cond = top_n
 	if plot_df.shape[0] > num_cond:
 		tmp_df = sort.sort_grouped_count_df_total(plot_df)
 		plot_df = tmp_df.head(num_cond)
@@ -321,6 +516,9 @@ def plot_clinsig_stacked_bar_by_condition(plot_df, col_clinsig):
 	
 	## sort DF rows
 	plot_df = sort.sort_grouped_count_df_total(plot_df, ascending=False)
+	
+	## remaining conditions bar: last (bottom)
+	plot_df = pin_other_row_helper(plot_df, other_label=other_label, first=True)
 
 	## call stacked bar function
 	bar_plot = plot_stacked_bar_horizontal(plot_df[cols_plot],
@@ -381,7 +579,7 @@ def plot_donut(df, col_label, col_value, title, bg_color=_COLOR_BG):
 def plot_donut_annot_legend(df, col_label, col_value, title, bg_color=_COLOR_BG):
 	## add value to clinsig label str
 	df = df.copy()
-	df['label'] = df[col_label] + ' (' + df[col_value].astype(str) + ')'
+	df['label'] = df[col_label].astype(str) + ' (' + df[col_value].astype(str) + ')'
 	
 	## generate Pie trace
 	trace= go.Pie(labels=df['label'],
@@ -424,6 +622,7 @@ def plot_donut_annot_legend(df, col_label, col_value, title, bg_color=_COLOR_BG)
 
 	
 
+@fc.cached_figure
 def plot_clinsig_donut(count_df, clinsig_col, plot_fxn=plot_donut_annot_legend):
 	## dynamically set up plot title
 	if 'rcv' in clinsig_col:
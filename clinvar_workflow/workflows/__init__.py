@@ -1,2 +1 @@
 # __init__.py
-print(f'Invoking __init__.py for {__name__}')
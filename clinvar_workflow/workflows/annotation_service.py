@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# coding: utf-8
+from __future__ import print_function
+import os
+import json
+import tempfile
+import threading
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+## import ClinVar workflow submodules
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.workflows import annotation_workflow as annot
+from clinvar_workflow.helpers import clinsig_sort_dict, clinsig_rgb_dict
+from clinvar_workflow.helpers import profiling as prof
+
+## Pandas - setup
+import pandas as pd
+pd.options.mode.chained_assignment = None
+
+
+
+################################################################################
+#### Annotation service variables
+################################################################################
+
+## service defaults: worker threads, queued requests (beyond the running ones),
+##  query response cache size (variant IDs), rows per streamed chunk & request body size (bytes)
+SERVICE_MAX_WORKERS = 4
+SERVICE_MAX_QUEUE = 64
+SERVICE_CACHE_ENTRIES = 500000
+SERVICE_CHUNK_ROWS = 5000
+SERVICE_MAX_BODY = 64 * 1024**2
+
+## optional annotation request fields --> defaults (out_dir: also write the output files;
+##  var_file & out_dir: ONLY inside the service data root, disabled without one)
+SERVICE_REQUEST_FIELDS = dict(build='hg19', cols_var=['CHR', 'POS', 'REF', 'ALT'], cols_input=[],
+                              table='summary', format='tsv', out_dir=None, out_prefix='',
+                              dual_build=False)
+
+## result tables
+SERVICE_TABLES = {'summary':'cv_var_summary_df', 'full':'cv_full_df'}
+
+
+
+################################################################################
+#### Annotation service job functions
+################################################################################
+
+def service_warm_up(cache_entries=SERVICE_CACHE_ENTRIES):
+	"""Load everything a request needs once: clinsig dicts, MyVariant client
+	(HTTP connection pool) & query response cache.
+
+	Args:
+		cache_entries (int): query response cache size (variant IDs)
+	"""
+	print("\t.. clinsig settings: " + str(len(clinsig_sort_dict)) + " labels, "
+	      + str(len(clinsig_rgb_dict)) + " colors")
+	print("\t.. MyVariant client: " + cv_query.get_myvariant_client().url)
+	cv_query.set_query_cache(True, max_entries=cache_entries)
+	
+	## stage profiling: ONE process-wide session --> NOT per request (concurrent jobs)
+	if prof.PROFILE['path'] is not None:
+		print("\tWARNING: stage profiling is NOT supported by the service --> profiling disabled")
+		prof.set_profiling(None)
+
+
+def service_path_helper(path, data_root, field):
+	"""Resolve a request path (relative to | inside the service data root).
+
+	Args:
+		path (str): request path
+		data_root (str): service data root (None: request paths disabled)
+		field (str): request field name
+
+	Returns:
+		str: resolved path
+
+	"""
+	if data_root is None:
+		raise ValueError("'" + field + "' is disabled: the service has NO data root")
+	if not isinstance(path, str):
+		raise ValueError("'" + field + "' must be a path string")
+	
+	## resolve symlinks & '..' --> must stay inside the data root
+	root = os.path.realpath(data_root)
+	fpath = os.path.realpath(os.path.join(root, path))
+	if os.path.commonpath([root, fpath]) != root:
+		raise ValueError("'" + field + "' must be inside the service data root")
+	return fpath
+
+
+def column_names_helper(cols, field, n=None):
+	## request column names: list of (n) strings
+	if (not isinstance(cols, list)) or (not all(isinstance(c, str) for c in cols)) or \
+			((n is not None) and (len(cols) != n)):
+		raise ValueError("'" + field + "' must be a list of " + ('' if n is None else str(n) + ' ')
+		                 + "column name strings")
+	return cols
+
+
+def parse_annotation_request(body, data_root=None):
+	"""Validate an annotation request (JSON).
+
+	Variants are sent as file content ('variants': tab | comma-separated text) or
+	as a path inside the service data root ('var_file').
+
+	Args:
+		body (bytes): request body
+		data_root (str): service data root: the ONLY directory tree 'var_file' &
+			'out_dir' may point to (None: both disabled)
+
+	Returns:
+		dict: request fields (with defaults)
+
+	"""
+	try:
+		request = json.loads(body.decode('utf-8'))
+	except ValueError:
+		raise ValueError('Request body is NOT valid JSON')
+	if not isinstance(request, dict):
+		raise ValueError('Request body must be a JSON object')
+	if ('variants' in request) == ('var_file' in request):
+		raise ValueError("Request must contain ONE of: 'variants' (file content), 'var_file' (path)")
+
+	request = dict(SERVICE_REQUEST_FIELDS, **request)
+	if request['build'] not in ['hg19', 'hg38']:
+		raise ValueError('Unsupported genome build: ' + str(request['build']))
+	if request['table'] not in SERVICE_TABLES:
+		raise ValueError('Unsupported table: ' + str(request['table']) + ' (summary | full)')
+	if request['format'] not in ['tsv', 'csv']:
+		raise ValueError('Unsupported variants format: ' + str(request['format']) + ' (tsv | csv)')
+	column_names_helper(request['cols_var'], 'cols_var', n=4)
+	if request['cols_input'] is not None:
+		column_names_helper(request['cols_input'], 'cols_input')
+	
+	## file system access: ONLY inside the service data root
+	if 'var_file' in request:
+		request['var_file'] = service_path_helper(request['var_file'], data_root, 'var_file')
+	if request['out_dir'] is not None:
+		request['out_dir'] = service_path_helper(request['out_dir'], data_root, 'out_dir')
+	return request
+
+
+def annotation_job(request):
+	"""Run the annotation workflow for one request.
+
+	Args:
+		request (dict): parse_annotation_request fields
+
+	Returns:
+		tuple: requested result table (Pandas DataFrame, None if NO variants found in
+			ClinVar), request output directory (None: NO output files)
+
+	"""
+	var_file = request.get('var_file')
+	tmp_file = None
+	if var_file is None:
+		## variants file content --> temporary input file
+		with tempfile.NamedTemporaryFile('w', suffix='.' + ('csv' if request['format'] == 'csv' else 'txt'),
+		                                 delete=False) as f:
+			f.write(request['variants'])
+			tmp_file = var_file = f.name
+
+	write_output = request['out_dir'] is not None
+	try:
+		## output files: own directory per request (concurrent requests: same out_dir, out_prefix & second)
+		out_dir = tempfile.mkdtemp(prefix=(request['out_prefix'] or 'request') + '_',
+		                           dir=request['out_dir']) if write_output else None
+		results = annot.run_clinvar_annotation(var_file=var_file,
+		                                       out_dir=out_dir if write_output else tempfile.gettempdir(),
+		                                       out_prefix=request['out_prefix'],
+		                                       build=request['build'],
+		                                       cols_var=request['cols_var'],
+		                                       cols_input=request['cols_input'],
+		                                       write_output=write_output,
+		                                       write_excel=False,
+		                                       dual_build=bool(request['dual_build']))
+	finally:
+		if tmp_file is not None:
+			os.remove(tmp_file)
+
+	if results is None:
+		return None, out_dir
+	result_dict = results if write_output else results['result_dict']
+	return result_dict[SERVICE_TABLES[request['table']]], out_dir
+
+
+
+################################################################################
+#### Annotation service HTTP functions
+################################################################################
+
+class AnnotationRequestHandler(BaseHTTPRequestHandler):
+	"""HTTP handler: GET /health, POST /annotate (JSON request --> streamed TSV result)."""
+
+	protocol_version = 'HTTP/1.1'
+
+	def address_string(self):
+		## Unix socket clients have NO address
+		return str(self.client_address[0]) if self.client_address else 'unix-socket'
+
+	def send_json(self, status, obj):
+		body = json.dumps(obj).encode('utf-8')
+		self.send_response(status)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def send_chunk(self, data):
+		## HTTP/1.1 chunked transfer encoding
+		self.wfile.write(('%x\r\n' % len(data)).encode('ascii') + data + b'\r\n')
+
+	def stream_df(self, df, chunk_rows, headers=None):
+		## stream the result table as TSV chunks --> clients read rows while the rest is serialized
+		self.send_response(200)
+		self.send_header('Content-Type', 'text/tab-separated-values; charset=utf-8')
+		self.send_header('Transfer-Encoding', 'chunked')
+		self.send_header('X-Result-Rows', str(len(df.index)))
+		for k, v in (headers or {}).items():
+			self.send_header(k, v)
+		self.end_headers()
+		for i in range(0, max(len(df.index), 1), chunk_rows):
+			chunk = df.iloc[i:i + chunk_rows].to_csv(sep='\t', index=False, header=(i == 0))
+			self.send_chunk(chunk.encode('utf-8'))
+		self.send_chunk(b'')
+
+	def do_GET(self):
+		if self.path != '/health':
+			return self.send_json(404, dict(error='NOT found: ' + self.path))
+		self.send_json(200, self.server.service.status())
+
+	def do_POST(self):
+		if self.path != '/annotate':
+			return self.send_json(404, dict(error='NOT found: ' + self.path))
+		
+		## request body size: required & bounded (unread body --> close the connection)
+		length = self.headers.get('Content-Length')
+		if length is None:
+			self.close_connection = True
+			return self.send_json(411, dict(error='Content-Length header required'))
+		try:
+			length = int(length)
+			if length < 0:
+				raise ValueError
+		except ValueError:
+			self.close_connection = True
+			return self.send_json(400, dict(error='Invalid Content-Length: ' + str(length)))
+		if length > self.server.service.max_body:
+			self.close_connection = True
+			return self.send_json(413, dict(error='Request body exceeds ' + str(self.server.service.max_body)
+			                                      + ' bytes'))
+		body = self.rfile.read(length)
+		try:
+			request = parse_annotation_request(body, data_root=self.server.service.data_root)
+		except ValueError as e:
+			return self.send_json(400, dict(error=str(e)))
+
+		## bounded worker pool: reject when running + queued requests are at capacity
+		future = self.server.service.submit(request)
+		if future is None:
+			return self.send_json(503, dict(error='Annotation queue full - retry later'))
+		try:
+			df, out_dir = future.result()
+		except (ValueError, FileNotFoundError) as e:
+			return self.send_json(400, dict(error=str(e)))
+		except Exception as e:
+			return self.send_json(500, dict(error=type(e).__name__ + ': ' + str(e)))
+
+		if df is None:
+			return self.send_json(404, dict(error='NONE of the input variants were found in ClinVar'))
+		headers = None
+		if out_dir is not None:
+			headers = {'X-Output-Dir': os.path.relpath(out_dir, self.server.service.data_root)}
+		self.stream_df(df, self.server.service.chunk_rows, headers=headers)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	daemon_threads = True
+
+
+class AnnotationService(object):
+	"""Bounded worker pool running annotation jobs (shared by all HTTP connections)."""
+
+	def __init__(self, max_workers=SERVICE_MAX_WORKERS, max_queue=SERVICE_MAX_QUEUE,
+	             chunk_rows=SERVICE_CHUNK_ROWS, data_root=None, max_body=SERVICE_MAX_BODY):
+		self.max_workers = max_workers
+		self.data_root = data_root
+		self.max_queue = max_queue
+		self.chunk_rows = chunk_rows
+		self.max_body = max_body
+		self._executor = ThreadPoolExecutor(max_workers=max_workers,
+		                                    thread_name_prefix='annotation')
+		self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+		self._lock = threading.Lock()
+		self._counts = dict(pending=0, completed=0, failed=0, rejected=0)
+
+	def submit(self, request):
+		## Future of the annotation job (None if the queue is full)
+		if not self._slots.acquire(blocking=False):
+			with self._lock:
+				self._counts['rejected'] += 1
+			return None
+		with self._lock:
+			self._counts['pending'] += 1
+		future = self._executor.submit(annotation_job, request)
+		future.add_done_callback(self._job_done)
+		return future
+
+	def _job_done(self, future):
+		with self._lock:
+			self._counts['pending'] -= 1
+			self._counts['failed' if future.exception() is not None else 'completed'] += 1
+		self._slots.release()
+
+	def status(self):
+		with self._lock:
+			counts = dict(self._counts)
+		return dict(status='ok', max_workers=self.max_workers, max_queue=self.max_queue,
+		            jobs=counts, query_cache=cv_query.query_cache_info())
+
+	def shutdown(self):
+		self._executor.shutdown(wait=True)
+
+
+
+################################################################################
+#### Driver functions
+################################################################################
+
+def create_annotation_server(host='127.0.0.1', port=8765, socket_path=None,
+                             max_workers=SERVICE_MAX_WORKERS, max_queue=SERVICE_MAX_QUEUE,
+                             cache_entries=SERVICE_CACHE_ENTRIES, chunk_rows=SERVICE_CHUNK_ROWS,
+                             data_root=None, max_body=SERVICE_MAX_BODY):
+	"""Warm up & bind the annotation server (HTTP host:port | Unix socket).
+
+	Stage profiling is disabled (process-wide session, NOT per request).
+
+	Args:
+		host:
+		port: (0 = any free port)
+		socket_path: Unix socket path (used instead of host:port)
+		max_workers: number of annotation jobs running concurrently
+		max_queue: number of annotation jobs waiting for a worker (more --> HTTP 503)
+		cache_entries: query response cache size (variant IDs)
+		chunk_rows: result rows per streamed chunk
+		data_root: directory tree requests may read ('var_file') & write
+			('out_dir') files in (None: variants content only, NO output files);
+			output files: new directory per request inside 'out_dir'
+		max_body: max request body size in bytes (more --> HTTP 413)
+
+	Returns:
+		server (server.service: AnnotationService)
+
+	"""
+	print("\nStarting ClinVar annotation service: warming up")
+	service_warm_up(cache_entries=cache_entries)
+
+	if socket_path is not None:
+		if os.path.exists(socket_path):
+			os.remove(socket_path)
+		server = ThreadingUnixHTTPServer(socket_path, AnnotationRequestHandler)
+		print("\t.. listening on Unix socket: " + socket_path)
+	else:
+		server = ThreadingHTTPServer((host, port), AnnotationRequestHandler)
+		print("\t.. listening on http://" + host + ":" + str(server.server_address[1]))
+	if data_root is not None:
+		data_root = os.path.realpath(data_root)
+		print("\t.. request files (var_file, out_dir) restricted to: " + data_root)
+	server.service = AnnotationService(max_workers=max_workers, max_queue=max_queue,
+	                                   chunk_rows=chunk_rows, data_root=data_root, max_body=max_body)
+	return server
+
+
+def run_annotation_service(host='127.0.0.1', port=8765, socket_path=None,
+                           max_workers=SERVICE_MAX_WORKERS, max_queue=SERVICE_MAX_QUEUE,
+                           cache_entries=SERVICE_CACHE_ENTRIES, chunk_rows=SERVICE_CHUNK_ROWS,
+                           data_root=None, max_body=SERVICE_MAX_BODY):
+	"""Serve run_clinvar_annotation until interrupted (see create_annotation_server).
+
+	Args:
+		host:
+		port:
+		socket_path:
+		max_workers:
+		max_queue:
+		cache_entries:
+		chunk_rows:
+		data_root:
+		max_body:
+
+	Returns:
+
+	"""
+	server = create_annotation_server(host=host, port=port, socket_path=socket_path,
+	                                  max_workers=max_workers, max_queue=max_queue,
+	                                  cache_entries=cache_entries, chunk_rows=chunk_rows,
+	                                  data_root=data_root, max_body=max_body)
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		print("\nStopping ClinVar annotation service")
+	finally:
+		server.server_close()
+		server.service.shutdown()
+		if socket_path is not None and os.path.exists(socket_path):
+			os.remove(socket_path)
+	return None
+
+
+
@@ -1,13 +1,24 @@
 #!/usr/bin/env python
 # coding: utf-8
 from __future__ import print_function
+import os
+import shutil
+import functools
+import site
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 ## import ClinVar workflow submodules
 from clinvar_workflow.query_clinvar import clinvar_query as cv_query
 from clinvar_workflow.helpers.process_user_inputs import process_user_inputs
-from clinvar_workflow.helpers.write_outputs import write_output_annotation
+from clinvar_workflow.helpers.write_outputs import write_output_annotation, write_output_annotation_batches
+from clinvar_workflow.helpers import profiling as prof
+from clinvar_workflow.helpers import checkpoints as ckpt
+from clinvar_workflow.helpers import spill
+from clinvar_workflow.helpers import sorting
 
 ## Pandas - setup
+import numpy as np
 import pandas as pd
 pd.options.mode.chained_assignment = None
 pd.set_option('display.max_columns', None)
@@ -23,8 +34,531 @@ pd.set_option('display.max_columns', None)
 # COL_COND = 'conditions.name'
 # COL_RCV = 'accession'
 
+##----Memory budget (max_memory) mode-----------------------------------------##
+## 1st chunk: # of variants used to estimate the memory per variant (also the
+##  minimum chunk size: query round trips & variant mix per chunk)
+SPILL_PROBE_VARIANTS = 1000
+## peak memory of query, wrangling, classification & summary / result DFs memory
+SPILL_PEAK_FACTOR = 4
+## peak memory of the merge (concatenated & sorted copies) / result DFs memory
+SPILL_MERGE_FACTOR = 2
+## minimum spilled block size (variants): spilled files per chunk
+SPILL_MIN_BLOCK_VARIANTS = 100
+
+
+
+################################################################################
+#### Partitioned (multi-process) query & processing functions
+################################################################################
+
+def partition_input_variants(input_var_df, col_id, cols_var, n_partitions, partition_by='chrom'):
+	"""Split the input variants for worker processes (all rows of a variant in the same partition).
+
+	Args:
+		input_var_df:
+		col_id:
+		cols_var:
+		n_partitions (int):
+		partition_by: 'chrom' - whole chromosomes, balanced by variant count |
+			'count' - equal variant count buckets (input order)
+
+	Returns:
+		list: input variant DFs (input order within each partition)
+
+	"""
+	if partition_by == 'chrom':
+		## largest chromosomes first --> partition with the fewest variants
+		chrom_counts = input_var_df.groupby(cols_var[0], sort=False)[col_id].nunique()\
+									.sort_values(ascending=False, kind='mergesort')
+		bucket_sizes = [0] * n_partitions
+		chrom_bucket = {}
+		for chrom, n in chrom_counts.items():
+			i = int(np.argmin(bucket_sizes))
+			chrom_bucket[chrom] = i
+			bucket_sizes[i] += n
+		buckets = input_var_df[cols_var[0]].map(chrom_bucket).values
+	elif partition_by == 'count':
+		codes, uniq = pd.factorize(input_var_df[col_id])
+		buckets = codes * n_partitions // max(len(uniq), 1)
+	else:
+		raise ValueError('Unsupported partition_by: ' + str(partition_by) + ' (chrom | count)')
+	
+	partitions = [input_var_df[buckets == i] for i in range(n_partitions)]
+	return [df for df in partitions if len(df.index) > 0]
+
+
+def annotation_partition_job(input_var_df, build, col_id, cols_var, cols_input):
+	"""Worker process: query, wrangling, classification & summary of one partition.
+
+	Args:
+		input_var_df: partition input variants
+		build:
+		col_id:
+		cols_var:
+		cols_input:
+
+	Returns:
+		dict: process_clinvar_query results (None if NO variants found in ClinVar)
+
+	"""
+	cv_df = cv_query.run_clinvar_query(input_var_df, build=build, col_id=col_id)
+	if cv_df is None:
+		return None
+	return cv_query.process_clinvar_query(cv_df, input_var_df, cols_var=cols_var,
+	                                      cols_input=cols_input, col_id=col_id)
+
+
+def bool_columns_helper(cols):
+	## Boolean indicator & FLAG columns of the variant summary DF
+	return [c for c in cols if c.startswith('_.') or
+	        (('FLAG.' in c) and ('.dict' not in c) and ('.list' not in c))]
+
+
+def unreported_summary_rows_helper(input_var_df, summ_cols, col_id, cols_var, cols_input,
+                                   col_clinsig=cv_query.COL_CLINSIG):
+	## variant summary rows of partitions with NO ClinVar variants ('NOT in ClinVar', 'UNREPORTED')
+	unrep_df = input_var_df[cols_var + cols_input + [col_id]].copy().reset_index(drop=True)
+	unrep_df['clinvar_status'] = 'NOT in ClinVar'
+	unrep_df[col_clinsig] = 'UNREPORTED'
+	unrep_df[col_clinsig + '.rcv.set'] = [set(['UNREPORTED']) for i in range(len(unrep_df.index))]
+	return unreported_summary_columns_helper(unrep_df, summ_cols)
+
+
+def unreported_summary_columns_helper(unrep_df, summ_cols):
+	## unreported variant summary rows --> variant summary columns (None: unchanged)
+	if summ_cols is None:
+		return unrep_df
+	unrep_df = unrep_df.reindex(columns=summ_cols)
+	## Boolean indicator & FLAG columns --> False (NOT NaN: bool/float concat)
+	cols_bool = bool_columns_helper(unrep_df.columns)
+	unrep_df[cols_bool] = False
+	return unrep_df
+
+
+def summary_merge_order_helper(summ_df, input_var_df, col_id, cols_var):
+	## input order --> same (unstable) chromosome & position sort as a single process run
+	input_order = pd.Index(pd.unique(input_var_df[col_id])).get_indexer(summ_df[col_id])
+	summ_df = summ_df.iloc[np.argsort(input_order, kind='stable')].reset_index(drop=True)
+	return cv_query.sort_variant_summary_df(summ_df, cols_var)
+
+
+def merge_partition_results(result_list, input_list, input_var_df, col_id, cols_var, cols_input):
+	"""Merge the partition results --> variant summary & full DFs sorted as a single process run.
+
+	Variant summary: chromosome & position (clinvar_summary_add_input_cols);
+	full DF: variant summary order (sort_full_df_by_summary).
+
+	Args:
+		result_list: annotation_partition_job results
+		input_list: partition input variant DFs
+		input_var_df: all input variants
+		col_id:
+		cols_var:
+		cols_input:
+
+	Returns:
+		dict: cv_var_summary_df, cv_full_df, input_df (None if NO variants found in ClinVar)
+
+	"""
+	results = [r for r in result_list if r is not None]
+	if len(results) == 0:
+		return None
+	summ_df = pd.concat([r['cv_var_summary_df'] for r in results], axis=0, ignore_index=True, sort=False)
+	full_df = pd.concat([r['cv_full_df'] for r in results], axis=0, ignore_index=True, sort=False)
+	
+	## partitions with NO ClinVar variants
+	unrep_list = [unreported_summary_rows_helper(df, summ_df.columns, col_id, cols_var, cols_input)
+	              for r, df in zip(result_list, input_list) if r is None]
+	summ_df = pd.concat([summ_df] + unrep_list, axis=0, ignore_index=True, sort=False)
+	
+	## Boolean indicator & FLAG columns missing from some partitions --> False
+	cols_bool = bool_columns_helper(summ_df.columns)
+	summ_df[cols_bool] = summ_df[cols_bool].fillna(False).astype(bool)
+	
+	summ_df = summary_merge_order_helper(summ_df, input_var_df, col_id, cols_var)
+	
+	## full DF: reported variant rows, unreported variant rows from the summary --> summary order
+	reported = full_df['clinvar_status'] != 'NOT in ClinVar'
+	unrep_df = summ_df.loc[summ_df['clinvar_status'] == 'NOT in ClinVar',
+	                       [c for c in full_df.columns if c in summ_df.columns]]
+	full_df = pd.concat([full_df[reported], unrep_df], axis=0, ignore_index=True, sort=False)
+	cols_bool_full = [c for c in cols_bool if c in full_df.columns]
+	full_df[cols_bool_full] = full_df[cols_bool_full].fillna(False).astype(bool)
+	full_df = cv_query.sort_full_df_by_summary(full_df, summ_df, col_id)
+	
+	return dict(cv_var_summary_df=summ_df, cv_full_df=full_df, input_df=input_var_df)
+
+
+@prof.profiled('run_partitioned_clinvar_query')
+def run_partitioned_clinvar_query(input_var_df, build, col_id, cols_var, cols_input,
+                                  partitions, partition_by='chrom', checkpoint_dir=None, resume=False):
+	"""Run query, wrangling, classification & summary in worker processes, then merge.
+
+	Args:
+		input_var_df:
+		build:
+		col_id:
+		cols_var:
+		cols_input:
+		partitions: number of worker processes
+		partition_by: 'chrom' | 'count'
+		checkpoint_dir: checkpoint run directory - save each partition result
+			(step 'partition_<i>', keyed by partitions & partition_by)
+		resume: load the completed partitions' checkpoints instead of re-running them
+
+	Returns:
+		dict: process_clinvar_query results (None if NO variants found in ClinVar)
+
+	"""
+	input_list = partition_input_variants(input_var_df, col_id, cols_var, partitions,
+	                                      partition_by=partition_by)
+	if len(input_list) == 0:
+		return None
+	print("\t.. " + str(len(input_list)) + " partitions (" + partition_by + "): "
+	      + ', '.join(str(len(df.index)) for df in input_list) + " input rows")
+	
+	## spawned worker processes (macOS | Windows) import the package from its root directory
+	pkg_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+	
+	## completed partitions (resume) --> checkpoints, others --> worker processes
+	steps = ['partition_%05d' % i for i in range(len(input_list))]
+	step_params = dict(partitions=partitions, partition_by=partition_by)
+	result_list = [None] * len(input_list)
+	todo = []
+	for i, step in enumerate(steps):
+		if resume and (checkpoint_dir is not None) and \
+				ckpt.checkpoint_completed(checkpoint_dir, step, params=step_params):
+			print("\t.. resuming: loading '" + step + "' checkpoint")
+			result_list[i] = ckpt.checkpoint_load(checkpoint_dir, step)
+		else:
+			todo.append(i)
+	
+	if len(todo) > 0:
+		with ProcessPoolExecutor(max_workers=min(partitions, len(todo)),
+		                         initializer=site.addsitedir, initargs=(pkg_root,)) as executor:
+			futures = {executor.submit(annotation_partition_job, input_list[i], build, col_id, cols_var,
+			                           cols_input):i for i in todo}
+			## save each partition result as soon as it completes
+			for f in as_completed(futures):
+				result_list[futures[f]] = f.result()
+				if checkpoint_dir is not None:
+					ckpt.checkpoint_save(checkpoint_dir, steps[futures[f]], result_list[futures[f]],
+					                     params=step_params)
+	
+	print("\t.. merging partition results")
+	return merge_partition_results(result_list, input_list, input_var_df, col_id, cols_var, cols_input)
+
+
+
+################################################################################
+#### Memory budget (disk-spilling) query & processing functions
+################################################################################
+
+def spill_block_size_helper(n_var, bytes_var, max_memory):
+	## spilled block size (variants): the merge reads 1 block per chunk --> blocks of ALL chunks within the budget
+	n_chunks = max(1, int(np.ceil(n_var * bytes_var * SPILL_PEAK_FACTOR / max_memory)))
+	return max(SPILL_MIN_BLOCK_VARIANTS, int(max_memory / (SPILL_MERGE_FACTOR * bytes_var * n_chunks)))
+
+
+def chunk_record(result, input_var_df, col_id, cols_var, cols_input):
+	"""Chunk result --> merge record: frames sorted as a single process run, merge keys
+	& representative rows (merged frame dtypes).
+
+	Args:
+		result: annotation_partition_job result (None if NO variants found in ClinVar)
+		input_var_df: chunk input variants
+		col_id:
+		cols_var:
+		cols_input:
+
+	Returns:
+		dict: summ (variant summary DF), full (full DF: reported variants | None), full_offsets
+			(full DF rows of each summary row), chrom & pos (merge keys), *_rep (representative rows)
+
+	"""
+	if result is None:
+		## unreported variants ONLY: summary rows from the input (merge: summary columns)
+		summ_df = unreported_summary_rows_helper(input_var_df, None, col_id, cols_var, cols_input)
+		summ_df = summary_merge_order_helper(summ_df, input_var_df, col_id, cols_var)
+		return dict(summ=summ_df, full=None, chrom=sorting.chrom_categorical(summ_df[cols_var[0]]),
+		            pos=np.asarray(summ_df[cols_var[1]]))
+	
+	summ_df = summary_merge_order_helper(result['cv_var_summary_df'], input_var_df, col_id, cols_var)
+	full_df = result['cv_full_df']
+	reported = (full_df['clinvar_status'] != 'NOT in ClinVar').values
+	unreported = (summ_df['clinvar_status'] == 'NOT in ClinVar').values
+	record = dict(summ_rep=spill.representative_row(summ_df), full_rep=spill.representative_row(full_df),
+	              summ_unrep_rep=spill.representative_row(summ_df[unreported]) if unreported.any() else None,
+	              full_reported_rep=spill.representative_row(full_df[reported]) if reported.any() else None)
+	
+	## full DF: reported variant rows (merge: unreported variant rows from the summary) in summary order
+	full_df = cv_query.sort_full_df_by_summary(full_df[reported], summ_df, col_id)
+	summ_first = np.flatnonzero(~summ_df[col_id].duplicated().values)
+	full_summ_row = summ_first[pd.Index(pd.unique(summ_df[col_id])).get_indexer(full_df[col_id])]
+	record.update(summ=summ_df, full=full_df,
+	              full_offsets=np.searchsorted(full_summ_row, np.arange(len(summ_df.index) + 1)),
+	              chrom=sorting.chrom_categorical(summ_df[cols_var[0]]), pos=np.asarray(summ_df[cols_var[1]]))
+	return record
+
+
+def annotation_chunk_job(input_var_df, build, col_id, cols_var, cols_input):
+	## annotation_partition_job of 1 chunk --> chunk_record & chunk results memory (bytes)
+	result = annotation_partition_job(input_var_df, build, col_id, cols_var, cols_input)
+	record = chunk_record(result, input_var_df, col_id, cols_var, cols_input)
+	record['bytes'] = 0 if result is None else spill.result_memory_bytes(result)
+	return record
+
+
+def spill_chunk_record(record, spill_dir, name, block_variants):
+	## spill the chunk record frames in blocks of variants (summary & full DF blocks: same variants)
+	if record['full'] is None:
+		return record
+	n = len(record['summ'].index)
+	bounds = [(i, min(i + block_variants, n)) for i in range(0, n, block_variants)]
+	off = record['full_offsets']
+	record['summ'] = spill.spill_frame_blocks(record['summ'], spill_dir, name + '_summary', bounds)
+	record['full'] = spill.spill_frame_blocks(record['full'], spill_dir, name + '_full',
+	                                          [(off[start], off[stop]) for start, stop in bounds])
+	return record
+
+
+def record_rows_helper(frame, start, stop):
+	## rows of an in-memory | spilled (SpilledFrame) chunk frame
+	if isinstance(frame, pd.DataFrame):
+		return frame.iloc[start:stop].reset_index(drop=True)
+	return frame.read_rows(start, stop)
+
+
+def cast_frame_helper(df, dtypes, cols_bool=()):
+	## reindex & cast to the merged frame columns & dtypes (Boolean columns: missing --> False)
+	df = df.reindex(columns=dtypes.index)
+	if len(cols_bool) > 0:
+		df[cols_bool] = df[cols_bool].fillna(False)
+	for c, dtype in dtypes.items():
+		if df[c].dtype != dtype:
+			df[c] = df[c].astype(dtype)
+	return df
+
+
+def merged_dtypes_helper(rep_list, cols_bool=()):
+	## dtypes of pd.concat of the frames of the representative rows (Boolean columns: bool)
+	dtypes = pd.concat(rep_list, axis=0, ignore_index=True, sort=False).dtypes
+	dtypes[list(cols_bool)] = np.dtype(bool)
+	return dtypes
+
+
+def iter_merged_chunk_records(records, batch_rows):
+	"""k-way merge of the sorted chunk records --> variant summary & full DFs sorted as a
+	single process run (merge_partition_results), in batches of variant summary rows.
+
+	Merge keys (chromosome, position, chunk & row) are held in memory (~30 bytes per
+	variant); the record frames are read block by block.
+
+	Args:
+		records: chunk_record (| spill_chunk_record) per chunk, in input order
+		batch_rows (int): variant summary rows per batch
+
+	Yields:
+		tuple: variant summary DF batch, full DF batch
+
+	"""
+	reported = [r for r in records if r['full'] is not None]
+	
+	## variant summary dtypes: reported chunks concatenated, then unreported chunks
+	summ_dtypes1 = merged_dtypes_helper([r['summ_rep'] for r in reported])
+	cols_bool = bool_columns_helper(summ_dtypes1.index)
+	unrep_list = [unreported_summary_columns_helper(r['summ'], summ_dtypes1.index)
+	              for r in records if r['full'] is None]
+	summ_rep1 = spill.representative_row(pd.concat([r['summ_rep'] for r in reported], axis=0,
+	                                               ignore_index=True, sort=False))
+	summ_dtypes = merged_dtypes_helper([summ_rep1] + [spill.representative_row(df) for df in unrep_list if len(df.index) > 0],
+	                                   cols_bool=cols_bool)
+	
+	## full DF dtypes: reported chunks concatenated --> reported rows, then unreported rows from the summary
+	full_dtypes1 = merged_dtypes_helper([r['full_rep'] for r in reported])
+	cols_full_unrep = [c for c in full_dtypes1.index if c in summ_dtypes.index]
+	cols_bool_full = [c for c in cols_bool if c in full_dtypes1.index]
+	full_rep_list = [cast_frame_helper(pd.concat([r['full_reported_rep'] for r in reported
+	                                              if r['full_reported_rep'] is not None],
+	                                             axis=0, ignore_index=True, sort=False), full_dtypes1)]
+	unrep_rep_list = [cast_frame_helper(r['summ_unrep_rep'], summ_dtypes1) for r in reported
+	                  if r['summ_unrep_rep'] is not None] + [df for df in unrep_list if len(df.index) > 0]
+	if len(unrep_rep_list) > 0:
+		unrep_rep = pd.concat(unrep_rep_list, axis=0, ignore_index=True, sort=False)
+		full_rep_list.append(spill.representative_row(cast_frame_helper(unrep_rep, summ_dtypes, cols_bool))[cols_full_unrep])
+	full_dtypes = merged_dtypes_helper([spill.representative_row(df) for df in full_rep_list],
+	                                   cols_bool=cols_bool_full)
+	
+	## summary records: unreported chunks --> summary columns
+	summ_frames = []
+	for r in records:
+		summ_frames.append(r['summ'] if r['full'] is not None else unrep_list.pop(0))
+	
+	## merge keys: chromosome (natural order), position, chunk, row --> global summary order & rank
+	chrom_dtype = sorting.chrom_categorical(pd.unique(np.concatenate([r['chrom'].categories.values
+	                                                                   for r in records]))).dtype
+	chrom = np.concatenate([np.where(r['chrom'].codes >= 0,
+	                                 chrom_dtype.categories.get_indexer(r['chrom'].categories)[r['chrom'].codes],
+	                                 len(chrom_dtype.categories)) for r in records])
+	chunk = np.concatenate([np.full(len(r['pos']), i, dtype=np.int32) for i, r in enumerate(records)])
+	row = np.concatenate([np.arange(len(r['pos'])) for r in records])
+	order = np.lexsort((row, chunk, np.concatenate([r['pos'] for r in records]), chrom))
+	del chrom
+	rank = np.empty(len(order), dtype=np.int64)
+	rank[order] = np.arange(len(order))
+	chunk_start = np.concatenate([[0], np.cumsum([len(r['pos']) for r in records])])
+	
+	for g0 in range(0, len(order), batch_rows):
+		batch = order[g0:g0 + batch_rows]
+		summ_parts, summ_ranks, full_parts, full_ranks, unrep_parts = [], [], [], [], []
+		for i in np.unique(chunk[batch]):
+			## sorted chunks --> contiguous chunk rows
+			rows = row[batch[chunk[batch] == i]]
+			start, stop = int(rows.min()), int(rows.max()) + 1
+			r, ranks = records[i], rank[chunk_start[i]:chunk_start[i + 1]]
+			summ_ranks.append(ranks[start:stop])
+			if r['full'] is None:
+				unrep_parts.append(summ_frames[i].iloc[start:stop])
+				summ_parts.append(None)
+				continue
+			summ_parts.append(record_rows_helper(summ_frames[i], start, stop))
+			off = r['full_offsets']
+			if off[stop] > off[start]:
+				full_parts.append(record_rows_helper(r['full'], off[start], off[stop]))
+				full_ranks.append(ranks[np.repeat(np.arange(start, stop), np.diff(off[start:stop + 1]))])
+		
+		## variant summary batch: reported chunk rows, then unreported chunk rows --> merged order
+		summ_rep_parts = [df for df in summ_parts if df is not None]
+		summ_list = []
+		if len(summ_rep_parts) > 0:
+			summ_list.append(cast_frame_helper(pd.concat(summ_rep_parts, axis=0, ignore_index=True, sort=False),
+			                                   summ_dtypes1))
+		summ_df = pd.concat(summ_list + unrep_parts, axis=0, ignore_index=True, sort=False)
+		summ_df = cast_frame_helper(summ_df, summ_dtypes, cols_bool)
+		summ_rank = np.concatenate([rk for df, rk in zip(summ_parts, summ_ranks) if df is not None]
+		                           + [rk for df, rk in zip(summ_parts, summ_ranks) if df is None])
+		summ_order = np.argsort(summ_rank, kind='stable')
+		summ_df = summ_df.take(summ_order).reset_index(drop=True)
+		summ_rank = summ_rank[summ_order]
+		
+		## full DF batch: reported variant rows, unreported variant rows from the summary --> summary order
+		unrep = (summ_df['clinvar_status'] == 'NOT in ClinVar').values
+		full_list = []
+		if len(full_parts) > 0:
+			full_list.append(cast_frame_helper(pd.concat(full_parts, axis=0, ignore_index=True, sort=False),
+			                                   full_dtypes1))
+		full_df = pd.concat(full_list + [summ_df.loc[unrep, cols_full_unrep]], axis=0, ignore_index=True, sort=False)
+		full_df = cast_frame_helper(full_df, full_dtypes, cols_bool_full)
+		full_rank = np.concatenate(full_ranks + [summ_rank[unrep]])
+		full_df = full_df.take(np.argsort(full_rank, kind='stable')).reset_index(drop=True)
+		yield summ_df, full_df
+
+
+@prof.profiled('run_spilled_clinvar_query')
+def run_spilled_clinvar_query(input_var_df, build, col_id, cols_var, cols_input, max_memory,
+                              spill_dir, checkpoint_dir=None, resume=False):
+	"""Run query, wrangling, classification & summary in variant ID chunks sized to
+	a memory budget; spill the sorted chunk results to disk in blocks of variants
+	once all results would NOT fit in the budget.
+
+	Chunk sizes are re-estimated after each chunk from the largest memory per
+	variant so far (1st & smallest chunk: SPILL_PROBE_VARIANTS variants). Chunks
+	without ClinVar variants are kept in memory (input rows).
+
+	Args:
+		input_var_df:
+		build:
+		col_id:
+		cols_var:
+		cols_input:
+		max_memory (int): memory budget (bytes)
+		spill_dir (str): spill directory (chunk results)
+		checkpoint_dir: checkpoint run directory - save each chunk record (step
+			'chunk_<i>', keyed by the chunk variant range)
+		resume: load the completed chunks' checkpoints instead of re-running them;
+			same records --> same chunk sizes as the checkpointed run
+
+	Returns:
+		dict: records (chunk_record per chunk), spilling, merged_bytes (estimated merged
+			results memory), batch_rows (merge batch size) - None if NO variants found in ClinVar
+
+	"""
+	## variant ID chunks: first appearance order (all rows of a variant in 1 chunk)
+	codes, ids = pd.factorize(input_var_df[col_id])
+	n_var = len(ids)
+	
+	records = []
+	start, n_chunk, bytes_var, bytes_results = 0, SPILL_PROBE_VARIANTS, 0.0, 0
+	block_variants, spilling = None, False
+	while start < n_var:
+		end = min(start + n_chunk, n_var)
+		chunk_df = input_var_df[(codes >= start) & (codes < end)]
+		print("\t.. chunk " + str(len(records) + 1) + ": variants " + str(start + 1) + "-"
+		      + str(end) + " of " + str(n_var))
+		record = ckpt.run_step(checkpoint_dir, 'chunk_%05d' % len(records), resume, annotation_chunk_job,
+		                       params=dict(start=int(start), end=int(end)), input_var_df=chunk_df,
+		                       build=build, col_id=col_id, cols_var=cols_var, cols_input=cols_input)
+		bytes_results += record['bytes']
+		bytes_var = max(bytes_var, record['bytes'] / (end - start))
+		records.append(record)
+		start = end
+		
+		## spill once all results would NOT fit in the memory budget
+		if spilling or (bytes_var * n_var * SPILL_PEAK_FACTOR > max_memory):
+			block_variants = spill_block_size_helper(n_var, bytes_var, max_memory)
+			if not spilling:
+				spilling = True
+				print("\t.. results exceed the memory budget --> spilling to: " + spill_dir)
+				records = [spill_chunk_record(r, spill_dir, 'chunk_%05d' % i, block_variants)
+				           for i, r in enumerate(records)]
+			else:
+				records[-1] = spill_chunk_record(records[-1], spill_dir, 'chunk_%05d' % (len(records) - 1),
+				                                 block_variants)
+		
+		## next chunk size: peak memory of 1 chunk within the budget (NO estimate yet: probe size)
+		if bytes_var > 0:
+			n_chunk = max(SPILL_PROBE_VARIANTS, int(max_memory / (SPILL_PEAK_FACTOR * bytes_var)))
+	
+	if all(r['full'] is None for r in records):
+		return None
+	return dict(records=records, spilling=spilling, merged_bytes=bytes_results * SPILL_MERGE_FACTOR,
+	            batch_rows=block_variants if spilling else n_var)
+
+
+def dual_build_batches_helper(batches, col_id, build):
+	## other build HGVS ID column of each merged batch (add_dual_build_ids: per variant)
+	for summ_df, full_df in batches:
+		result_dict = cv_query.add_dual_build_ids(dict(cv_var_summary_df=summ_df, cv_full_df=full_df),
+		                                          col_id=col_id, build=build)
+		yield result_dict['cv_var_summary_df'], result_dict['cv_full_df']
+
+
+def merge_spilled_clinvar_query(spilled, input_var_df):
+	"""Merge the chunk results in memory --> process_clinvar_query results.
+
+	Args:
+		spilled: run_spilled_clinvar_query results
+		input_var_df:
+
+	Returns:
+		dict: cv_var_summary_df, cv_full_df, input_df
+
+	"""
+	print("\t.. merging " + str(len(spilled['records'])) + " chunk results")
+	batches = list(iter_merged_chunk_records(spilled['records'], spilled['batch_rows']))
+	return dict(cv_var_summary_df=pd.concat([b[0] for b in batches], axis=0, ignore_index=True, sort=False),
+	            cv_full_df=pd.concat([b[1] for b in batches], axis=0, ignore_index=True, sort=False),
+	            input_df=input_var_df)
+
+
+
+@prof.profiled('run_clinvar_annotation')
 def run_clinvar_annotation(var_file, out_dir, out_prefix, build, cols_var,
-                           cols_input=None, write_output=True, write_excel=True):
+                           cols_input=None, write_output=True, write_excel=True,
+                           excel_combined=False, write_workers=4, compression=None,
+                           database=False, parquet=False, checkpoint=False, resume=False,
+                           dual_build=False, partitions=None, partition_by='chrom',
+                           max_memory=None):
 	"""
 	
 	Args:
@@ -35,37 +569,138 @@ def run_clinvar_annotation(var_file, out_dir, out_prefix, build, cols_var,
 		cols_var:
 		cols_input:
 		write_excel:
+		excel_combined:
+		write_workers: number of threads writing output files in parallel
+		compression: compress the text output files - None | 'gzip' | 'zstd'
+		database: also write an indexed SQLite results database
+		parquet: also write typed Parquet files (fast exploratory analysis re-runs)
+		checkpoint: save each step's results to a checkpoint run directory in
+			out_dir (keyed by a hash of the input file & parameters); partitions |
+			max_memory: each partition | chunk result is a step
+		resume: re-use the completed steps' checkpoints of a previous run with
+			the same inputs & parameters (implies checkpoint)
+		dual_build: also key the annotations by the other genome build's HGVS ID
+			(hg19 + hg38) - same query & classification
+		partitions: run the query, wrangling, classification & summary in this
+			number of worker processes (None | 1: single process)
+		partition_by: split input variants by 'chrom' (whole chromosomes) |
+			'count' (equal variant count buckets)
+		max_memory: memory budget - bytes | '512M' | '4G' (None: no budget); query &
+			process variant ID chunks, spilling chunk results to disk when needed
+			(single process: replaces partitions); merged results over the budget are
+			merged & written batch by batch (write_output: NO result_dict & Parquet
+			files, else MemoryError)
 
 	Returns:
 
 	"""
+	## checkpoint run directory: same input file & parameters --> same directory
+	ckpt_dir = None
+	if checkpoint or resume:
+		ckpt_key = ckpt.checkpoint_key(var_file, build=build, cols_var=cols_var, cols_input=cols_input)
+		ckpt_dir = ckpt.checkpoint_run_dir(out_dir, out_prefix, ckpt_key)
+		print("\nCheckpoint run directory: " + ckpt_dir)
+	
 	## Step 1: verify & process user inputs
 	print("\nStep 1: verify & process user inputs")
-	input_var_df, _out_dir, _col_id, _cols_input = process_user_inputs(var_file=var_file,
-																	   output_dir=out_dir,
-																	   build=build,
-																	   cols_var=cols_var,
-																	   cols_input=cols_input)
-	
-	## Step 2: run MyVariant ClinVar query
-	print("\n\nStep 2: run MyVariant ClinVar query")
-	cv_df = cv_query.run_clinvar_query(input_var_df, build=build, col_id=_col_id)
+	input_var_df, _out_dir, _col_id, _cols_input = ckpt.run_step(ckpt_dir, 'inputs', resume,
+	                                                             process_user_inputs,
+	                                                             var_file=var_file,
+	                                                             output_dir=out_dir,
+	                                                             build=build,
+	                                                             cols_var=cols_var,
+	                                                             cols_input=cols_input)
 	
-	if cv_df is None:
-		print("\nNo input variants found in ClinVar. Exiting program.")
-		return None
+	if (max_memory is not None) and resume and (ckpt_dir is not None) and \
+			ckpt.checkpoint_completed(ckpt_dir, 'summary'):
+		## Step 2-3: merged results of a previous run within the memory budget
+		print("\n\nStep 2-3: run MyVariant ClinVar query & process results within a "
+		      + str(max_memory) + " memory budget")
+		result_dict = ckpt.run_step(ckpt_dir, 'summary', resume, merge_spilled_clinvar_query)
+	elif max_memory is not None:
+		## Step 2-3: query & process variant ID chunks within the memory budget --> merge
+		print("\n\nStep 2-3: run MyVariant ClinVar query & process results within a "
+		      + str(max_memory) + " memory budget")
+		max_memory = spill.parse_memory_size(max_memory)
+		spill_dir = tempfile.mkdtemp(prefix=out_prefix + '_ClinVar_spill_', dir=_out_dir)
+		try:
+			spilled = run_spilled_clinvar_query(input_var_df=input_var_df, build=build, col_id=_col_id,
+			                                    cols_var=cols_var, cols_input=_cols_input,
+			                                    max_memory=max_memory, spill_dir=spill_dir,
+			                                    checkpoint_dir=ckpt_dir, resume=resume)
+			if spilled is None:
+				print("\nNo input variants found in ClinVar. Exiting program.")
+				return None
+			
+			if spilled['merged_bytes'] > max_memory:
+				## merged results exceed the budget --> merge & write the output files batch by batch
+				merged_str = '~' + str(spilled['merged_bytes'] // 1024**2) + 'M'
+				if not write_output:
+					raise MemoryError('Merged annotation results (' + merged_str + ') exceed the memory '
+					                  + 'budget: in-memory results (e.g. exploratory analysis) need a '
+					                  + 'larger max_memory')
+				print("\n\nStep 4: write output files - merged results (" + merged_str
+				      + ") exceed the memory budget --> merging & writing batch by batch")
+				batches = iter_merged_chunk_records(spilled['records'], spilled['batch_rows'])
+				if dual_build:
+					batches = dual_build_batches_helper(batches, _col_id, build)
+				write_output_annotation_batches(out_path=_out_dir, out_prefix=out_prefix, batches=batches,
+				                                excel=write_excel, excel_combined=excel_combined,
+				                                compression=compression, database=database, parquet=parquet)
+				return dict(input_df=input_var_df)
+			
+			result_dict = ckpt.run_step(ckpt_dir, 'summary', False, merge_spilled_clinvar_query,
+			                            spilled=spilled, input_var_df=input_var_df)
+		finally:
+			shutil.rmtree(spill_dir, ignore_errors=True)
+	elif (partitions is not None) and (partitions > 1):
+		## Step 2-3: query & process partitions in worker processes --> merge
+		print("\n\nStep 2-3: run MyVariant ClinVar query & process results in " + str(partitions) + " worker processes")
+		result_dict = ckpt.run_step(ckpt_dir, 'summary', resume,
+		                            functools.partial(run_partitioned_clinvar_query, checkpoint_dir=ckpt_dir,
+		                                              resume=resume),
+		                            input_var_df=input_var_df, build=build, col_id=_col_id,
+		                            cols_var=cols_var, cols_input=_cols_input,
+		                            partitions=partitions, partition_by=partition_by)
+		
+		if result_dict is None:
+			print("\nNo input variants found in ClinVar. Exiting program.")
+			return None
+	else:
+		## Step 2: run MyVariant ClinVar query
+		print("\n\nStep 2: run MyVariant ClinVar query")
+		cv_df = cv_query.run_clinvar_query(input_var_df, build=build, col_id=_col_id,
+		                                   checkpoint_dir=ckpt_dir, resume=resume)
+		
+		if cv_df is None:
+			print("\nNo input variants found in ClinVar. Exiting program.")
+			return None
+		
+		## Step 3: process MyVariant ClinVar query results
+		print("\n\nStep 3: process MyVariant ClinVar query results")
+		result_dict = ckpt.run_step(ckpt_dir, 'summary', resume, cv_query.process_clinvar_query,
+		                            cv_df=cv_df, input_var_df=input_var_df,
+		                            cols_var=cols_var,
+		                            cols_input=_cols_input,
+		                            col_id=_col_id)
 	
-	## Step 3: process MyVariant ClinVar query results
-	print("\n\nStep 3: process MyVariant ClinVar query results")
-	result_dict = cv_query.process_clinvar_query(cv_df, input_var_df,
-	                                             cols_var=cols_var,
-	                                             cols_input=_cols_input,
-	                                             col_id=_col_id)
+	## other genome build HGVS IDs (annotations keyed for both assemblies)
+	if dual_build:
+		print("\t.. adding " + cv_query.other_build_helper(build) + " HGVS IDs (dual-build annotation)")
+		result_dict = ckpt.run_step(ckpt_dir, 'dual_build', resume, cv_query.add_dual_build_ids,
+		                            result_dict=result_dict, col_id=_col_id, build=build)
 	
 	# Step 4: write output files
 	if write_output:
 		print("\n\nStep 4: write output files")
-		write_output_annotation(_out_dir, out_prefix, result_dict, excel=write_excel)
+		## output options are NOT in the checkpoint key --> re-write if they changed
+		ckpt.run_step(ckpt_dir, 'outputs', resume, write_output_annotation,
+		              params=dict(excel=write_excel, excel_combined=excel_combined,
+		                          compression=compression, database=database, parquet=parquet,
+		                          dual_build=dual_build),
+		              out_path=_out_dir, out_prefix=out_prefix, result_dict=result_dict,
+		              excel=write_excel, excel_combined=excel_combined, max_workers=write_workers,
+		              compression=compression, database=database, parquet=parquet)
 		return result_dict
 	
 	return {'result_dict':result_dict, '_col_id':_col_id, '_out_dir':_out_dir}
@@ -1,20 +1,27 @@
 #!/usr/bin/env python
 # coding: utf-8
 from __future__ import print_function
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 ## import ClinVar workflow submodules
 from clinvar_workflow.query_clinvar import clinvar_query as cv_query
 from clinvar_workflow.vizualization import viz_static as viz
+from clinvar_workflow.vizualization import figure_cache as fc
 from clinvar_workflow.helpers import clinsig_sort_dict
 
 # from clinvar_workflow.helpers.process_user_inputs import process_user_inputs
 from clinvar_workflow.workflows import annotation_workflow as annot
 from clinvar_workflow.helpers.write_outputs import write_output_exploratory_analysis
+from clinvar_workflow.helpers.read_outputs import read_annotation_output
+from clinvar_workflow.helpers.process_user_inputs import test_user_output_directory
 from clinvar_workflow.helpers import sorting as sort
 from clinvar_workflow.helpers import summary_stats as ss
+from clinvar_workflow.helpers import profiling as prof
 
 
 ## Pandas - setup
+import numpy as np
 import pandas as pd
 pd.options.mode.chained_assignment = None
 pd.set_option('display.max_columns', None)
@@ -30,12 +37,47 @@ COL_CLINSIG = 'clinical_significance'
 COL_COND = 'conditions.name'
 COL_RCV = 'accession'
 
+## clinsig display labels: label (also within compound labels) --> display label
+CLINSIG_DISPLAY_LABELS = [('Conflicting interpretations of pathogenicity', 'Conflicting'),
+                          ('Benign/Likely benign', 'Benign / Likely benign'),
+                          ('Pathogenic/Likely pathogenic', 'Pathogenic / Likely pathogenic')]
+CLINSIG_CONFLICT = 'Conflicting'
+
 
 ################################################################################
 #### Exploratory analysis functions
 ################################################################################
 
+## relabel clinsig column: strip & rename each distinct label ONCE (categorical codes)
+def clinsig_label_helper(clinsig, display_labels=CLINSIG_DISPLAY_LABELS):
+	"""
+
+	Args:
+		clinsig:
+		display_labels:
+
+	Returns:
+
+	"""
+	cat = clinsig.astype('category')
+	labels = []
+	for c in cat.cat.categories:
+		## NOT a string --> NaN (as the .str accessor)
+		if not isinstance(c, str):
+			labels.append(np.nan)
+			continue
+		c = c.strip()
+		for label, display_label in display_labels:
+			c = c.replace(label, display_label)
+		labels.append(c)
+	labels = np.array(labels + [np.nan], dtype=object)
+	
+	## missing values: code -1 --> last label (NaN)
+	return pd.Series(labels[cat.cat.codes.values], index=clinsig.index, name=clinsig.name)
+
+
 ## reformat full variant ClinVar DF for VISUALIZATION
+@prof.profiled('preprocess_visualization_df')
 def preprocess_visualization_df(full_df, col_id, col_clinsig):
 	"""
 
@@ -47,46 +89,33 @@ def preprocess_visualization_df(full_df, col_id, col_clinsig):
 	Returns:
 
 	"""
-	v_df = full_df.copy()
-	v_df['condition'] = v_df['conditions.name'].copy()
-	v_df['gene'] = v_df['gene.symbol'].copy()
+	## copy DF without clinsig columns --> re-insert relabeled clinsig columns
+	cols_clinsig = [col_clinsig, col_clinsig+'.rcv']
+	cols_orig = full_df.columns.tolist()
+	v_df = full_df.drop(columns=cols_clinsig)
+	for c in sorted(cols_clinsig, key=cols_orig.index):
+		v_df.insert(cols_orig.index(c), c, clinsig_label_helper(full_df[c]))
+	
+	v_df['condition'] = v_df['conditions.name']
+	v_df['gene'] = v_df['gene.symbol']
 	
 	## new variant-RCV ID column used in
 	v_df['var_rcv'] = v_df[col_id] + '_' + v_df['accession']
 	
-	## reformat clinsig string labels
-	v_df[col_clinsig] = v_df[col_clinsig].str.strip()\
-		.str.replace('Conflicting interpretations of pathogenicity', 'Conflicting')
-	v_df[col_clinsig+'.rcv'] = v_df[col_clinsig+'.rcv'].str.strip()\
-		.str.replace('Conflicting interpretations of pathogenicity', 'Conflicting')
-	
-	v_df[col_clinsig] = v_df[col_clinsig].str.strip()\
-		.str.replace('Benign/Likely benign', 'Benign / Likely benign')
-	v_df[col_clinsig+'.rcv'] = v_df[col_clinsig+'.rcv'].str.strip()\
-		.str.replace('Benign/Likely benign', 'Benign / Likely benign')
-	
-	v_df[col_clinsig] = v_df[col_clinsig].str.strip()\
-		.str.replace('Pathogenic/Likely pathogenic', 'Pathogenic / Likely pathogenic')
-	v_df[col_clinsig+'.rcv'] = v_df[col_clinsig+'.rcv'].str.strip()\
-		.str.replace('Pathogenic/Likely pathogenic', 'Pathogenic / Likely pathogenic')
-	
-	
 	## add new clinsig col with 'Conflicting [some|none] pathogenic'
-	v_df[col_clinsig+'2'] = v_df[col_clinsig].copy()
+	v_df[col_clinsig+'2'] = v_df[col_clinsig]
 	
-	conf_patho = v_df[v_df[col_clinsig] == 'Conflicting']\
-					.groupby(col_id)\
-					.filter(lambda x: any(x[col_clinsig+'.rcv']\
-	                                      .str.contains('Pathogenic')))\
-					[col_id].tolist()
+	conflict = v_df[col_clinsig] == CLINSIG_CONFLICT
+	conf_patho = (conflict & v_df[col_clinsig+'.rcv'].str.contains('Pathogenic', regex=False, na=False))\
+					.groupby(v_df[col_id]).transform('any').astype(bool)
 	
-	v_df.loc[v_df[col_id].isin(conf_patho), col_clinsig+'2'] = 'Conflicting - some pathogenic'
-	v_df.loc[(v_df[col_clinsig] == 'Conflicting') &
-			 (~v_df[col_id].isin(conf_patho)), col_clinsig + '2'] = 'Conflicting - none pathogenic'
+	v_df.loc[conf_patho, col_clinsig+'2'] = 'Conflicting - some pathogenic'
+	v_df.loc[conflict & ~conf_patho, col_clinsig + '2'] = 'Conflicting - none pathogenic'
 	return v_df
 	
 
 
+@prof.profiled('get_dataset_summary')
 def get_dataset_summary(input_df, cv_full_df, col_id, col_cond, col_gene):
 	"""
 	
@@ -148,6 +177,7 @@ def get_dataset_summary(input_df, cv_full_df, col_id, col_cond, col_gene):
 	return summ_df_midx.reindex(midx)
 
 
+@prof.profiled('identify_patho_vars')
 def identify_patho_vars(cv_summ_df, cv_full_df, col_id, col_clinsig, cols_var, all_cond=False):
 	## determine which pathogenic flag column to use for filtering
 	if all_cond:
@@ -176,8 +206,11 @@ def explore_clinsig(df, clinsig_col, count_col, unreported=False, plot_fxn=viz.p
 	## sort ClinSig rows
 	_cs_totals_df = sort.sort_clinsig_df_col(_cs_totals_df, clinsig_col, clinsig_dict=clinsig_sort_dict, reverse=True)
 	
-	## Capitalize ClinSig rows
-	_cs_totals_df[clinsig_col] = _cs_totals_df[clinsig_col].str.capitalize().str.replace('/ likely', '/ Likely')
+	## Capitalize ClinSig rows (relabel the ordered categorical: clinsig sort order kept)
+	clinsig_cats = _cs_totals_df[clinsig_col].cat.categories
+	clinsig_labels = clinsig_cats.str.capitalize().str.replace('/ likely', '/ Likely')
+	_cs_totals_df[clinsig_col] = _cs_totals_df[clinsig_col].map(dict(zip(clinsig_cats, clinsig_labels)))\
+	                             .astype(pd.CategoricalDtype(pd.unique(clinsig_labels), ordered=True))
 
 	## subset count DF for plot +/- 'UNREPORTED' variants
 	if unreported:
@@ -207,28 +240,42 @@ def explore_clinsig(df, clinsig_col, count_col, unreported=False, plot_fxn=viz.p
 	return _cs_totals_df, donut_plot_fig
 
 
-def explore_clinsig_by_gene(df, col_clinsig, col_count, col_gene, axis_order='total'):
-	## generate DF for plot
-	plot_df = ss.generate_grouped_count_df(df, col_group=col_gene, col_count=col_count, col_clinsig=col_clinsig)
+def explore_clinsig_by_gene(df, col_clinsig, col_count, col_gene, axis_order='total',
+                            top_n=viz.PLOT_TOP_N, other_label=viz.PLOT_OTHER_LABEL):
+	## generate counts once --> full DF for output & top N genes DF for plot
+	counts, idx_gene, idx_clinsig = ss.grouped_count_codes(df, col_group=col_gene, col_count=col_count,
+	                                                       col_clinsig=col_clinsig)
+	other_label = ss.other_label_helper(other_label, idx_gene)
+	plot_df = ss.grouped_count_df_from_codes(counts, idx_gene, idx_clinsig)
+	top_df = ss.grouped_count_df_from_codes(counts, idx_gene, idx_clinsig, top_n=top_n,
+	                                        other_label=other_label)
 
 	## sort DF columns
 	cols_df = ['Total'] + sort.sort_and_extract_clinsig(plot_df.columns.tolist(), reverse=False)
 
 	## generate stacked bar plot
-	bar_plot = viz.plot_clinsig_stacked_bar_by_gene(plot_df, col_clinsig, axis_order=axis_order)
+	bar_plot = viz.plot_clinsig_stacked_bar_by_gene(top_df, col_clinsig, axis_order=axis_order,
+	                                                top_n=len(top_df.index), other_label=other_label)
 	
 	return plot_df[cols_df], bar_plot
 
 
-def explore_clinsig_by_condition(df, col_clinsig, col_count, col_cond):
-	## generate DF for plot
-	plot_df = ss.generate_grouped_count_df(df, col_group=col_cond, col_count=col_count, col_clinsig=col_clinsig)
+def explore_clinsig_by_condition(df, col_clinsig, col_count, col_cond,
+                                 top_n=viz.PLOT_TOP_N, other_label=viz.PLOT_OTHER_LABEL):
+	## generate counts once --> full DF for output & top N conditions DF for plot
+	counts, idx_cond, idx_clinsig = ss.grouped_count_codes(df, col_group=col_cond, col_count=col_count,
+	                                                       col_clinsig=col_clinsig)
+	other_label = ss.other_label_helper(other_label, idx_cond)
+	plot_df = ss.grouped_count_df_from_codes(counts, idx_cond, idx_clinsig)
+	top_df = ss.grouped_count_df_from_codes(counts, idx_cond, idx_clinsig, top_n=top_n,
+	                                        exclude=viz.PLOT_COND_EXCLUDE, other_label=other_label)
 
 	## sort DF columns
 	cols_df = ['Total'] + sort.sort_and_extract_clinsig(plot_df.columns.tolist(), reverse=False)
 
 	## generate stacked bar plot
-	bar_plot = viz.plot_clinsig_stacked_bar_by_condition(plot_df, col_clinsig)
+	bar_plot = viz.plot_clinsig_stacked_bar_by_condition(top_df, col_clinsig, top_n=len(top_df.index),
+	                                                     other_label=other_label)
 	
 	return plot_df[cols_df], bar_plot
 
@@ -240,39 +287,101 @@ def explore_clinsig_by_condition(df, col_clinsig, col_count, col_cond):
 #### Driver functions
 ################################################################################
 
-def perform_explore_clinsig(df, col_id, col_clinsig, col_cond='condition', col_gene='gene'):
-	## Variant clinsig: # of distinct variants per Variant classification
-	print("\t\t.. performing Variant Clinical Significance analysis")
-	clinsig_count_df, clinsig_count_plot = explore_clinsig(df, clinsig_col=col_clinsig, count_col=col_id)
+def explore_timing_helper(fxn, **kwargs):
+	## run analysis --> return (results, elapsed seconds)
+	t0 = time.perf_counter()
+	results = fxn(**kwargs)
+	return results, time.perf_counter() - t0
+
+
+def explore_timing_report(timing_dict, wall_time):
+	"""
+
+	Args:
+		timing_dict:
+		wall_time:
 
-	## RCV clinsig: # of NON-DISTINCT variants per RCV classification
-	print("\t\t.. performing Variant-Condition (RCV) Clinical Significance analysis")
-	rcv_clinsig_count_df, rcv_clinsig_count_plot = explore_clinsig(df, clinsig_col=col_clinsig+'.rcv', count_col=col_id)
+	Returns:
+
+	"""
+	total = sum(timing_dict.values())
+	print("\t\t.. Clinical Significance analyses timing (seconds):")
+	for k, v in timing_dict.items():
+		print("\t\t\t" + k + ": " + '{:.3f}'.format(v))
+	print("\t\t\tsum of analyses: " + '{:.3f}'.format(total) + ", wall time: " + '{:.3f}'.format(wall_time)
+	      + " (speedup: " + '{:.2f}'.format(total / wall_time if wall_time > 0 else 1.0) + "x)")
+
+
+@prof.profiled('perform_explore_clinsig')
+def perform_explore_clinsig(df, col_id, col_clinsig, col_cond='condition', col_gene='gene',
+                            max_workers=1, df_dict=None, other_label=viz.PLOT_OTHER_LABEL,
+                            top_n=viz.PLOT_TOP_N):
+	"""
+	
+	Args:
+		df:
+		col_id:
+		col_clinsig:
+		col_cond:
+		col_gene:
+		max_workers: number of threads running the 4 analyses concurrently
+		df_dict: per analysis DF (results_dict key --> DF, e.g. merged partial
+			aggregates), used instead of df
+		other_label: bar of the genes | conditions outside the top N (None: NO bar)
+		top_n: genes | conditions in the bar plots (None: ALL --> large-data
+			mode above viz.PLOT_PAGE_GROUPS groups)
 
-	## grouped by GENE: # of distinct variants per clinsig classification, per GENE
-	print("\t\t.. performing Gene-based analysis")
-	gene_count_df, gene_plot = explore_clinsig_by_gene(df, col_count=col_id, col_clinsig=col_clinsig, col_gene=col_gene)
+	Returns:
 
-	## grouped by CONDITION: # of distinct variants per clinsig classification, per CONDITION
-	print("\t\t.. performing Condition-based analysis")
-	cond_count_df, cond_plot = explore_clinsig_by_condition(df, col_count=col_id, col_clinsig=col_clinsig, col_cond=col_cond)
+	"""
+	## analyses: (results_dict key, description, fxn, kwargs) --> all read the same (read-only) DF
+	analyses = [
+		## Variant clinsig: # of distinct variants per Variant classification
+		('clinsig_var', "Variant Clinical Significance", explore_clinsig,
+		 dict(df=df, clinsig_col=col_clinsig, count_col=col_id)),
+		## RCV clinsig: # of NON-DISTINCT variants per RCV classification
+		('clinsig_rcv', "Variant-Condition (RCV) Clinical Significance", explore_clinsig,
+		 dict(df=df, clinsig_col=col_clinsig+'.rcv', count_col=col_id)),
+		## grouped by GENE: # of distinct variants per clinsig classification, per GENE
+		('clinsig_var_gene', "Gene-based", explore_clinsig_by_gene,
+		 dict(df=df, col_count=col_id, col_clinsig=col_clinsig, col_gene=col_gene,
+		      other_label=other_label, top_n=top_n)),
+		## grouped by CONDITION: # of distinct variants per clinsig classification, per CONDITION
+		('clinsig_var_cond', "Condition-based", explore_clinsig_by_condition,
+		 dict(df=df, col_count=col_id, col_clinsig=col_clinsig, col_cond=col_cond,
+		      other_label=other_label, top_n=top_n))
+	]
+	
+	if df_dict is not None:
+		for key, desc, fxn, kwargs in analyses:
+			kwargs['df'] = df_dict.get(key, df)
+	
+	t0 = time.perf_counter()
+	if max_workers > 1:
+		with ThreadPoolExecutor(max_workers=max_workers) as executor:
+			futures = []
+			for key, desc, fxn, kwargs in analyses:
+				print("\t\t.. performing " + desc + " analysis")
+				futures.append(executor.submit(explore_timing_helper, fxn, **kwargs))
+			results = [f.result() for f in futures]
+	else:
+		results = []
+		for key, desc, fxn, kwargs in analyses:
+			print("\t\t.. performing " + desc + " analysis")
+			results.append(explore_timing_helper(fxn, **kwargs))
+	explore_timing_report({a[1]:r[1] for a, r in zip(analyses, results)}, time.perf_counter() - t0)
 	
 	## assemble resulting DataFrames & Plotly plot figures
 	print("\t\t.. assembling Clinical Significance analysis results")
-	results_dict = dict(clinsig_var=dict(df=clinsig_count_df,
-										 plot=clinsig_count_plot),
-						clinsig_rcv=dict(df=rcv_clinsig_count_df,
-										 plot=rcv_clinsig_count_plot),
-						clinsig_var_gene=dict(df=gene_count_df,
-											  plot=gene_plot),
-						clinsig_var_cond=dict(df=cond_count_df,
-											  plot=cond_plot))
+	results_dict = {a[0]:dict(df=r[0][0], plot=r[0][1]) for a, r in zip(analyses, results)}
 	return results_dict
 
 
 
+@prof.profiled('perform_exploratory_analysis')
 def perform_exploratory_analysis(result_dict, col_id, col_clinsig=COL_CLINSIG,
-                                 cols_var=None, patho_all_cond=False):
+                                 cols_var=None, patho_all_cond=False, analysis_workers=1,
+                                 plot_top_n=viz.PLOT_TOP_N):
 	"""
 	
 	Args:
@@ -281,6 +390,8 @@ def perform_exploratory_analysis(result_dict, col_id, col_clinsig=COL_CLINSIG,
 		col_clinsig:
 		cols_var:
 		patho_all_cond:
+		analysis_workers: number of threads running the clinsig analyses
+		plot_top_n: genes | conditions in the bar plots (None: ALL, large-data mode)
 
 	Returns:
 
@@ -306,15 +417,121 @@ def perform_exploratory_analysis(result_dict, col_id, col_clinsig=COL_CLINSIG,
 
 	## run Clinical Significance analyses
 	print("\t.. starting Clinical Significance exploratory analyses")
-	clinsig_result_dict = perform_explore_clinsig(df, col_id=col_id, col_clinsig=col_clinsig)
+	clinsig_result_dict = perform_explore_clinsig(df, col_id=col_id, col_clinsig=col_clinsig,
+	                                              max_workers=analysis_workers, top_n=plot_top_n)
 	result_dict.update(clinsig_result_dict)
 	return result_dict
 
 
 
+def explore_partial_aggs(input_df, cv_full_df, col_id, col_clinsig=COL_CLINSIG):
+	"""Mergeable partial aggregates of one partition (chunk | file) of the annotation output.
+
+	Args:
+		input_df:
+		cv_full_df:
+		col_id:
+		col_clinsig:
+
+	Returns:
+		dict: partial aggregate name --> distinct DF
+
+	"""
+	df = preprocess_visualization_df(cv_full_df, col_id=col_id, col_clinsig=col_clinsig)
+	agg_cols = ss.partial_agg_cols(col_id, col_clinsig, col_cond='condition', col_gene='gene')
+	return ss.generate_partial_aggs(df, agg_cols, input_df=input_df)
+
+
+def perform_exploratory_analysis_partials(partial_list, col_id, col_clinsig=COL_CLINSIG,
+                                          analysis_workers=1, plot_top_n=viz.PLOT_TOP_N):
+	"""Dataset summary & Clinical Significance analyses from merged partial aggregates.
+	
+	Pathogenic variant DFs need the full variant rows & are not computed.
+
+	Args:
+		partial_list: list of explore_partial_aggs dicts
+		col_id:
+		col_clinsig:
+		analysis_workers: number of threads running the clinsig analyses
+		plot_top_n: genes | conditions in the bar plots (None: ALL, large-data mode)
+
+	Returns:
+
+	"""
+	print("\t.. merging " + str(len(partial_list)) + " partial aggregates")
+	agg_dict = ss.merge_partial_aggs(partial_list)
+	
+	## summarize dataset (distinct tables --> NaN padded columns are ignored by nunique)
+	print("\t.. generate dataset summary")
+	summ_df = pd.concat([agg_dict['clinvar_status'], agg_dict['gene'], agg_dict['condition']],
+	                    axis=0, ignore_index=True, sort=False)
+	data_summary_df = get_dataset_summary(agg_dict['input'], summ_df, col_id,
+	                                      col_cond='condition', col_gene='gene')
+	result_dict = dict(data_summary_df=data_summary_df)
+	
+	## run Clinical Significance analyses
+	print("\t.. starting Clinical Significance exploratory analyses")
+	clinsig_result_dict = perform_explore_clinsig(None, col_id=col_id, col_clinsig=col_clinsig,
+	                                              max_workers=analysis_workers, df_dict=agg_dict,
+	                                              top_n=plot_top_n)
+	result_dict.update(clinsig_result_dict)
+	return result_dict
+
+
+
+@prof.profiled('explore_annotation_dirs')
+def explore_annotation_dirs(annot_dirs, col_id, col_clinsig=COL_CLINSIG, cols_var=None,
+                            patho_all_cond=False, analysis_workers=1, plot_top_n=viz.PLOT_TOP_N):
+	"""Exploratory analysis of several annotation output directories: 1 directory
+	in memory at a time --> partial aggregates & pathogenic variant rows.
+
+	Args:
+		annot_dirs: list of annotation output directories
+		col_id:
+		col_clinsig:
+		cols_var:
+		patho_all_cond:
+		analysis_workers: number of threads running the clinsig analyses
+		plot_top_n: genes | conditions in the bar plots (None: ALL, large-data mode)
+
+	Returns:
+		dict: perform_exploratory_analysis_partials results + pathogenic variant DFs
+			(rows of all directories)
+
+	"""
+	partial_list, patho_list, patho_detail_list = [], [], []
+	for d in annot_dirs:
+		print("\t.. annotation output directory: " + d)
+		annot_dict = read_annotation_output(d, cols_str=cv_query.cv_int_fields)
+		input_df = annot_dict['cv_var_summary_df'][cols_var + [col_id]]
+		partial_list.append(explore_partial_aggs(input_df, annot_dict['cv_full_df'], col_id,
+		                                         col_clinsig=col_clinsig))
+		patho_var_df, patho_var_detail_df = identify_patho_vars(annot_dict['cv_var_summary_df'],
+		                                                        annot_dict['cv_full_df'], col_id,
+		                                                        col_clinsig, cols_var,
+		                                                        all_cond=patho_all_cond)
+		patho_list.append(patho_var_df)
+		patho_detail_list.append(patho_var_detail_df)
+		annot_dict = input_df = None
+	
+	print("\n\nStep 2: run Exploratory analysis")
+	result_dict = perform_exploratory_analysis_partials(partial_list, col_id=col_id, col_clinsig=col_clinsig,
+	                                                    analysis_workers=analysis_workers, plot_top_n=plot_top_n)
+	result_dict.update(patho_var_df=pd.concat(patho_list, axis=0, ignore_index=True),
+	                   patho_var_detail_df=pd.concat(patho_detail_list, axis=0, ignore_index=True))
+	return result_dict
+
+
+
+@prof.profiled('run_clinvar_exploratory_analysis')
 def run_clinvar_exploratory_analysis(var_file, out_dir, out_prefix, build, cols_var,
                                      cols_input=None, col_clinsig=COL_CLINSIG,
-                                     write_files=True, write_plot_fxn=viz.write_plot_helper):
+                                     write_files=True, write_plot_fxn=viz.write_plot_helper,
+                                     write_excel=True, excel_combined=False, write_workers=4,
+                                     write_plot_batch_fxn=viz.write_plot_batch_helper,
+                                     plot_formats=viz.PLOT_FORMATS, compression=None,
+                                     analysis_workers=4, figure_cache_dir=None, checkpoint=False,
+                                     resume=False, max_memory=None, plot_top_n=viz.PLOT_TOP_N):
 	"""
 	
 	Args:
@@ -327,10 +544,29 @@ def run_clinvar_exploratory_analysis(var_file, out_dir, out_prefix, build, cols_
 		col_clinsig:
 		write_files:
 		write_plot_fxn:
+		write_excel:
+		excel_combined:
+		write_workers: number of threads writing output files in parallel
+		write_plot_batch_fxn: write all plots with one image renderer
+			(set to None to write each plot with write_plot_fxn)
+		plot_formats: image formats written by write_plot_batch_fxn
+		compression: compress the annotation text output files - None | 'gzip' | 'zstd'
+		analysis_workers: number of threads running the clinsig analyses
+		plot_top_n: genes | conditions in the bar plots (None: ALL, large-data mode)
+		figure_cache_dir: re-use Plotly figures & images of previous runs (figure
+			cache directory)
+		checkpoint: save the annotation steps' results to a checkpoint run directory
+		resume: re-use the completed annotation steps of a previous run (implies
+			checkpoint)
+		max_memory: annotation memory budget - bytes | '512M' | '4G' (chunk results
+			are spilled to disk when needed; MemoryError if the merged results exceed it)
 
 	Returns:
 
 	"""
+	if figure_cache_dir is not None:
+		fc.set_figure_cache(figure_cache_dir)
+	
 	## Step 1-3: run annotation_workflow
 	annot_dict = annot.run_clinvar_annotation(var_file=var_file,
 	                                            out_dir=out_dir,
@@ -338,7 +574,10 @@ def run_clinvar_exploratory_analysis(var_file, out_dir, out_prefix, build, cols_
 	                                            build=build,
 	                                            cols_var=cols_var,
 	                                            cols_input=cols_input,
-	                                            write_output=False)
+	                                            write_output=False,
+	                                            checkpoint=checkpoint,
+	                                            resume=resume,
+	                                            max_memory=max_memory)
 	## extract annotation workflow outputs
 	result_dict = annot_dict['result_dict']
 	_col_id = annot_dict['_col_id']
@@ -348,12 +587,102 @@ def run_clinvar_exploratory_analysis(var_file, out_dir, out_prefix, build, cols_
 	print("\n\nStep 4: run Exploratory analysis")
 	result_dict = perform_exploratory_analysis(result_dict, col_id=_col_id,
 	                                           col_clinsig=col_clinsig,
-	                                           cols_var=cols_var)
+	                                           cols_var=cols_var,
+	                                           analysis_workers=analysis_workers,
+	                                           plot_top_n=plot_top_n)
 	
 	## Step 5: write output files
 	if write_files:
 		print("\n\nStep 5: write output files")
-		write_output_exploratory_analysis(_out_dir, out_prefix, result_dict, write_plot_fxn=write_plot_fxn)
+		write_output_exploratory_analysis(_out_dir, out_prefix, result_dict, write_plot_fxn=write_plot_fxn,
+		                                  excel=write_excel, excel_combined=excel_combined,
+		                                  max_workers=write_workers,
+		                                  write_plot_batch_fxn=write_plot_batch_fxn,
+		                                  plot_formats=plot_formats,
+		                                  compression=compression)
+	
+	return result_dict
+
+
+
+@prof.profiled('run_clinvar_exploratory_analysis_from_annotation')
+def run_clinvar_exploratory_analysis_from_annotation(annot_dir, out_dir, out_prefix, build, cols_var,
+                                                     col_clinsig=COL_CLINSIG, patho_all_cond=False,
+                                                     write_files=True, write_plot_fxn=viz.write_plot_helper,
+                                                     write_excel=True, excel_combined=False, write_workers=4,
+                                                     write_plot_batch_fxn=viz.write_plot_batch_helper,
+                                                     plot_formats=viz.PLOT_FORMATS, compression=None,
+                                                     analysis_workers=4, figure_cache_dir=None,
+                                                     plot_top_n=viz.PLOT_TOP_N):
+	"""Exploratory analysis from previous annotation output directories (NO ClinVar query).
+	
+	Several directories (e.g. cohorts | chunked annotation runs) are read one at
+	a time & merged as partial aggregates; their annotation tables are NOT
+	re-written.
+
+	Args:
+		annot_dir: annotation output directory | list of directories (typed
+			Parquet files preferred, tab-separated text files as fallback)
+		out_dir:
+		out_prefix:
+		build: genome build of the annotation run (HGVS ID column)
+		cols_var:
+		col_clinsig:
+		patho_all_cond:
+		write_files:
+		write_plot_fxn:
+		write_excel:
+		excel_combined:
+		write_workers: number of threads writing output files in parallel
+		write_plot_batch_fxn: write all plots with one image renderer
+			(set to None to write each plot with write_plot_fxn)
+		plot_formats: image formats written by write_plot_batch_fxn
+		compression:
+		analysis_workers: number of threads running the clinsig analyses
+		plot_top_n: genes | conditions in the bar plots (None: ALL, large-data mode)
+		figure_cache_dir: re-use Plotly figures & images of previous runs (figure
+			cache directory)
+
+	Returns:
+
+	"""
+	if figure_cache_dir is not None:
+		fc.set_figure_cache(figure_cache_dir)
+	
+	## Step 1: load annotation workflow outputs
+	print("\nStep 1: load annotation workflow output files")
+	_out_dir = test_user_output_directory(out_dir)
+	_col_id = 'hgvs_id.' + build
+	annot_dirs = [annot_dir] if isinstance(annot_dir, str) else list(annot_dir)
+	if len(annot_dirs) > 1:
+		## several directories: read one at a time --> partial aggregates (Step 1 & 2)
+		result_dict = explore_annotation_dirs(annot_dirs, col_id=_col_id, col_clinsig=col_clinsig,
+		                                      cols_var=cols_var, patho_all_cond=patho_all_cond,
+		                                      analysis_workers=analysis_workers, plot_top_n=plot_top_n)
+	else:
+		result_dict = read_annotation_output(annot_dirs[0], cols_str=cv_query.cv_int_fields)
+		
+		## input variants: 1 Variant summary row per input variant
+		result_dict['input_df'] = result_dict['cv_var_summary_df'][cols_var + [_col_id]]
+		
+		## Step 2: run Exploratory analysis
+		print("\n\nStep 2: run Exploratory analysis")
+		result_dict = perform_exploratory_analysis(result_dict, col_id=_col_id,
+		                                           col_clinsig=col_clinsig,
+		                                           cols_var=cols_var,
+		                                           patho_all_cond=patho_all_cond,
+		                                           analysis_workers=analysis_workers,
+		                                           plot_top_n=plot_top_n)
+	
+	## Step 3: write output files
+	if write_files:
+		print("\n\nStep 3: write output files")
+		write_output_exploratory_analysis(_out_dir, out_prefix, result_dict, write_plot_fxn=write_plot_fxn,
+		                                  excel=write_excel, excel_combined=excel_combined,
+		                                  max_workers=write_workers,
+		                                  write_plot_batch_fxn=write_plot_batch_fxn,
+		                                  plot_formats=plot_formats,
+		                                  compression=compression)
 	
 	return result_dict
 
@@ -3,13 +3,21 @@
 
 import argparse, os, sys
 
-def run_workflow(pkg_path, var_file, out_dir, out_prefix, build, cols_var, cols_input):
+def run_workflow(pkg_path, var_file, out_dir, out_prefix, build, cols_var, cols_input,
+                 excel_combined=False, compression=None, database=False, parquet=False,
+                 profile_path=None, profile_dump=None, checkpoint=False, resume=False,
+                 dual_build=False, partitions=None, partition_by='chrom', max_memory=None):
 	## import ClinVar exploratory analysis workflow module
 	print("\n\t .. importing exploratory analysis module")
 	
 	#@TODO: remove sys.path.insert
 	sys.path.insert(0, os.path.abspath(pkg_path))
 	from clinvar_workflow.workflows import annotation_workflow as cv
+	from clinvar_workflow.helpers import profiling as prof
+	
+	## stage profiling (profile files written when the workflow returns)
+	if profile_path is not None:
+		prof.set_profiling(profile_path, dump=profile_dump)
 	
 	## run ClinVar exploratory analysis
 	print("\n\t .. running exploratory analysis")
@@ -19,7 +27,17 @@ def run_workflow(pkg_path, var_file, out_dir, out_prefix, build, cols_var, cols_
 	                                    build=build,
 	                                    cols_var=cols_var,
 	                                    cols_input=cols_input,
-	                                    write_output=True)
+	                                    write_output=True,
+	                                    excel_combined=excel_combined,
+	                                    compression=compression,
+	                                    database=database,
+	                                    parquet=parquet,
+	                                    checkpoint=checkpoint,
+	                                    resume=resume,
+	                                    dual_build=dual_build,
+	                                    partitions=partitions,
+	                                    partition_by=partition_by,
+	                                    max_memory=max_memory)
 	
 	#@TODO: test for empty results BEFORE print
 	if 'cv_var_summary_df' in results:
@@ -46,6 +64,30 @@ if __name__ == "__main__":
 	                    help='The 4 Variant columns names: CHR (chromosome), POS (position), REF (reference allele) & ALT (alternative allele). The column names should be comma-separated. Default = \'CHR,POS,REF,ALT\'')
 	parser.add_argument('--cols_input', required=False, default='',
 	                    help='Optional: string containing a list of input columns to include in the output files. The column names should be comma-separated. Default = \'\'')
+	parser.add_argument('--excel_combined', required=False, action='store_true',
+	                    help='Optional: write ONE multi-sheet Excel workbook instead of one Excel file per table.')
+	parser.add_argument('--compression', required=False, default=None, choices=['gzip', 'zstd'],
+	                    help='Optional: compress the annotation text output files: gzip | zstd. Default = no compression')
+	parser.add_argument('--database', required=False, action='store_true',
+	                    help='Optional: also write the annotation tables to an indexed SQLite database file.')
+	parser.add_argument('--parquet', required=False, action='store_true',
+	                    help='Optional: also write the annotation tables to typed Parquet files (requires pyarrow | fastparquet).')
+	parser.add_argument('--checkpoint', required=False, action='store_true',
+	                    help='Optional: save each annotation step\'s results to a checkpoint run directory in the output directory.')
+	parser.add_argument('--resume', required=False, action='store_true',
+	                    help='Optional: resume a failed run from its last completed step (same input file & parameters; implies --checkpoint).')
+	parser.add_argument('--dual_build', required=False, action='store_true',
+	                    help='Optional: also key the annotations by the other genome build (hg19 + hg38) HGVS ID - one ClinVar query.')
+	parser.add_argument('--partitions', required=False, type=int, default=None,
+	                    help='Optional: run the query, classification & summary in N worker processes. Default = 1 process')
+	parser.add_argument('--partition_by', required=False, default='chrom', choices=['chrom', 'count'],
+	                    help='Optional: with --partitions, split input variants by whole chromosome | equal variant count buckets. Default = chrom')
+	parser.add_argument('--max_memory', required=False, default=None,
+	                    help='Optional: memory budget, e.g. 512M | 4G: query & process variant chunks, spilling intermediate results to disk when they would exceed it; merged results over the budget are merged & written to the output files batch by batch (no Parquet files). Default = no budget')
+	parser.add_argument('--profile', required=False, default=None,
+	                    help='Optional: write a stage profile (wall & CPU time, peak RSS, row counts) to <PROFILE>.json & <PROFILE>.csv.')
+	parser.add_argument('--profile_dump', required=False, default=None, choices=['cprofile', 'pyinstrument'],
+	                    help='Optional: with --profile, also write a call profiler dump: <PROFILE>.prof (cprofile) | <PROFILE>.html (pyinstrument).')
 
 	## 1. Parse Args
 	print("\n\t .. parsing args")
@@ -73,7 +115,19 @@ if __name__ == "__main__":
 	             out_prefix=OUT_PREFIX,
 	             build=BUILD,
 	             cols_var=COLS_VAR,
-	             cols_input=COLS_INPUT)
+	             cols_input=COLS_INPUT,
+	             excel_combined=pargs.excel_combined,
+	             compression=pargs.compression,
+	             database=pargs.database,
+	             parquet=pargs.parquet,
+	             profile_path=pargs.profile,
+	             profile_dump=pargs.profile_dump,
+	             checkpoint=pargs.checkpoint,
+	             resume=pargs.resume,
+	             dual_build=pargs.dual_build,
+	             partitions=pargs.partitions,
+	             partition_by=pargs.partition_by,
+	             max_memory=pargs.max_memory)
 	
 	
 	## 3. exit
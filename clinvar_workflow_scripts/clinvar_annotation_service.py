@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import argparse, os, sys
+
+def run_service(pkg_path, host, port, socket_path, max_workers, max_queue, cache_entries,
+                data_root=None, max_body=64 * 1024**2):
+	## import ClinVar annotation service module (imports & settings loaded ONCE)
+	print("\n\t .. importing annotation service module")
+	
+	#@TODO: remove sys.path.insert
+	sys.path.insert(0, os.path.abspath(pkg_path))
+	from clinvar_workflow.workflows import annotation_service as service
+	
+	## serve annotation requests until interrupted
+	service.run_annotation_service(host=host,
+	                               port=port,
+	                               socket_path=socket_path,
+	                               max_workers=max_workers,
+	                               max_queue=max_queue,
+	                               cache_entries=cache_entries,
+	                               data_root=data_root,
+	                               max_body=max_body)
+	return 0
+
+
+if __name__ == "__main__":
+	print('\n\n\nStarted clinvar_annotation_service.py\n')
+	
+	parser = argparse.ArgumentParser(description='Long-running ClinVar annotation service: POST /annotate (JSON) --> streamed TSV results, GET /health')
+	parser.add_argument('--pkg_path', required=True, default='..',
+	                    help='ClinVar workflow Python package absolute or relative path.')
+	parser.add_argument('--host', required=False, default='127.0.0.1',
+	                    help='Optional: HTTP host. Default = 127.0.0.1')
+	parser.add_argument('--port', required=False, type=int, default=8765,
+	                    help='Optional: HTTP port. Default = 8765')
+	parser.add_argument('--socket', required=False, default=None,
+	                    help='Optional: serve on a Unix socket path instead of HTTP host:port.')
+	parser.add_argument('--workers', required=False, type=int, default=4,
+	                    help='Optional: number of annotation requests running concurrently. Default = 4')
+	parser.add_argument('--max_queue', required=False, type=int, default=64,
+	                    help='Optional: number of requests waiting for a worker before new requests are rejected (HTTP 503). Default = 64')
+	parser.add_argument('--cache_entries', required=False, type=int, default=500000,
+	                    help='Optional: MyVariant query response cache size (variant IDs). Default = 500000')
+	parser.add_argument('--max_body', required=False, type=int, default=64 * 1024**2,
+	                    help='Optional: max request body size in bytes; larger requests are rejected (HTTP 413). Default = 67108864 (64M)')
+	parser.add_argument('--data_root', required=False, default=None,
+	                    help='Optional: directory that requests may read input files (\'var_file\') from & write output files (\'out_dir\') to. Default = none: requests send the variants file content & only get the streamed result')
+
+	## 1. Parse Args
+	print("\n\t .. parsing args")
+	pargs = parser.parse_args()
+	
+	## 2. run ClinVar annotation service
+	run_service(pkg_path=pargs.pkg_path,
+	            host=pargs.host,
+	            port=pargs.port,
+	            socket_path=pargs.socket,
+	            max_workers=pargs.workers,
+	            max_queue=pargs.max_queue,
+	            cache_entries=pargs.cache_entries,
+	            data_root=pargs.data_root,
+	            max_body=pargs.max_body)
+	
+	## 3. exit
+	print('\n\n\nclinvar_annotation_service.py complete. Goodbye.\n\n')
+	exit(0)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import argparse, os, sys
+from datetime import datetime
+
+def range_arg_helper(arg):
+	## 'N' --> N | 'MIN,MAX' --> (MIN, MAX)
+	values = [int(v) for v in arg.split(',')]
+	return values[0] if len(values) == 1 else tuple(values[:2])
+
+
+def run_benchmark(pkg_path, out_file, compare_file, tolerance, **kwargs):
+	## import ClinVar workflow benchmark module
+	print("\n\t .. importing benchmark module")
+
+	#@TODO: remove sys.path.insert
+	sys.path.insert(0, os.path.abspath(pkg_path))
+	from clinvar_workflow.benchmarks import run_benchmarks as bench
+
+	## run benchmarks
+	print("\n\t .. running benchmarks")
+	results = bench.run_benchmarks(**kwargs)
+	bench.write_benchmark_results(results, out_file)
+
+	## compare with baseline benchmark results
+	if compare_file is not None:
+		print("\n\t .. comparing with baseline: " + compare_file)
+		compare_df = bench.compare_benchmark_results(bench.read_benchmark_results(compare_file),
+		                                             results, tolerance=tolerance)
+		print(compare_df.to_string(index=False))
+		return compare_df['regression'].any()
+	return False
+
+
+if __name__ == "__main__":
+	print('\n\n\nStarted clinvar_benchmark.py\n')
+
+	parser = argparse.ArgumentParser(description='Benchmark the ClinVar workflow stages on a synthetic ClinVar workload')
+	parser.add_argument('--pkg_path', required=True, default='..',
+	                    help='ClinVar workflow Python package absolute or relative path.')
+	parser.add_argument('--out_file', required=False, default=None,
+	                    help='Optional: benchmark results JSON file path. Default = clinvar_benchmark_<timestamp>.json')
+	parser.add_argument('--n_variants', required=False, type=int, default=1000,
+	                    help='Optional: number of variants reported in ClinVar. Default = 1000')
+	parser.add_argument('--n_unreported', required=False, type=int, default=100,
+	                    help='Optional: number of input variants NOT found in ClinVar. Default = 100')
+	parser.add_argument('--rcv_per_variant', required=False, default='1,4',
+	                    help='Optional: RCVs per variant: N or MIN,MAX. Default = \'1,4\'')
+	parser.add_argument('--cond_per_rcv', required=False, default='1,2',
+	                    help='Optional: conditions per RCV: N or MIN,MAX. Default = \'1,2\'')
+	parser.add_argument('--expert_panel_frac', required=False, type=float, default=0.05,
+	                    help='Optional: fraction of expert panel reviewed RCVs. Default = 0.05')
+	parser.add_argument('--seed', required=False, type=int, default=0,
+	                    help='Optional: synthetic workload random seed. Default = 0')
+	parser.add_argument('--repeat', required=False, type=int, default=3,
+	                    help='Optional: number of timed runs per stage. Default = 3')
+	parser.add_argument('--stages', required=False, default='',
+	                    help='Optional: comma-separated stages to benchmark. Default = all stages')
+	parser.add_argument('--compare', required=False, default=None,
+	                    help='Optional: baseline benchmark results JSON file --> exit status 1 if a stage regressed.')
+	parser.add_argument('--tolerance', required=False, type=float, default=0.2,
+	                    help='Optional: relative slow down flagged as a regression. Default = 0.2')
+
+	## 1. Parse Args
+	print("\n\t .. parsing args")
+	pargs = parser.parse_args()
+	OUT_FILE = pargs.out_file
+	if OUT_FILE is None:
+		OUT_FILE = 'clinvar_benchmark_' + datetime.now().strftime("%Y%m%d_%H%M%S") + '.json'
+	STAGES = [s.strip() for s in pargs.stages.split(',')] if len(pargs.stages) > 0 else None
+
+	## 2. run benchmarks
+	regression = run_benchmark(pkg_path=pargs.pkg_path,
+	                           out_file=OUT_FILE,
+	                           compare_file=pargs.compare,
+	                           tolerance=pargs.tolerance,
+	                           n_variants=pargs.n_variants,
+	                           n_unreported=pargs.n_unreported,
+	                           rcv_per_variant=range_arg_helper(pargs.rcv_per_variant),
+	                           cond_per_rcv=range_arg_helper(pargs.cond_per_rcv),
+	                           expert_panel_frac=pargs.expert_panel_frac,
+	                           seed=pargs.seed,
+	                           repeat=pargs.repeat,
+	                           stages=STAGES)
+
+	## 3. exit
+	print('\n\n\nclinvar_benchmark.py complete. Goodbye.\n\n')
+	exit(1 if regression else 0)
@@ -3,22 +3,51 @@
 
 import argparse, os, sys
 
-def run_workflow(pkg_path, var_file, out_dir, out_prefix, build, cols_var, cols_input):
+def run_workflow(pkg_path, var_file, out_dir, out_prefix, build, cols_var, cols_input,
+                 excel_combined=False, plot_formats=('png', 'pdf'), compression=None,
+                 annot_dir=None, figure_cache_dir=None, profile_path=None, profile_dump=None,
+                 checkpoint=False, resume=False, max_memory=None, plot_top_n=25):
 	## import ClinVar exploratory analysis workflow module
 	print("\n\t .. importing exploratory analysis module")
 	
 	#@TODO: remove sys.path.insert
 	sys.path.insert(0, os.path.abspath(pkg_path))
 	from clinvar_workflow.workflows import exploratory_analysis_workflow as cv
+	from clinvar_workflow.helpers import profiling as prof
+	
+	## stage profiling (profile files written when the workflow returns)
+	if profile_path is not None:
+		prof.set_profiling(profile_path, dump=profile_dump)
 	
 	## run ClinVar exploratory analysis
 	print("\n\t .. running exploratory analysis")
-	results = cv.run_clinvar_exploratory_analysis(var_file=var_file,
-	                                              out_dir=out_dir,
-	                                              out_prefix=out_prefix,
-	                                              build=build,
-	                                              cols_var=cols_var,
-	                                              cols_input=cols_input)
+	if annot_dir is not None:
+		## re-use a previous annotation output directory (NO ClinVar query)
+		results = cv.run_clinvar_exploratory_analysis_from_annotation(annot_dir=annot_dir,
+		                                                              out_dir=out_dir,
+		                                                              out_prefix=out_prefix,
+		                                                              build=build,
+		                                                              cols_var=cols_var,
+		                                                              excel_combined=excel_combined,
+		                                                              plot_formats=plot_formats,
+		                                                              compression=compression,
+		                                                              figure_cache_dir=figure_cache_dir,
+		                                                              plot_top_n=plot_top_n)
+	else:
+		results = cv.run_clinvar_exploratory_analysis(var_file=var_file,
+		                                              out_dir=out_dir,
+		                                              out_prefix=out_prefix,
+		                                              build=build,
+		                                              cols_var=cols_var,
+		                                              cols_input=cols_input,
+		                                              excel_combined=excel_combined,
+		                                              plot_formats=plot_formats,
+		                                              compression=compression,
+		                                              figure_cache_dir=figure_cache_dir,
+		                                              checkpoint=checkpoint,
+		                                              resume=resume,
+		                                              max_memory=max_memory,
+		                                              plot_top_n=plot_top_n)
 
 	## show ClinVar query summary DF
 	print('\nClinVar query summary:', results['data_summary_df'])
@@ -35,8 +64,8 @@ if __name__ == "__main__":
 	parser = argparse.ArgumentParser(description='Driver script for the ClinVar_workflow exploratory analyses')
 	parser.add_argument('--pkg_path', required=True, default='..',
 	                    help='ClinVar workflow Python package absolute or relative path.')
-	parser.add_argument('--var_file', required=True,
-	                    help='The input variant file absolute or relative path.')
+	parser.add_argument('--var_file', required=False, default=None,
+	                    help='The input variant file absolute or relative path (required unless --annotation_dir).')
 	parser.add_argument('--out_dir', required=True,
 	                    help='The output directory absolute or relative path.')
 	parser.add_argument('--out_prefix', required=True, default='',
@@ -47,10 +76,34 @@ if __name__ == "__main__":
 	                    help='The 4 Variant columns names: CHR (chromosome), POS (position), REF (reference allele) & ALT (alternative allele). The column names should be comma-separated. Default = \'CHR,POS,REF,ALT\'')
 	parser.add_argument('--cols_input', required=False, default='',
 	                    help='Optional: string containing a list of input columns to include in the output files. The column names should be comma-separated. Default = \'\'')
+	parser.add_argument('--excel_combined', required=False, action='store_true',
+	                    help='Optional: write ONE multi-sheet Excel workbook instead of one Excel file per table.')
+	parser.add_argument('--plot_formats', required=False, default='png,pdf',
+	                    help='Optional: comma-separated list of plot output formats to write: png, pdf, html (one self-contained HTML report, no image renderer). Default = \'png,pdf\'')
+	parser.add_argument('--compression', required=False, default=None, choices=['gzip', 'zstd'],
+	                    help='Optional: compress the annotation text output files: gzip | zstd. Default = no compression')
+	parser.add_argument('--annotation_dir', required=False, default=None,
+	                    help='Optional: previous annotation output directory - run the exploratory analysis from its Parquet | text files instead of querying ClinVar. Comma-separated directories (e.g. cohorts | chunked runs) are analysed together, one directory in memory at a time.')
+	parser.add_argument('--figure_cache', required=False, default=None,
+	                    help='Optional: figure cache directory - re-use the plots & images of previous runs with identical counts.')
+	parser.add_argument('--checkpoint', required=False, action='store_true',
+	                    help='Optional: save each annotation step\'s results to a checkpoint run directory in the output directory.')
+	parser.add_argument('--resume', required=False, action='store_true',
+	                    help='Optional: resume a failed run from its last completed step (same input file & parameters; implies --checkpoint).')
+	parser.add_argument('--max_memory', required=False, default=None,
+	                    help='Optional: memory budget, e.g. 512M | 4G: query & process variant chunks, spilling intermediate results to disk when they would exceed it; the merged results are analysed in memory (error if they exceed the budget). Default = no budget')
+	parser.add_argument('--plot_top_n', required=False, default=25, type=int,
+	                    help='Optional: number of genes | conditions in the stacked bar plots (the rest are summed into one \'Other\' bar); 0 = ALL (large-data mode: long labels truncated, one page of groups shown). Default = 25')
+	parser.add_argument('--profile', required=False, default=None,
+	                    help='Optional: write a stage profile (wall & CPU time, peak RSS, row counts) to <PROFILE>.json & <PROFILE>.csv.')
+	parser.add_argument('--profile_dump', required=False, default=None, choices=['cprofile', 'pyinstrument'],
+	                    help='Optional: with --profile, also write a call profiler dump: <PROFILE>.prof (cprofile) | <PROFILE>.html (pyinstrument).')
 
 	## 1. Parse Args
 	print("\n\t .. parsing args")
 	pargs = parser.parse_args()
+	if (pargs.var_file is None) and (pargs.annotation_dir is None):
+		parser.error('--var_file is required (unless --annotation_dir is specified)')
 	CV_WKFLW_PKG_PATH = pargs.pkg_path
 	VAR_FILE = pargs.var_file
 	OUT_DIR = pargs.out_dir
@@ -66,6 +119,11 @@ if __name__ == "__main__":
 	else:
 		COLS_INPUT = []
 	
+	## split optional ANNOT_DIR string --> list([annotation output directories])
+	if pargs.annotation_dir is not None:
+		ANNOT_DIR = [d.strip() for d in pargs.annotation_dir.split(',') if d.strip()]
+	else:
+		ANNOT_DIR = None
 	
 	## 2. run ClinVar exploratory analysis
 	run_workflow(pkg_path=CV_WKFLW_PKG_PATH,
@@ -74,7 +132,18 @@ if __name__ == "__main__":
 	             out_prefix=OUT_PREFIX,
 	             build=BUILD,
 	             cols_var=COLS_VAR,
-	             cols_input=COLS_INPUT)
+	             cols_input=COLS_INPUT,
+	             excel_combined=pargs.excel_combined,
+	             plot_formats=tuple(f.strip() for f in pargs.plot_formats.split(',') if f.strip()),
+	             compression=pargs.compression,
+	             annot_dir=ANNOT_DIR,
+	             figure_cache_dir=pargs.figure_cache,
+	             profile_path=pargs.profile,
+	             profile_dump=pargs.profile_dump,
+	             checkpoint=pargs.checkpoint,
+	             resume=pargs.resume,
+	             max_memory=pargs.max_memory,
+	             plot_top_n=pargs.plot_top_n if pargs.plot_top_n > 0 else None)
 	
 	
 	## 3. exit
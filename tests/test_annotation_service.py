@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_annotation_service.py
+import json
+import socket
+import threading
+import unittest
+
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.workflows import annotation_service as service
+
+
+class TestAnnotationRequest(unittest.TestCase):
+
+	def parse(self, **request):
+		return service.parse_annotation_request(json.dumps(request).encode('utf-8'))
+
+	def test_column_names(self):
+		self.assertEqual(self.parse(variants='x', cols_var=['C', 'P', 'R', 'A'])['cols_var'],
+		                 ['C', 'P', 'R', 'A'])
+		self.assertEqual(self.parse(variants='x', cols_input=None)['cols_input'], None)
+		for cols in ['CPRA', ['C', 'P', 'R'], ['C', 'P', 'R', 4], {'C': 0, 'P': 1, 'R': 2, 'A': 3}]:
+			with self.assertRaises(ValueError):
+				self.parse(variants='x', cols_var=cols)
+		for cols in ['INFO', [['INFO']]]:
+			with self.assertRaises(ValueError):
+				self.parse(variants='x', cols_input=cols)
+
+
+class TestRequestBodySize(unittest.TestCase):
+	"""POST /annotate Content-Length: missing (411), invalid (400), too large (413)."""
+
+	def setUp(self):
+		self.server = service.create_annotation_server(port=0, max_workers=1, max_queue=0, max_body=1000)
+		threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+		self.server.service.shutdown()
+		cv_query.set_query_cache(False)
+
+	def status(self, headers):
+		with socket.create_connection(self.server.server_address[:2], timeout=10) as sock:
+			sock.sendall(b'POST /annotate HTTP/1.1\r\nHost: localhost\r\n' + headers + b'\r\n')
+			return int(sock.recv(4096).split(b' ')[1])
+
+	def test_content_length(self):
+		self.assertEqual(self.status(b''), 411)
+		self.assertEqual(self.status(b'Content-Length: abc\r\n'), 400)
+		self.assertEqual(self.status(b'Content-Length: -1\r\n'), 400)
+		self.assertEqual(self.status(b'Content-Length: 1001\r\n'), 413)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_checkpoints.py
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.helpers import checkpoints as ckpt
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.workflows import annotation_workflow as an
+from clinvar_workflow.benchmarks import synthetic_clinvar as synth
+
+
+class StubMyVariant(object):
+	"""MyVariant client stub: getvariants of synthetic hits (as_dataframe=1); counts the
+	queried variant IDs."""
+
+	def __init__(self, hits):
+		self.hits = {h['query']:h for h in hits}
+		self.n_queried = 0
+
+	def getvariants(self, ids, fields=None, assembly=None, as_dataframe=0):
+		ids = list(ids)
+		self.n_queried += len(ids)
+		out = [self.hits[i] for i in ids if i in self.hits]
+		if as_dataframe:
+			return pd.json_normalize(out).set_index('query')
+		return out
+
+
+def no_worker_processes(*args, **kwargs):
+	raise AssertionError('partition re-run (NOT loaded from its checkpoint)')
+
+
+class TestResumedRun(unittest.TestCase):
+	"""Resumed runs (interrupted after some partition | chunk checkpoints) --> same
+	results as a fresh run; changed build | cols_* --> NOT resumed."""
+
+	def setUp(self):
+		input_df, hits = synth.generate_synthetic_clinvar(n_variants=120, n_unreported=20,
+		                                                  n_genes=10, n_conditions=20)
+		self.tmp_dir = tempfile.mkdtemp()
+		self.var_file = os.path.join(self.tmp_dir, 'input.txt')
+		input_df.to_csv(self.var_file, sep='\t', index=False)
+		self._mv, self._probe, self._executor = cv_query.mv, an.SPILL_PROBE_VARIANTS, an.ProcessPoolExecutor
+		cv_query.mv = StubMyVariant(hits)
+		an.SPILL_PROBE_VARIANTS = 30
+
+	def tearDown(self):
+		cv_query.mv, an.SPILL_PROBE_VARIANTS, an.ProcessPoolExecutor = self._mv, self._probe, self._executor
+		shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+	def run_annotation(self, **kwargs):
+		params = dict(var_file=self.var_file, out_dir=self.tmp_dir, out_prefix='test', build='hg19',
+		              cols_var=['CHR', 'POS', 'REF', 'ALT'], cols_input=['INFO'], write_output=False)
+		params.update(kwargs)
+		return an.run_clinvar_annotation(**params)['result_dict']
+
+	def run_dir(self, **params):
+		key = ckpt.checkpoint_key(self.var_file, **dict(dict(build='hg19', cols_var=['CHR', 'POS', 'REF', 'ALT'],
+		                                                    cols_input=['INFO']), **params))
+		return ckpt.checkpoint_run_dir(self.tmp_dir, 'test', key)
+
+	def interrupt_helper(self, steps_done):
+		## keep the completed steps of an interrupted run
+		run_dir = self.run_dir()
+		manifest = ckpt.read_manifest(run_dir)
+		ckpt.write_manifest(run_dir, {k:v for k, v in manifest.items() if k in steps_done})
+		return sorted(manifest)
+
+	def assert_results_equal(self, result_dict, fresh_dict):
+		for k in ['cv_var_summary_df', 'cv_full_df']:
+			pd.testing.assert_frame_equal(result_dict[k], fresh_dict[k])
+
+	def test_spilled_resume(self):
+		fresh = self.run_annotation(max_memory='4M')
+		self.run_annotation(max_memory='4M', checkpoint=True)
+		steps = self.interrupt_helper(['inputs', 'chunk_00000', 'chunk_00001'])
+		self.assertIn('chunk_00002', steps)
+		
+		## completed chunks are NOT queried again
+		n_queried = cv_query.mv.n_queried
+		resumed = self.run_annotation(max_memory='4M', resume=True)
+		self.assert_results_equal(resumed, fresh)
+		self.assertGreater(cv_query.mv.n_queried - n_queried, 0)
+		self.assertLess(cv_query.mv.n_queried - n_queried, 140 - an.SPILL_PROBE_VARIANTS)
+
+	def test_partitioned_resume(self):
+		fresh = self.run_annotation(partitions=2, partition_by='count')
+		self.run_annotation(partitions=2, partition_by='count', checkpoint=True)
+		steps = self.interrupt_helper(['inputs', 'partition_00000', 'partition_00001'])
+		self.assertIn('summary', steps)
+		
+		## ALL partitions completed --> NO worker processes
+		an.ProcessPoolExecutor = no_worker_processes
+		resumed = self.run_annotation(partitions=2, partition_by='count', resume=True)
+		self.assert_results_equal(resumed, fresh)
+		
+		## other partitions --> partition checkpoints NOT re-used
+		self.interrupt_helper(['inputs', 'partition_00000', 'partition_00001'])
+		with self.assertRaises(AssertionError):
+			self.run_annotation(partitions=3, partition_by='count', resume=True)
+
+	def test_changed_params_invalidate(self):
+		self.run_annotation(checkpoint=True)
+		run_dir = self.run_dir()
+		self.assertTrue(ckpt.checkpoint_completed(run_dir, 'summary'))
+		for params in [dict(build='hg38'), dict(cols_input=[]), dict(cols_var=['CHR', 'POS', 'ALT', 'REF'])]:
+			self.assertNotEqual(self.run_dir(**params), run_dir)
+		
+		## changed cols_input --> re-run (query) & NOT the checkpointed results
+		n_queried = cv_query.mv.n_queried
+		resumed = self.run_annotation(cols_input=[], resume=True)
+		self.assertGreater(cv_query.mv.n_queried, n_queried)
+		self.assertNotIn('INFO', resumed['cv_var_summary_df'].columns)
+
+
+if __name__ == '__main__':
+	unittest.main()
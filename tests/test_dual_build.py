@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_dual_build.py
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+
+
+class TestOtherBuildIds(unittest.TestCase):
+
+	def test_other_build_hgvs(self):
+		df = pd.DataFrame({
+			'chrom': ['17', '17', '17', '1', 'X', 'MT', None],
+			'ref': ['G', 'G', 'G', 'A', 'A', 'A', 'A'],
+			'alt': ['A', 'A', 'A', 'G', 'C', 'G', 'G'],
+			'hg38.start': ['43093449', '43093449', '', '100', '5', '73', '1'],
+			'hgvs.genomic': [
+				## other build ref differs from the input build ref --> other build's own
+				"['NC_000017.10:g.41245466G>A', 'NC_000017.11:g.43093449C>T']",
+				## other build position disagrees with hg38.start
+				"['NC_000017.10:g.41245466G>A', 'NC_000017.11:g.43093450G>A']",
+				## NO hg38.start
+				"['NC_000017.11:g.43093449G>A']",
+				## NOT an SNV
+				"['NC_000001.11:g.100_101del']",
+				## single entry (NOT a list)
+				"NC_000023.11:g.5A>C",
+				"['NC_012920.1:g.73A>G']",
+				"['NC_000001.11:g.1A>G']"]})
+		hgvs_ids = cv_query.other_build_hgvs_id_helper(df, 'hg38')
+		self.assertEqual([v if pd.notnull(v) else None for v in hgvs_ids],
+		                 ['chr17:g.43093449C>T', None, None, None, 'chrX:g.5A>C', 'chrMT:g.73A>G', None])
+
+		## input build accession (hg19) is NOT the other build's
+		df['hg38.start'] = '41245466'
+		self.assertTrue(cv_query.other_build_hgvs_id_helper(df.iloc[:2], 'hg38').isnull().all())
+
+
+if __name__ == '__main__':
+	unittest.main()
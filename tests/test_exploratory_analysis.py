@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_exploratory_analysis.py
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from clinvar_workflow.workflows import exploratory_analysis_workflow as explore
+
+
+def preprocess_visualization_df_str(full_df, col_id, col_clinsig):
+	## string replace passes (before the per-category relabel)
+	v_df = full_df.copy()
+	v_df['condition'] = v_df['conditions.name'].copy()
+	v_df['gene'] = v_df['gene.symbol'].copy()
+	v_df['var_rcv'] = v_df[col_id] + '_' + v_df['accession']
+	for label, display_label in [('Conflicting interpretations of pathogenicity', 'Conflicting'),
+	                             ('Benign/Likely benign', 'Benign / Likely benign'),
+	                             ('Pathogenic/Likely pathogenic', 'Pathogenic / Likely pathogenic')]:
+		for c in [col_clinsig, col_clinsig + '.rcv']:
+			v_df[c] = v_df[c].str.strip().str.replace(label, display_label, regex=True)
+	
+	v_df[col_clinsig + '2'] = v_df[col_clinsig].copy()
+	conf_patho = v_df[v_df[col_clinsig] == 'Conflicting'].groupby(col_id)\
+		.filter(lambda x: any(x[col_clinsig + '.rcv'].str.contains('Pathogenic')))[col_id].tolist()
+	v_df.loc[v_df[col_id].isin(conf_patho), col_clinsig + '2'] = 'Conflicting - some pathogenic'
+	v_df.loc[(v_df[col_clinsig] == 'Conflicting') &
+	         (~v_df[col_id].isin(conf_patho)), col_clinsig + '2'] = 'Conflicting - none pathogenic'
+	return v_df
+
+
+class TestPreprocessVisualization(unittest.TestCase):
+
+	def test_relabel_equals_str_replace(self):
+		## labels, aliases ('UNREPORTED', 'not reported', 'CONFLICT'), compound labels & missing values
+		rows = [('v1', 'Conflicting interpretations of pathogenicity', 'Pathogenic'),
+		        ('v1', 'Conflicting interpretations of pathogenicity', ' Likely benign'),
+		        ('v2', 'Conflicting interpretations of pathogenicity', 'Benign/Likely benign'),
+		        ('v2', 'Conflicting interpretations of pathogenicity', 'Uncertain significance'),
+		        ('v3', 'Pathogenic/Likely pathogenic', 'Pathogenic/Likely pathogenic, risk factor'),
+		        ('v3', 'Pathogenic/Likely pathogenic', 'Likely pathogenic'),
+		        ('v4', 'Benign/Likely benign ', 'Benign/Likely benign; drug response'),
+		        ('v5', 'UNREPORTED', 'not reported'),
+		        ('v6', 'CONFLICT', 'CONFLICT'),
+		        ('v7', 'Conflicting interpretations of pathogenicity, other', 'Pathogenic'),
+		        ('v8', 'Uncertain significance', np.nan)]
+		full_df = pd.DataFrame(rows, columns=['hgvs_id.hg19', 'clinical_significance', 'clinical_significance.rcv'])
+		full_df.insert(1, 'accession', ['RCV' + str(i) for i in range(len(rows))])
+		full_df['conditions.name'] = 'condition'
+		full_df['gene.symbol'] = 'GENE'
+		
+		pd.testing.assert_frame_equal(explore.preprocess_visualization_df(full_df, 'hgvs_id.hg19', 'clinical_significance'),
+		                              preprocess_visualization_df_str(full_df, 'hgvs_id.hg19', 'clinical_significance'))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_figure_cache.py
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+import plotly.graph_objs as go
+
+from clinvar_workflow.helpers import clinsig_rgb_dict
+from clinvar_workflow.vizualization import figure_cache as fc
+
+
+calls = []
+
+@fc.cached_figure
+def bar_figure(count_df, title='Clinical Significance'):
+	calls.append(title)
+	return go.Figure(go.Bar(x=count_df.index.tolist(), y=count_df['nuniq'].tolist()),
+	                 layout=dict(title=title))
+
+
+class TestFigureCache(unittest.TestCase):
+
+	def setUp(self):
+		self.cache_dir = tempfile.mkdtemp()
+		self._settings = dict(fc.FIGURE_CACHE)
+		fc.set_figure_cache(self.cache_dir)
+		self.count_df = pd.DataFrame({'nuniq': [3, 1]}, index=['Pathogenic', 'Benign'])
+		del calls[:]
+
+	def tearDown(self):
+		fc.FIGURE_CACHE.update(self._settings)
+		shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+	def test_cached_figure(self):
+		fig = bar_figure(self.count_df)
+		self.assertEqual(bar_figure(self.count_df.copy()), fig)
+		self.assertEqual(bar_figure(self.count_df, 'Clinical Significance'), fig)
+		self.assertEqual(len(calls), 1)
+		
+		## changed counts | arguments | clinsig colors --> re-plotted
+		bar_figure(self.count_df.assign(nuniq=[3, 2]))
+		bar_figure(self.count_df, title='Variants')
+		color = clinsig_rgb_dict['Pathogenic']
+		clinsig_rgb_dict['Pathogenic'] = 'rgb(0,0,0)'
+		try:
+			bar_figure(self.count_df)
+		finally:
+			clinsig_rgb_dict['Pathogenic'] = color
+		self.assertEqual(len(calls), 4)
+		
+		## disabled cache --> always re-plotted
+		fc.set_figure_cache(None)
+		bar_figure(self.count_df)
+		self.assertEqual(len(calls), 5)
+
+	def test_unreadable_entry(self):
+		bar_figure(self.count_df)
+		for fname in os.listdir(self.cache_dir):
+			with open(os.path.join(self.cache_dir, fname), 'w') as f:
+				f.write('{not json')
+		self.assertEqual(bar_figure(self.count_df).layout.title.text, 'Clinical Significance')
+		self.assertEqual(len(calls), 2)
+
+	def test_evict_least_recently_used(self):
+		for i, key in enumerate(['a', 'b', 'c']):
+			fc.cache_put(key, '.png', b'0' * 100)
+			os.utime(os.path.join(self.cache_dir, key + '.png'), (time.time() - 10 + i, time.time() - 10 + i))
+		
+		## hit --> most recently used
+		self.assertEqual(fc.cache_get('a', '.png'), b'0' * 100)
+		fc.cache_evict(max_bytes=200)
+		self.assertEqual(sorted(os.listdir(self.cache_dir)), ['a.png', 'c.png'])
+		self.assertIsNone(fc.cache_get('b', '.png'))
+
+
+if __name__ == '__main__':
+	unittest.main()
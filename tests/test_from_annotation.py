@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_from_annotation.py
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.workflows import annotation_workflow as an
+from clinvar_workflow.workflows import exploratory_analysis_workflow as explore
+from clinvar_workflow.benchmarks import synthetic_clinvar as synth
+
+
+class StubMyVariant(object):
+	"""MyVariant client stub: getvariants of synthetic hits (as_dataframe=1), missing
+	IDs as 'notfound' hits."""
+
+	def __init__(self, hits):
+		self.hits = {h['query']:h for h in hits}
+
+	def getvariants(self, ids, fields=None, assembly=None, as_dataframe=0):
+		out = [self.hits.get(i, dict(query=i, notfound=True)) for i in ids]
+		if as_dataframe:
+			return pd.json_normalize(out).set_index('query')
+		return out
+
+
+class TestFromAnnotation(unittest.TestCase):
+	"""Exploratory analysis of annotation output directories (1 | several, NO query)
+	--> same counts as the exploratory analysis of the input variants."""
+
+	cols_var = ['CHR', 'POS', 'REF', 'ALT']
+
+	def setUp(self):
+		self.input_df, hits = synth.generate_synthetic_clinvar(n_variants=120, n_unreported=20,
+		                                                       n_genes=10, n_conditions=20)
+		self.tmp_dir = tempfile.mkdtemp()
+		self._mv = cv_query.mv
+		cv_query.mv = StubMyVariant(hits)
+
+	def tearDown(self):
+		cv_query.mv = self._mv
+		shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+	def input_file(self, df, name):
+		fpath = os.path.join(self.tmp_dir, name + '.txt')
+		df.to_csv(fpath, sep='\t', index=False)
+		return fpath
+
+	def annotation_dir(self, df, name):
+		out_dir = os.path.join(self.tmp_dir, name)
+		os.mkdir(out_dir)
+		an.run_clinvar_annotation(var_file=self.input_file(df, name), out_dir=out_dir, out_prefix='test',
+		                          build='hg19', cols_var=self.cols_var, cols_input=['INFO'], write_excel=False)
+		return glob.glob(os.path.join(out_dir, '*'))[0]
+
+	def assert_counts_equal(self, result_dict, ref):
+		pd.testing.assert_frame_equal(result_dict['data_summary_df'], ref['data_summary_df'])
+		for k in ['clinsig_var', 'clinsig_rcv', 'clinsig_var_gene', 'clinsig_var_cond']:
+			pd.testing.assert_frame_equal(result_dict[k]['df'], ref[k]['df'])
+		
+		## pathogenic variants (text files: set columns as strings, directories: row order)
+		for k in ['patho_var_df', 'patho_var_detail_df']:
+			self.assertEqual(sorted(result_dict[k]['hgvs_id.hg19']), sorted(ref[k]['hgvs_id.hg19']))
+
+	def test_from_annotation(self):
+		ref = explore.run_clinvar_exploratory_analysis(self.input_file(self.input_df, 'input'), self.tmp_dir,
+		                                               'test', 'hg19', self.cols_var, cols_input=['INFO'],
+		                                               write_files=False)
+		annot_dir = self.annotation_dir(self.input_df, 'all')
+		result_dict = explore.run_clinvar_exploratory_analysis_from_annotation(annot_dir, self.tmp_dir, 'test',
+		                                                                       'hg19', self.cols_var,
+		                                                                       write_files=False)
+		self.assert_counts_equal(result_dict, ref)
+		
+		## several directories (e.g. chunked annotation runs) --> merged partial aggregates
+		annot_dirs = [self.annotation_dir(self.input_df.iloc[:70], 'part1'),
+		              self.annotation_dir(self.input_df.iloc[70:], 'part2')]
+		result_dict = explore.run_clinvar_exploratory_analysis_from_annotation(annot_dirs, self.tmp_dir, 'test',
+		                                                                       'hg19', self.cols_var,
+		                                                                       write_files=False)
+		self.assert_counts_equal(result_dict, ref)
+
+	def test_missing_output(self):
+		with self.assertRaises(FileNotFoundError):
+			explore.run_clinvar_exploratory_analysis_from_annotation(self.tmp_dir, self.tmp_dir, 'test', 'hg19',
+			                                                         self.cols_var, write_files=False)
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_partitions.py
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.workflows import annotation_workflow as an
+from clinvar_workflow.benchmarks import synthetic_clinvar as synth
+
+
+class StubMyVariant(object):
+	"""MyVariant client stub: getvariants of synthetic hits (as_dataframe=1), missing
+	IDs as 'notfound' hits."""
+
+	def __init__(self, hits):
+		self.hits = {h['query']:h for h in hits}
+
+	def getvariants(self, ids, fields=None, assembly=None, as_dataframe=0):
+		out = [self.hits.get(i, dict(query=i, notfound=True)) for i in ids]
+		if as_dataframe:
+			return pd.json_normalize(out).set_index('query')
+		return out
+
+
+class TestPartitionMerge(unittest.TestCase):
+	"""Partitions annotated in worker processes & merged --> same results as a single
+	process run."""
+
+	def setUp(self):
+		input_df, hits = synth.generate_synthetic_clinvar(n_variants=120, n_unreported=20,
+		                                                  n_genes=10, n_conditions=20)
+		## duplicated input rows & trailing variants NOT in ClinVar (partition with NO ClinVar variants)
+		unrep_df = pd.DataFrame({'CHR': 'Y', 'POS': range(900000001, 900000061), 'REF': 'A', 'ALT': 'T',
+		                         'INFO': ['unrep' + str(i) for i in range(60)]})
+		self.input_df = pd.concat([input_df, input_df.iloc[5:8], unrep_df], ignore_index=True)
+		self.tmp_dir = tempfile.mkdtemp()
+		self.var_file = os.path.join(self.tmp_dir, 'input.txt')
+		self.input_df.to_csv(self.var_file, sep='\t', index=False)
+		self._mv = cv_query.mv
+		cv_query.mv = StubMyVariant(hits)
+
+	def tearDown(self):
+		cv_query.mv = self._mv
+		shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+	def run_annotation(self, **kwargs):
+		return an.run_clinvar_annotation(var_file=self.var_file, out_dir=self.tmp_dir, out_prefix='test',
+		                                 build='hg19', cols_var=['CHR', 'POS', 'REF', 'ALT'],
+		                                 cols_input=['INFO'], write_output=False, **kwargs)['result_dict']
+
+	def test_partition_input_variants(self):
+		input_var_df = self.input_df.assign(hgvs_id=self.input_df['CHR'].astype(str) + ':' +
+		                                            self.input_df['POS'].astype(str))
+		for partition_by in ['chrom', 'count']:
+			partitions = an.partition_input_variants(input_var_df, 'hgvs_id', ['CHR', 'POS', 'REF', 'ALT'],
+			                                         4, partition_by=partition_by)
+			self.assertLessEqual(len(partitions), 4)
+			pd.testing.assert_frame_equal(pd.concat(partitions).sort_index(), input_var_df)
+			
+			## all rows of a variant in the same partition
+			ids = [set(df['hgvs_id']) for df in partitions]
+			self.assertEqual(sum(len(s) for s in ids), len(set.union(*ids)))
+
+	def test_merged_results(self):
+		ref = self.run_annotation()
+		for partition_by, partitions in [('chrom', 3), ('count', 4)]:
+			result_dict = self.run_annotation(partitions=partitions, partition_by=partition_by)
+			for k in ['cv_var_summary_df', 'cv_full_df']:
+				pd.testing.assert_frame_equal(result_dict[k], ref[k])
+
+
+if __name__ == '__main__':
+	unittest.main()
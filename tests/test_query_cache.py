@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_query_cache.py
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.benchmarks import synthetic_clinvar as synth
+
+
+class StubMyVariant(object):
+	"""MyVariant client stub: getvariants of synthetic hits (JSON list | as_dataframe=1);
+	records the IDs of the JSON (cached query) calls."""
+
+	def __init__(self, hits):
+		self.hits = hits
+		self.queried = []
+
+	def getvariants(self, ids, fields=None, assembly=None, as_dataframe=0):
+		ids = list(ids)
+		if not as_dataframe:
+			self.queried.append(ids)
+		out = [h for i in ids for h in self.hits if h['query'] == i]
+		if as_dataframe:
+			return pd.json_normalize(out).set_index('query')
+		return out
+
+
+class TestQueryCache(unittest.TestCase):
+
+	def setUp(self):
+		input_df, self.hits = synth.generate_synthetic_clinvar(n_variants=30, n_unreported=10,
+		                                                       n_genes=10, n_conditions=20)
+		self.ids_found = [h['query'] for h in self.hits if 'notfound' not in h]
+		self.ids_notfound = [h['query'] for h in self.hits if 'notfound' in h]
+		self._mv = cv_query.mv
+		cv_query.mv = StubMyVariant(self.hits)
+		cv_query.set_query_cache(True)
+
+	def tearDown(self):
+		cv_query.set_query_cache(False)
+		cv_query.mv = self._mv
+
+	def uncached(self, ids):
+		return cv_query.mv.getvariants(ids, fields='clinvar', assembly='hg19', as_dataframe=1)
+
+	def test_cached_equals_uncached(self):
+		ids_all = self.ids_found + self.ids_notfound
+		panels = [ids_all[::2], ids_all, ids_all[::-1], self.ids_found[:5] + self.ids_notfound[:5]]
+		for ids in panels:
+			pd.testing.assert_frame_equal(cv_query.myvariant_getvariants_cached(ids, 'hg19'),
+			                              self.uncached(ids))
+
+		## each variant ID queried once (later panels: cache hits only)
+		self.assertEqual(sorted(i for q in cv_query.mv.queried for i in q), sorted(ids_all))
+
+	def test_notfound_panel(self):
+		## warm up with ALL variants --> notfound-only panel: NO ClinVar fields (None, as uncached)
+		cv_query.myvariant_getvariants_cached(self.ids_found + self.ids_notfound, 'hg19')
+		cached_df = cv_query.myvariant_getvariants_cached(self.ids_notfound, 'hg19')
+		pd.testing.assert_frame_equal(cached_df, self.uncached(self.ids_notfound))
+		self.assertIsNone(cv_query.extract_clinvar_raw_df(cached_df))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_sorting.py
+import random
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.helpers import sorting as sort
+from clinvar_workflow.helpers import clinsig_sort_dict
+
+
+def sort_clinsig_key(clinsig_unsorted_list, clinsig_dict=clinsig_sort_dict, reverse=False):
+	## key function sort (before the ordered categorical)
+	return sorted(clinsig_unsorted_list, reverse=reverse,
+	              key=lambda x: clinsig_dict[x] if x in clinsig_dict else 24)
+
+
+class TestClinsigSort(unittest.TestCase):
+
+	def setUp(self):
+		## labels, lowercase forms & aliases + unknown labels (rank 24) & missing values
+		self.labels = list(clinsig_sort_dict) + ['risk Factor', 'Uncertain Significance', 'novel label',
+		                                         'other label', None]
+
+	def test_sort_clinsig_equals_key_sort(self):
+		rng = random.Random(0)
+		for i in range(500):
+			clinsig_list = [rng.choice(self.labels) for j in range(rng.randint(0, 40))]
+			for reverse in [False, True]:
+				self.assertEqual(sort.sort_clinsig(clinsig_list, reverse=reverse),
+				                 sort_clinsig_key(clinsig_list, reverse=reverse))
+
+	def test_sort_and_extract_clinsig(self):
+		clinsig_list = ['novel label', 'Benign', 'CONFLICT', 'pathogenic', 'Total', 'Pathogenic',
+		                'Conflicting', 'benign']
+		for reverse in [False, True]:
+			self.assertEqual(sort.sort_and_extract_clinsig(clinsig_list, reverse=reverse),
+			                 sort_clinsig_key([c for c in clinsig_list if c in clinsig_sort_dict],
+			                                  reverse=reverse))
+
+	def test_unknown_labels_default_rank(self):
+		clinsig_cat = sort.clinsig_categorical(['novel label', 'Not provided', 'UNREPORTED',
+		                                        'Uncertain significance'])
+		self.assertEqual(clinsig_cat.sort_values().astype(object).tolist(),
+		                 ['Uncertain significance', 'Not provided', 'novel label', 'UNREPORTED'])
+
+		## sort_clinsig_df_col: descending rank (reverse: ascending)
+		df = pd.DataFrame({'clinsig': ['UNREPORTED', 'novel label', 'Benign', 'Pathogenic'], 'n': range(4)})
+		self.assertEqual(sort.sort_clinsig_df_col(df, 'clinsig')['n'].tolist(), [0, 1, 2, 3])
+		self.assertEqual(sort.sort_clinsig_df_col(df, 'clinsig', reverse=True)['n'].tolist(), [3, 2, 1, 0])
+
+
+if __name__ == '__main__':
+	unittest.main()
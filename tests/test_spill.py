@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_spill.py
+import ast
+import glob
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+
+from clinvar_workflow.helpers import spill
+from clinvar_workflow.query_clinvar import clinvar_query as cv_query
+from clinvar_workflow.workflows import annotation_workflow as an
+from clinvar_workflow.benchmarks import synthetic_clinvar as synth
+
+
+class StubMyVariant(object):
+	"""MyVariant client stub: getvariants of synthetic hits (as_dataframe=1)."""
+
+	def __init__(self, hits):
+		self.hits = {h['query']:h for h in hits}
+
+	def getvariants(self, ids, fields=None, assembly=None, as_dataframe=0):
+		out = [self.hits[i] for i in ids if i in self.hits]
+		if as_dataframe:
+			return pd.json_normalize(out).set_index('query')
+		return out
+
+
+def set_values_helper(df):
+	## set values are written in (arbitrary) iteration order --> compare as sorted lists
+	def parse(v):
+		if isinstance(v, str) and v.startswith('{') and v.endswith('}'):
+			try:
+				v = ast.literal_eval(v)
+			except (ValueError, SyntaxError):
+				return v
+			return sorted(v, key=str) if isinstance(v, set) else v
+		return v
+	return df.applymap(parse)
+
+
+class TestSpilledFrame(unittest.TestCase):
+
+	def setUp(self):
+		self.spill_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+	def test_read_rows(self):
+		df = pd.DataFrame({'id': range(10), 'set': [{i} for i in range(10)],
+		                   'cat': pd.Categorical(list('abcabcabca'))})
+		frame = spill.spill_frame_blocks(df, self.spill_dir, 'df', [(0, 3), (3, 3), (3, 7), (7, 10)])
+		self.assertEqual(len(frame), 10)
+		for start, stop in [(0, 10), (0, 3), (2, 8), (3, 7), (6, 7), (9, 10)]:
+			pd.testing.assert_frame_equal(frame.read_rows(start, stop).reset_index(drop=True),
+			                              df.iloc[start:stop].reset_index(drop=True))
+
+
+class TestSpilledAnnotation(unittest.TestCase):
+	"""Tiny memory budget (chunks spilled, merged & written batch by batch) --> same
+	output as a run without a budget."""
+
+	def setUp(self):
+		input_df, hits = synth.generate_synthetic_clinvar(n_variants=120, n_unreported=20,
+		                                                  n_genes=10, n_conditions=20)
+		## duplicated input rows
+		input_df = pd.concat([input_df, input_df.iloc[5:8]], ignore_index=True)
+		self.tmp_dir = tempfile.mkdtemp()
+		self.var_file = os.path.join(self.tmp_dir, 'input.txt')
+		input_df.to_csv(self.var_file, sep='\t', index=False)
+		self._mv, self._probe = cv_query.mv, an.SPILL_PROBE_VARIANTS
+		cv_query.mv = StubMyVariant(hits)
+		an.SPILL_PROBE_VARIANTS = 30
+
+	def tearDown(self):
+		cv_query.mv, an.SPILL_PROBE_VARIANTS = self._mv, self._probe
+		shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+	def run_annotation(self, name, **kwargs):
+		out_dir = os.path.join(self.tmp_dir, name)
+		os.mkdir(out_dir)
+		result = an.run_clinvar_annotation(var_file=self.var_file, out_dir=out_dir, out_prefix='test',
+		                                   build='hg19', cols_var=['CHR', 'POS', 'REF', 'ALT'],
+		                                   cols_input=['INFO'], **kwargs)
+		return out_dir, result
+
+	def output_file(self, out_dir, pattern):
+		fpath_list = glob.glob(os.path.join(out_dir, '**', pattern), recursive=True)
+		self.assertEqual(len(fpath_list), 1, pattern)
+		return fpath_list[0]
+
+	def test_spilled_outputs(self):
+		kwargs = dict(write_excel=True, database=True)
+		ref_dir, _ = self.run_annotation('unspilled', **kwargs)
+		out_dir, result = self.run_annotation('spilled', max_memory='100K', **kwargs)
+		self.assertNotIn('cv_var_summary_df', result)
+		self.assertEqual(glob.glob(os.path.join(out_dir, '**', '*_spill_*'), recursive=True), [])
+
+		for pattern in ['*_variant_summary_*.txt', '*_variant_full_*.txt']:
+			ref_df = pd.read_csv(self.output_file(ref_dir, pattern), sep='\t', dtype=str)
+			out_df = pd.read_csv(self.output_file(out_dir, pattern), sep='\t', dtype=str)
+			pd.testing.assert_frame_equal(set_values_helper(out_df), set_values_helper(ref_df))
+
+		for pattern in ['*_variant_summary_*.xlsx', '*_variant_full_*.xlsx']:
+			ref_df = pd.read_excel(self.output_file(ref_dir, pattern))
+			out_df = pd.read_excel(self.output_file(out_dir, pattern))
+			pd.testing.assert_frame_equal(set_values_helper(out_df), set_values_helper(ref_df))
+
+		con_ref = sqlite3.connect(self.output_file(ref_dir, '*.sqlite'))
+		con_out = sqlite3.connect(self.output_file(out_dir, '*.sqlite'))
+		try:
+			for table in ['variant_summary', 'variant_full']:
+				query = 'SELECT * FROM ' + table
+				pd.testing.assert_frame_equal(set_values_helper(pd.read_sql(query, con_out)),
+				                              set_values_helper(pd.read_sql(query, con_ref)))
+			query = "SELECT name FROM sqlite_master WHERE type = 'index' ORDER BY name"
+			self.assertEqual(con_out.execute(query).fetchall(), con_ref.execute(query).fetchall())
+		finally:
+			con_ref.close()
+			con_out.close()
+
+	def test_spilled_in_memory(self):
+		_, ref = self.run_annotation('unspilled', write_output=False)
+		spill_chunk_record = an.spill_chunk_record
+		spilled = []
+		an.spill_chunk_record = lambda *args, **kwargs: spilled.append(1) or spill_chunk_record(*args, **kwargs)
+		try:
+			for max_memory in ['1G', '4M']:
+				_, result = self.run_annotation('spilled_' + max_memory, write_output=False,
+				                                max_memory=max_memory)
+				for k in ['cv_var_summary_df', 'cv_full_df']:
+					pd.testing.assert_frame_equal(result['result_dict'][k], ref['result_dict'][k])
+		finally:
+			an.spill_chunk_record = spill_chunk_record
+		self.assertTrue(spilled)
+
+		## merged results exceeding the budget are NOT kept in memory
+		with self.assertRaises(MemoryError):
+			self.run_annotation('rejected', write_output=False, max_memory='100K')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_summary_stats.py
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from clinvar_workflow.helpers import summary_stats as ss
+
+
+class TestGroupedCountTopN(unittest.TestCase):
+
+	def setUp(self):
+		rng = random.Random(0)
+		clinsig = ['Pathogenic', 'Likely pathogenic', 'Benign', 'Uncertain significance']
+		## real 'Other' group (e.g. a condition named 'Other')
+		genes = ['GENE' + str(i) for i in range(30)] + ['Other']
+		self.df = pd.DataFrame([dict(gene=rng.choice(genes), clinsig=rng.choice(clinsig),
+		                             var_id='var' + str(rng.randint(0, 400))) for i in range(1500)])
+
+	def count_df(self, **kwargs):
+		return ss.generate_grouped_count_df(self.df, 'gene', 'clinsig', 'var_id', **kwargs)
+
+	def test_top_n_other_equals_full_head(self):
+		full_df = self.count_df()
+		for top_n in [1, 5, 10, 31, 40]:
+			top_df = self.count_df(top_n=top_n, other_label='Other')
+			n = min(top_n, len(full_df.index))
+			pd.testing.assert_frame_equal(top_df.iloc[:n], full_df.head(n))
+			if top_n >= len(full_df.index):
+				self.assertEqual(len(top_df.index), len(full_df.index))
+				continue
+			
+			## real 'Other' group kept --> remaining groups row: unique label
+			self.assertEqual(top_df.index[-1], 'Other (2)')
+			pd.testing.assert_series_equal(top_df.iloc[-1], full_df.iloc[n:].sum(), check_names=False)
+
+	def test_exclude(self):
+		full_df = self.count_df().drop(index=['GENE0', 'GENE1'])
+		top_df = self.count_df(top_n=5, exclude=['GENE0', 'GENE1'], other_label='Other')
+		pd.testing.assert_frame_equal(top_df.iloc[:5], full_df.head(5))
+		pd.testing.assert_series_equal(top_df.iloc[-1], full_df.iloc[5:].sum(), check_names=False)
+
+	def test_categorical_index(self):
+		counts = np.array([[3, 1], [0, 2], [1, 1], [5, 0]])
+		idx_group = pd.CategoricalIndex(['a', 'b', 'c', 'd'], name='gene')
+		idx_clinsig = pd.Index(['Pathogenic', 'Benign'], name='clinsig')
+		top_df = ss.grouped_count_df_from_codes(counts, idx_group, idx_clinsig, top_n=2, other_label='Other')
+		self.assertEqual(top_df.index.tolist(), ['d', 'a', 'Other'])
+		self.assertEqual(top_df.loc['Other'].tolist(), [4, 1, 3])
+		
+		## label of a real group
+		with self.assertRaises(ValueError):
+			ss.grouped_count_df_from_codes(counts, idx_group, idx_clinsig, top_n=2, other_label='c')
+
+
+class TestCodesEngine(unittest.TestCase):
+	"""Counts from categorical codes + bincount --> same as groupby + pivot_table."""
+
+	def setUp(self):
+		rng = random.Random(1)
+		genes = ['GENE' + str(i) for i in range(20)] + [None]
+		clinsig = ['Pathogenic', 'Benign', 'Uncertain significance', None]
+		self.df = pd.DataFrame([dict(gene=rng.choice(genes), clinsig=rng.choice(clinsig),
+		                             var_id=rng.choice(['var' + str(rng.randint(0, 300)), None]))
+		                        for i in range(2000)])
+
+	def assert_engines_equal(self, grp_cols, **kwargs):
+		ref_df = ss.generate_count_df(self.df, cnt_col='var_id', grp_cols=grp_cols, engine='groupby', **kwargs)
+		df = ss.generate_count_df(self.df, cnt_col='var_id', grp_cols=grp_cols, engine='codes', **kwargs)
+		pd.testing.assert_frame_equal(df, ref_df)
+
+	def test_one_group(self):
+		self.assert_engines_equal(['clinsig'])
+		self.assert_engines_equal(['gene'])
+
+	def test_two_groups(self):
+		self.assert_engines_equal(['gene', 'clinsig'])
+		self.assert_engines_equal(['gene', 'clinsig'], sparse=True)
+
+	def test_partial_aggs(self):
+		## distinct tables per partition, merged --> same counts as the full DF
+		agg_cols = {'clinsig_var_gene':['gene', 'clinsig', 'var_id']}
+		partial_list = [ss.generate_partial_aggs(self.df.iloc[i:i+300], agg_cols)
+		                for i in range(0, len(self.df.index), 300)]
+		merged_df = ss.merge_partial_aggs(partial_list)['clinsig_var_gene']
+		pd.testing.assert_frame_equal(ss.generate_grouped_count_df(merged_df, 'gene', 'clinsig', 'var_id'),
+		                              ss.generate_grouped_count_df(self.df, 'gene', 'clinsig', 'var_id'))
+
+
+if __name__ == '__main__':
+	unittest.main()
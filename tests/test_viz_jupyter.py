@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_viz_jupyter.py
+import unittest
+
+from ipywidgets import HTML
+
+from clinvar_workflow.vizualization import viz_jupyter as viz
+
+
+class TestLazyAccordion(unittest.TestCase):
+
+	def test_lazy_placeholder(self):
+		built = []
+		def build_fxn():
+			built.append(1)
+			return HTML('figure')
+		cache_dict = {}
+		acc = viz.lazy_accordion_helper('title', build_fxn, cache_dict)
+		
+		## key filled before the section is expanded, NOT built
+		placeholder = cache_dict['plot_table_widget']
+		self.assertIs(acc.children[0], placeholder)
+		self.assertEqual(built, [])
+		
+		## built in place on first expand (once)
+		acc.selected_index = 0
+		acc.selected_index = None
+		acc.selected_index = 0
+		self.assertEqual(built, [1])
+		self.assertIs(cache_dict['plot_table_widget'], placeholder)
+		self.assertEqual(placeholder.children[0].value, 'figure')
+
+	def test_not_lazy_builds_placeholder(self):
+		built = []
+		cache_dict = {}
+		viz.lazy_accordion_helper('title', lambda: built.append(1) or HTML('figure'), cache_dict)
+		acc = viz.lazy_accordion_helper('title', lambda: HTML('other'), cache_dict, lazy=False)
+		self.assertEqual(built, [1])
+		self.assertEqual(acc.children[0].children[0].value, 'figure')
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# coding: utf-8
+# test_write_outputs.py
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pandas as pd
+import plotly.graph_objs as go
+import xlsxwriter
+
+from clinvar_workflow.helpers import write_outputs as wo
+
+
+class TestExcelWriter(unittest.TestCase):
+
+	def setUp(self):
+		self.out_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.out_dir, ignore_errors=True)
+
+	def test_container_columns_constant_memory(self):
+		## columns of ONLY sets | lists | dicts | tuples (+ missing values) --> strings
+		df = pd.DataFrame({'set': [{'Pathogenic'}, {'Benign'}, None],
+		                   'list': [['a', 'b'], [], ['c']],
+		                   'dict': [{'medgen': 'C1'}, {'medgen': 'C2'}, {}],
+		                   'tuple': [(1, 2), (3,), None],
+		                   'num': [1, 2, 3]})
+		fpath = os.path.join(self.out_dir, 'containers.xlsx')
+		wo.write_excel_workbook_helper([[df, 'variants', True, False]], fpath)
+
+		xl_df = pd.read_excel(fpath, sheet_name='variants')
+		for c in ['set', 'list', 'dict', 'tuple']:
+			expected = [str(v) if v is not None else None for v in df[c]]
+			self.assertEqual([v if pd.notnull(v) else None for v in xl_df[c]], expected)
+		self.assertEqual(xl_df['num'].tolist(), [1, 2, 3])
+
+	def test_split_worksheets(self):
+		df = pd.DataFrame({'id': range(10), 'set': [{i} for i in range(10)]})
+		fpath = os.path.join(self.out_dir, 'split.xlsx')
+		wo.write_excel_workbook_helper([[df, 'variants', True, False]], fpath, max_rows=4)
+
+		sheets = pd.read_excel(fpath, sheet_name=None)
+		self.assertEqual(list(sheets), ['variants', 'variants (2)', 'variants (3)', 'variants (4)'])
+		xl_df = pd.concat(sheets.values(), ignore_index=True)
+		self.assertEqual(xl_df['id'].tolist(), list(range(10)))
+		self.assertEqual(xl_df['set'].tolist(), [str({i}) for i in range(10)])
+
+	def test_sheet_appender(self):
+		## batches appended across the worksheet row limit --> same sheets as split worksheets
+		df = pd.DataFrame({'id': range(10), 'set': [{i} for i in range(10)]})
+		fpath = os.path.join(self.out_dir, 'appended.xlsx')
+		workbook = xlsxwriter.Workbook(fpath, {'constant_memory': True})
+		appender = wo.ExcelSheetAppender(workbook, 'variants', max_rows=4)
+		for start, stop in [(0, 2), (2, 7), (7, 10)]:
+			appender.write(df.iloc[start:stop])
+		workbook.close()
+
+		fpath_ref = os.path.join(self.out_dir, 'split.xlsx')
+		wo.write_excel_workbook_helper([[df, 'variants', True, False]], fpath_ref, max_rows=4)
+		sheets, sheets_ref = pd.read_excel(fpath, sheet_name=None), pd.read_excel(fpath_ref, sheet_name=None)
+		self.assertEqual(list(sheets), list(sheets_ref))
+		for k in sheets_ref:
+			pd.testing.assert_frame_equal(sheets[k], sheets_ref[k])
+
+
+class TestCompressedText(unittest.TestCase):
+
+	def setUp(self):
+		self.out_dir = tempfile.mkdtemp()
+		## > 1 MB of text --> several blocks handed to the writer thread
+		n = 60000
+		self.df = pd.DataFrame({'hgvs_id.hg19': ['chr1:g.' + str(i) + 'A>G' for i in range(n)],
+		                        'clinical_significance': ['Pathogenic', 'Benign', None] * (n // 3),
+		                        'pos': range(n)})
+
+	def tearDown(self):
+		shutil.rmtree(self.out_dir, ignore_errors=True)
+
+	def test_round_trip(self):
+		for compression, ext in [('gzip', '.gz'), ('zstd', '.zst')]:
+			fpath = os.path.join(self.out_dir, 'variants.txt')
+			wo.write_csv_helper(self.df, fpath, compression=compression, sep='\t', index=False)
+			self.assertTrue(os.path.exists(fpath + ext))
+			df = pd.read_csv(fpath + ext, sep='\t', compression=compression)
+			pd.testing.assert_frame_equal(df, self.df)
+
+	def test_writer_error(self):
+		with self.assertRaises(ValueError):
+			wo.BackgroundCompressWriter(os.path.join(self.out_dir, 'variants.txt'), compression='bz2')
+
+
+class TestResultsDb(unittest.TestCase):
+
+	def setUp(self):
+		self.out_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.out_dir, ignore_errors=True)
+
+	def test_indexes(self):
+		df = pd.DataFrame({'hgvs_id.hg19': ['chr1:g.1A>G', 'chr1:g.2C>T'], 'REF': ['A', 'C'], 'ref': ['A', 'C'],
+		                   'gene.symbol': ['BRCA1', None], 'clinical_significance': [{'Pathogenic'}, None]})
+		fpath = os.path.join(self.out_dir, 'results.sqlite')
+		wo.write_results_db(fpath, [[df, 'variant_summary'], [df[['hgvs_id.hg19', 'REF']], 'variant_full']])
+
+		con = sqlite3.connect(fpath)
+		try:
+			query = "SELECT name, tbl_name FROM sqlite_master WHERE type = 'index' ORDER BY name"
+			self.assertEqual(con.execute(query).fetchall(),
+			                 [('idx_variant_full_hgvs_id.hg19', 'variant_full'),
+			                  ('idx_variant_summary_clinical_significance', 'variant_summary'),
+			                  ('idx_variant_summary_gene.symbol', 'variant_summary'),
+			                  ('idx_variant_summary_hgvs_id.hg19', 'variant_summary')])
+			
+			## case-insensitive duplicate column names & container values (strings)
+			db_df = pd.read_sql('SELECT * FROM variant_summary', con)
+			self.assertEqual(db_df.columns.tolist(), ['hgvs_id.hg19', 'REF', 'ref_1', 'gene.symbol',
+			                                          'clinical_significance'])
+			self.assertEqual(db_df['clinical_significance'].tolist(), [str({'Pathogenic'}), None])
+			
+			## indexed query plan
+			query = 'EXPLAIN QUERY PLAN SELECT * FROM variant_summary WHERE "gene.symbol" = \'BRCA1\''
+			self.assertIn('idx_variant_summary_gene.symbol', str(con.execute(query).fetchall()))
+		finally:
+			con.close()
+
+
+class TestHtmlReport(unittest.TestCase):
+
+	def setUp(self):
+		self.out_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.out_dir, ignore_errors=True)
+
+	def test_report(self):
+		fig = go.Figure(go.Bar(x=['Pathogenic', 'Benign'], y=[3, 1]))
+		df = pd.DataFrame({'Pathogenic': [3, 0], 'Benign': [1, None]},
+		                  index=pd.Index(['BRCA1', '</script>'], name='gene'))
+		fpath = os.path.join(self.out_dir, 'report.html')
+		wo.write_html_report(fpath, '<test> report', [[fig, 'Clinical Significance'], [None, 'skipped']],
+		                     [[df, 'Gene Clinical Significance'], [None, 'skipped']])
+		with open(fpath, encoding='utf-8') as f:
+			report = f.read()
+		
+		## ONE inlined plotly.js; title HTML escaped
+		self.assertEqual(report.count('<script type="text/javascript">'), 2)
+		self.assertIn('<title>&lt;test&gt; report</title>', report)
+		
+		## embedded JSON --> figures & tables (NOT closing the script element)
+		data = re.search('<script type="application/json" id="report-data">(.*?)</script>', report, re.S)
+		data = json.loads(data.group(1))
+		self.assertEqual([f['title'] for f in data['figures']], ['Clinical Significance'])
+		self.assertEqual(data['figures'][0]['figure']['data'][0]['y'], [3, 1])
+		self.assertEqual(data['tables'], [dict(title='Gene Clinical Significance',
+		                                       columns=['gene', 'Pathogenic', 'Benign'],
+		                                       data=[['BRCA1', 3, 1.0], ['</script>', 0, None]])])
+
+
+if __name__ == '__main__':
+	unittest.main()